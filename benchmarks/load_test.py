@@ -0,0 +1,157 @@
+"""
+Load test for the ContextMemory HTTP service.
+
+Fires concurrent /search requests at a running service and reports
+throughput, latency percentiles and how well requests were batched.
+
+Usage:
+    contextmemory serve --port 8000
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --conversation-id 1 \\
+        --concurrency 64 --requests 2000
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+QUERIES = [
+    "What programming languages does the user know?",
+    "Where does the user live?",
+    "What are the user's hobbies?",
+    "What is the user working on right now?",
+    "Any upcoming trips or events?",
+    "What food does the user like?",
+    "Who are the user's friends and family?",
+    "What tools does the user prefer?",
+]
+
+
+class Client:
+    """One keep-alive connection per load-generating thread."""
+
+    _local = threading.local()
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        return conn
+
+    def request(self, method: str, path: str, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers={"content-type": "application/json"})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read() or b"{}")
+        except (ConnectionError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(
+    url: str,
+    conversation_id: int,
+    concurrency: int,
+    requests: int,
+    limit: int,
+    mode: str,
+    unique: bool,
+) -> None:
+    client = Client(url)
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        query = random.choice(QUERIES)
+        if unique:
+            # Defeat the search result cache so every request hits the batchers
+            query = f"{query} #{i}"
+        payload = {
+            "query": query,
+            "conversation_id": conversation_id,
+            "limit": limit,
+            "mode": mode,
+        }
+        start = time.perf_counter()
+        try:
+            status, _ = client.request("POST", "/search", payload)
+        except Exception:
+            status = "error"
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Requests:     {requests} ({concurrency} concurrent) in {duration:.2f}s")
+    print(f"Throughput:   {requests / duration:.1f} req/s")
+    print(f"Status codes: {dict(statuses)}")
+    print(
+        "Latency (ms): "
+        f"p50={percentile(latencies, 50):.1f} "
+        f"p95={percentile(latencies, 95):.1f} "
+        f"p99={percentile(latencies, 99):.1f} "
+        f"max={latencies[-1] if latencies else 0:.1f}"
+    )
+
+    _, health = client.request("GET", "/health")
+    print(f"Embedding batches: {health['embedding_batcher']}")
+    print(f"Search batches:    {health['search_batcher']}")
+    print(f"Search cache:      {health['search_cache']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--conversation-id", type=int, required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--mode", default="vector", choices=["vector", "hybrid", "lexical"])
+    parser.add_argument(
+        "--unique-queries",
+        action="store_true",
+        help="Make every query distinct so none are served from the search cache",
+    )
+    args = parser.parse_args()
+
+    run(
+        args.url,
+        args.conversation_id,
+        args.concurrency,
+        args.requests,
+        args.limit,
+        args.mode,
+        args.unique_queries,
+    )
+
+
+if __name__ == "__main__":
+    main()
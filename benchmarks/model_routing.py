@@ -0,0 +1,159 @@
+"""
+Benchmark for per-stage model routing.
+
+Runs the same classification (ADD/UPDATE/DELETE/REPLACE/NOOP) or
+extraction inputs through several models and reports latency and how often
+each model agrees with a reference model, to check whether a cheaper model
+is good enough for a stage before setting classification_model /
+extraction_model.
+
+Usage:
+    python benchmarks/model_routing.py --stage classification \\
+        --models gpt-4o gpt-4o-mini gpt-4.1-nano --repeat 3
+    python benchmarks/model_routing.py --stage extraction --models gpt-4o gpt-4o-mini \\
+        --cases my_cases.jsonl
+
+The first model is the reference unless --reference is given. Custom cases
+are JSONL, one per line:
+    classification: {"fact": "...", "memories": [{"id": 1, "text": "..."}]}
+    extraction:     {"user": "...", "assistant": "..."}
+"""
+
+import argparse
+import json
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from contextmemory.core.openai_client import reset_client
+from contextmemory.core.settings import get_settings
+from contextmemory.memory.extractor import extract_memories
+from contextmemory.memory.tool_classifier import llm_tool_call
+
+CLASSIFICATION_CASES = [
+    {"fact": "User's name is Priya", "memories": []},
+    {"fact": "User loves Python", "memories": [{"id": 1, "text": "User loves Python programming"}]},
+    {"fact": "User lives in Berlin", "memories": [{"id": 2, "text": "User lives in Munich"}]},
+    {"fact": "User no longer eats meat", "memories": [{"id": 3, "text": "User's favourite food is steak"}]},
+    {"fact": "User is a senior backend engineer", "memories": [{"id": 4, "text": "User is a backend engineer"}]},
+    {"fact": "User has two cats", "memories": [{"id": 5, "text": "User has a dog named Rex"}]},
+    {"fact": "User prefers dark mode", "memories": [{"id": 6, "text": "User prefers dark mode in editors"}]},
+    {"fact": "User works at Acme Corp", "memories": [{"id": 7, "text": "User works at Globex"}, {"id": 8, "text": "User is a manager"}]},
+    {"fact": "User is allergic to peanuts", "memories": [{"id": 9, "text": "User likes Thai food"}]},
+    {"fact": "User's deadline moved to Friday", "memories": [{"id": 10, "text": "User's project deadline is Wednesday"}]},
+    {"fact": "User speaks Spanish", "memories": [{"id": 11, "text": "User speaks English and French"}]},
+    {"fact": "User is 31 years old", "memories": [{"id": 12, "text": "User is 30 years old"}]},
+]
+
+EXTRACTION_CASES = [
+    {"user": "Hi, I'm Priya and I write Go at a fintech startup", "assistant": "Nice to meet you, Priya!"},
+    {"user": "ok thanks", "assistant": "You're welcome!"},
+    {"user": "I'm debugging a memory leak in our Redis client, it's blocking the release", "assistant": "Let's look at the connection pool."},
+    {"user": "What's the capital of Australia?", "assistant": "Canberra."},
+    {"user": "I just moved to Lisbon and I'm vegetarian now", "assistant": "Lisbon has great vegetarian food."},
+    {"user": "Remember that my flight to Tokyo is on March 3rd", "assistant": "Noted!"},
+    {"user": "lol that's funny", "assistant": "Glad you liked it."},
+    {"user": "Can you explain how B-trees work?", "assistant": "Sure, a B-tree is..."},
+]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def classify(case: Dict) -> str:
+    memories = [SimpleNamespace(id=m["id"], memory_text=m["text"]) for m in case["memories"]]
+    decision = llm_tool_call(case["fact"], memories)
+    target = decision.memory_id if decision.action in ("UPDATE", "DELETE", "REPLACE") else None
+    return f"{decision.action}:{target}" if target is not None else decision.action
+
+
+def extract(case: Dict) -> str:
+    result = extract_memories(
+        latest_pair=[f"USER: {case['user']}\nASSISTANT: {case['assistant']}"],
+        summary_text="",
+        recent_messages=[],
+    )
+    # Compare what matters for routing: whether anything was kept, and of which kind
+    return f"semantic={bool(result.get('semantic'))} bubbles={bool(result.get('bubbles'))}"
+
+
+def run_model(stage: str, model: str, cases: List[Dict], repeat: int) -> Dict:
+    settings = get_settings()
+    setattr(settings, f"{stage}_model", model)
+    reset_client()
+
+    run_case = classify if stage == "classification" else extract
+    latencies = []
+    answers: List[List[str]] = []
+    for case in cases:
+        case_answers = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            case_answers.append(run_case(case))
+            latencies.append(time.perf_counter() - start)
+        answers.append(case_answers)
+    return {"model": model, "latencies": sorted(latencies), "answers": answers}
+
+
+def load_cases(path: Optional[str], stage: str) -> List[Dict]:
+    if path is None:
+        return CLASSIFICATION_CASES if stage == "classification" else EXTRACTION_CASES
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stage", choices=["classification", "extraction"], default="classification")
+    parser.add_argument("--models", nargs="+", required=True, help="Models to compare")
+    parser.add_argument("--reference", help="Model whose answers count as correct (default: first of --models)")
+    parser.add_argument("--cases", help="JSONL file of cases (default: built-in)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case and model (default: 1)")
+    args = parser.parse_args()
+
+    cases = load_cases(args.cases, args.stage)
+    reference = args.reference or args.models[0]
+    models = args.models if reference in args.models else [reference] + args.models
+
+    results = {}
+    for model in models:
+        print(f"Running {len(cases)} x {args.repeat} {args.stage} calls on {model}...", flush=True)
+        results[model] = run_model(args.stage, model, cases, args.repeat)
+
+    # Reference answer per case: its most common answer across repeats
+    expected = [Counter(a).most_common(1)[0][0] for a in results[reference]["answers"]]
+
+    print()
+    print(f"{'model':<32} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'agree':>7} {'stable':>7}")
+    for model in models:
+        result = results[model]
+        latencies = result["latencies"]
+        answers = result["answers"]
+        total = sum(len(a) for a in answers)
+        agree = sum(answer == exp for a, exp in zip(answers, expected) for answer in a)
+        # Cases where every repeat gave the same answer
+        stable = sum(len(set(a)) == 1 for a in answers)
+        print(
+            f"{model:<32} {percentile(latencies, 50) * 1000:>8.0f} {percentile(latencies, 95) * 1000:>8.0f} "
+            f"{sum(latencies) / len(latencies) * 1000:>8.0f} {agree / total:>7.1%} {stable / len(answers):>7.1%}"
+        )
+
+    disagreements = [
+        (model, case, exp, results[model]["answers"][i])
+        for model in models if model != reference
+        for i, (case, exp) in enumerate(zip(cases, expected))
+        if any(answer != exp for answer in results[model]["answers"][i])
+    ]
+    if disagreements:
+        print(f"\nDisagreements with {reference}:")
+        for model, case, exp, got in disagreements:
+            print(f"  [{model}] {json.dumps(case)[:90]}\n    expected {exp}, got {got}")
+
+
+if __name__ == "__main__":
+    main()
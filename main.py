@@ -16,17 +16,13 @@ def chat_with_memory(user_message: str, memory: Memory, conversation_id: int) ->
     """
     client = get_openai_client()
     
-    # Search for relevant memories
-    relevant_memories = memory.search(
+    # Relevant memories, formatted and capped at 500 tokens
+    relevant_memories = memory.get_context(
         query=user_message,
         conversation_id=conversation_id,
-        limit=5,
+        token_budget=500,
     )
-
-    # Format memories for the prompt
-    memories_text = "\n".join(
-        f"- {m['memory']}" for m in relevant_memories["results"]
-    ) or "No memories yet."
+    memories_text = relevant_memories["context"] or "No memories yet."
 
     # Generate response with memory context
     messages = [
@@ -24,6 +24,23 @@ Environment Variables (alternative):
     LLM_PROVIDER - "openai" (default) or "openrouter"
     LLM_MODEL - Model name, default "gpt-4o-mini"
     EMBEDDING_MODEL - Embedding model, default "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS - Optional, shorten embeddings (e.g. 512)
+    EXTRACTION_WINDOW - Optional, turns per extraction call when importing history
+    STREAM_EXTRACTION - Optional, "true" to store memories while extraction is generating
+    CONTEXT_CACHE_SIZE - Optional, conversations kept in the extraction context cache (default 1024)
+    CONNECTION_GRAPH_CACHE_SIZE - Optional, conversations whose connection graph is cached (default 256)
+    EXTRACTION_GATE - Optional, "off" (default), "on" or "shadow"
+    EXTRACTION_GATE_MODEL - Optional, saved gate classifier
+    EXTRACTION_MODEL / CLASSIFICATION_MODEL / SUMMARY_MODEL - Optional, per-stage models
+      (also *_TEMPERATURE and *_TIMEOUT, e.g. CLASSIFICATION_TIMEOUT=10)
+    EMBEDDING_TIMEOUT - Optional, embeddings request timeout in seconds (default 30)
+    RATE_LIMIT_RPM / RATE_LIMIT_TPM - Optional, request/token budget per model
+    LLM_MAX_RETRIES - Optional, retries after rate limits and transient errors (default 2)
+    PROMPT_BUDGETS - Optional, prompt section token budgets, e.g. "summary=500,recent_messages=800"
+    HEDGE_EMBEDDINGS - Optional, "true" to hedge slow embeddings requests
+    HEDGE_DELAY_MS - Optional, fixed hedge delay (default: p95 of recent latencies)
+    METRICS_ENABLED - Optional, "true" to time pipeline stages and count LLM calls/tokens
+    METRICS_EXPORTERS - Optional, comma-separated extra exporters: "logging", "otel"
     DATABASE_URL - Optional (defaults to SQLite)
 """
 
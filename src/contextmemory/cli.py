@@ -0,0 +1,245 @@
+"""
+ContextMemory command line interface.
+
+Usage:
+    contextmemory index-server --socket /tmp/contextmemory-index.sock
+    contextmemory serve --port 8000
+    contextmemory reindex --all
+    contextmemory migrate-embeddings --from-model text-embedding-ada-002
+    contextmemory backfill transcripts.jsonl --workers 8
+"""
+
+import argparse
+import json
+from typing import List, Optional
+
+
+def _index_server(args: argparse.Namespace) -> None:
+    from contextmemory.server.index_daemon import serve
+
+    serve(args.socket, batch_window_ms=args.batch_window_ms, max_batch=args.max_batch)
+
+
+def _serve(args: argparse.Namespace) -> None:
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit(
+            "The HTTP service needs an ASGI server. Install it with: pip install 'contextmemory[server]'"
+        )
+    from contextmemory.server.app import create_app
+
+    app = create_app(
+        max_pending=args.max_pending,
+        workers=args.workers,
+        batch_window_ms=args.batch_window_ms,
+        max_batch=args.max_batch,
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+def _reindex(args: argparse.Namespace) -> None:
+    from contextmemory.db.database import SessionLocal
+    from contextmemory.memory.reindex import reembed_all
+
+    if not args.all and not args.conversation_id:
+        raise SystemExit("Pass --conversation-id (repeatable) or --all")
+
+    db = SessionLocal()
+    try:
+        counts = reembed_all(db, None if args.all else args.conversation_id, force=args.force)
+    finally:
+        db.close()
+    for conversation_id, count in counts.items():
+        print(f"Conversation {conversation_id}: re-embedded {count} memories")
+
+
+def _migrate_embeddings(args: argparse.Namespace) -> None:
+    from contextmemory.memory.embedding_space import EmbeddingSpace, clear_migration_state
+    from contextmemory.memory.reindex import EmbeddingMigration
+
+    if args.clear:
+        clear_migration_state()
+        print("Cleared embedding migration state")
+        return
+
+    source = EmbeddingSpace(args.from_model, args.from_dimensions) if args.from_model else None
+    migration = EmbeddingMigration(
+        source=source,
+        batch_size=args.batch_size,
+        requests_per_minute=args.requests_per_minute,
+    ).start()
+    try:
+        while not migration.wait(timeout=args.progress_interval):
+            if migration.error is not None:
+                break
+            print(migration.progress(), flush=True)
+    except KeyboardInterrupt:
+        print("Stopping after the current conversation (run again to resume)...")
+        migration.stop()
+    print(migration.progress())
+    if migration.error is not None:
+        raise SystemExit(f"Migration failed: {migration.error!r}")
+
+
+def _backfill(args: argparse.Namespace) -> None:
+    from contextmemory.memory.backfill import backfill_file
+
+    stats = backfill_file(
+        args.file,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        extraction_window=args.extraction_window,
+        progress=lambda progress: print(progress, flush=True),
+        progress_interval=args.progress_interval,
+    )
+    for error in stats.errors:
+        print(f"Failed: {error}")
+    if args.id_map:
+        with open(args.id_map, "w") as f:
+            json.dump(stats.conversation_ids, f, indent=2)
+    if stats.failed:
+        raise SystemExit(f"{stats.failed} transcript lines failed to import")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="contextmemory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_server = commands.add_parser(
+        "index-server",
+        help="Serve all vector indexes to local workers over a Unix socket",
+    )
+    index_server.add_argument("--socket", required=True, help="Unix socket path to listen on")
+    index_server.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=2.0,
+        help="Max time a search waits for others to batch with (default: 2.0)",
+    )
+    index_server.add_argument(
+        "--max-batch",
+        type=int,
+        default=64,
+        help="Max searches per FAISS batch (default: 64)",
+    )
+    index_server.set_defaults(handler=_index_server)
+
+    serve = commands.add_parser("serve", help="Run the HTTP service")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    serve.add_argument(
+        "--max-pending",
+        type=int,
+        default=256,
+        help="Requests in flight before answering 503 (default: 256)",
+    )
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=15,
+        help="Threads running memory operations (default: 15)",
+    )
+    serve.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=2.0,
+        help="Max time a search waits for others to batch with (default: 2.0)",
+    )
+    serve.add_argument(
+        "--max-batch",
+        type=int,
+        default=64,
+        help="Max searches per embeddings request / FAISS batch (default: 64)",
+    )
+    serve.set_defaults(handler=_serve)
+
+    reindex = commands.add_parser(
+        "reindex",
+        help="Re-embed memories at the configured embedding size and rebuild their indexes",
+    )
+    reindex.add_argument("--conversation-id", type=int, action="append", help="Conversation to migrate (repeatable)")
+    reindex.add_argument("--all", action="store_true", help="Migrate every conversation")
+    reindex.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-embed all memories, not only those of another size (e.g. after changing embedding_model)",
+    )
+    reindex.set_defaults(handler=_reindex)
+
+    migrate = commands.add_parser(
+        "migrate-embeddings",
+        help="Re-embed all memories with the configured embedding model/size without downtime",
+    )
+    migrate.add_argument("--from-model", help="Embedding model the existing memories were embedded with")
+    migrate.add_argument(
+        "--from-dimensions",
+        type=int,
+        help="embedding_dimensions the existing memories were embedded with (default: model size)",
+    )
+    migrate.add_argument(
+        "--batch-size",
+        type=int,
+        default=512,
+        help="Texts per embeddings request (default: 512)",
+    )
+    migrate.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=300,
+        help="Max embeddings requests per minute (default: 300)",
+    )
+    migrate.add_argument(
+        "--progress-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between progress reports (default: 10)",
+    )
+    migrate.add_argument(
+        "--clear",
+        action="store_true",
+        help="Forget a finished migration (once every worker is configured with the new model)",
+    )
+    migrate.set_defaults(handler=_migrate_embeddings)
+
+    backfill = commands.add_parser(
+        "backfill",
+        help="Import historical conversations from a JSONL transcript file",
+    )
+    backfill.add_argument("file", help="Transcript file, one conversation per line")
+    backfill.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Conversations imported concurrently (default: 4)",
+    )
+    backfill.add_argument(
+        "--chunk-size",
+        type=int,
+        default=32,
+        help="Turns per embeddings request (default: 32)",
+    )
+    backfill.add_argument(
+        "--extraction-window",
+        type=int,
+        help="Turns per extraction call (default: EXTRACTION_WINDOW, or 1)",
+    )
+    backfill.add_argument(
+        "--progress-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between progress reports (default: 10)",
+    )
+    backfill.add_argument("--id-map", help="Write the ids of conversations created for each key to this JSON file")
+    backfill.set_defaults(handler=_backfill)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
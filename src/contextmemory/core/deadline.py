@@ -0,0 +1,53 @@
+"""
+Per-call deadlines.
+
+search(timeout=...) and add(timeout=...) run under a deadline that every
+provider call made on their behalf respects: the rate limiter won't wait
+past it, retries and backoff stop at it, and each request's own timeout is
+cut to the time left (and to its stage's timeout, see settings.get_stage()).
+
+The deadline is kept in a context variable, so it follows the call on its
+thread. Work handed to other threads must carry it explicitly
+(contextvars.copy_context().run or remaining()).
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call runs out of its time budget."""
+
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("contextmemory_deadline", default=None)
+
+
+@contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Give the block at most `timeout` seconds (None = no limit).
+
+    Nested deadlines never extend an outer one.
+    """
+    if timeout is None:
+        yield
+        return
+    if timeout <= 0:
+        raise ValueError(f"timeout must be positive, got {timeout}")
+
+    until = time.monotonic() + timeout
+    outer = _deadline.get()
+    token = _deadline.set(until if outer is None else min(outer, until))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None = no deadline)."""
+    until = _deadline.get()
+    return None if until is None else until - time.monotonic()
+
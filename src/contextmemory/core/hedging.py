@@ -0,0 +1,165 @@
+"""
+Request hedging for embeddings calls.
+
+A slow embeddings request holds up the search waiting on it. With hedging
+enabled (settings.hedge_embeddings), a request still unanswered after the
+recent p95 latency (or settings.hedge_delay_ms) gets a duplicate, and
+whichever answers first is used. Embeddings requests are idempotent, so
+the loser is simply discarded. Roughly 5% of requests are duplicated.
+
+Duplicates only go out when the rate limiter has budget to spare right
+away; they never queue behind other callers.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+import time
+
+import numpy as np
+
+from contextmemory.core.deadline import DeadlineExceeded, remaining
+from contextmemory.core.settings import get_settings
+
+# Latencies kept for the p95 estimate, and how many are needed before hedging
+LATENCY_WINDOW = 500
+MIN_SAMPLES = 20
+
+# Threads running hedged requests
+HEDGE_WORKERS = 32
+
+
+class Hedger:
+    """
+    Runs calls with a hedge after a latency percentile.
+
+    Args:
+        delay_ms: Fixed hedge delay (None = p95 of recent latencies)
+        percentile: Latency percentile to hedge after
+    """
+
+    def __init__(self, delay_ms: Optional[float] = None, percentile: float = 95.0):
+        self.delay_ms = delay_ms
+        self.percentile = percentile
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="contextmemory-hedge")
+
+        # Stats
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging (None = not enough samples yet)."""
+        if self.delay_ms is not None:
+            return self.delay_ms / 1000
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            return float(np.percentile(self._latencies, self.percentile))
+
+    def _timed(self, fn: Callable[[], Any]) -> Any:
+        start = time.monotonic()
+        result = fn()
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+        return result
+
+    def call(self, fn: Callable[[], Any], may_hedge: Callable[[], bool] = lambda: True) -> Any:
+        """
+        Run fn, hedging it with a second fn() if it's slow.
+
+        Args:
+            fn: The request (must be safe to send twice)
+            may_hedge: Asked before sending the duplicate; False skips it
+        """
+        with self._lock:
+            self.calls += 1
+
+        delay = self.delay()
+        if delay is None:
+            return self._timed(fn)
+
+        left = remaining()
+        primary = self._executor.submit(self._timed, fn)
+        done, _ = wait([primary], timeout=delay if left is None else min(delay, max(left, 0)))
+        if done:
+            return primary.result()
+
+        if (left is not None and left <= delay) or not may_hedge():
+            # No time or budget for a duplicate
+            with self._lock:
+                self.hedges_skipped += 1
+            return self._result(primary)
+
+        hedge = self._executor.submit(self._timed, fn)
+        with self._lock:
+            self.hedged += 1
+
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            left = remaining()
+            done, pending = wait(pending, timeout=None if left is None else max(left, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded("Deadline exceeded waiting for embeddings")
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _result(self, future: Future) -> Any:
+        left = remaining()
+        done, _ = wait([future], timeout=None if left is None else max(left, 0))
+        if not done:
+            raise DeadlineExceeded("Deadline exceeded waiting for embeddings")
+        return future.result()
+
+    def stats(self) -> Dict:
+        delay = self.delay()
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+        }
+
+
+# Global hedger (lazy initialized)
+_hedger: Optional[Hedger] = None
+_hedger_guard = threading.Lock()
+
+
+def get_hedger() -> Optional[Hedger]:
+    """The process-wide embeddings hedger, or None if hedging is off."""
+    global _hedger
+    settings = get_settings()
+    if not settings.hedge_embeddings:
+        return None
+    if _hedger is None:
+        with _hedger_guard:
+            if _hedger is None:
+                _hedger = Hedger(delay_ms=settings.hedge_delay_ms)
+    return _hedger
+
+
+def get_hedging_stats() -> Dict:
+    """How often embeddings requests were hedged and how often the hedge won."""
+    hedger = get_hedger()
+    return hedger.stats() if hedger is not None else {"enabled": False}
+
+
+def reset_hedger() -> None:
+    """Drop the hedger and its latency history. Useful for testing."""
+    global _hedger
+    _hedger = None
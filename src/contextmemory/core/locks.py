@@ -0,0 +1,167 @@
+"""
+Locking primitives shared across ContextMemory.
+
+- ReadWriteLock: many concurrent readers or one exclusive writer
+- conversation_lock(): per-conversation mutex serializing write pipelines
+- hold_conversation_lock(): conversation_lock() bounded by the current deadline
+- file_lock(): cross-process advisory lock on a file
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from contextmemory.core.deadline import DeadlineExceeded, remaining
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class ReadWriteLock:
+    """
+    A reader/writer lock.
+
+    Any number of readers may hold the lock at once; a writer holds it
+    exclusively. Waiting writers block new readers, so a steady stream of
+    reads cannot starve writes. Not reentrant.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self) -> None:
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the lock shared for the duration of the block."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock exclusively for the duration of the block."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+# One reentrant mutex per conversation
+_conversation_locks: Dict[int, threading.RLock] = {}
+_conversation_locks_guard = threading.Lock()
+
+
+def conversation_lock(conversation_id: int) -> threading.RLock:
+    """
+    Get the write mutex for a conversation.
+
+    Held around whole write pipelines (add, update, delete, index rebuild)
+    so two threads never interleave read-modify-write sequences on the same
+    conversation. Reentrant, so nested write helpers can take it again.
+    Different conversations never contend.
+    """
+    lock = _conversation_locks.get(conversation_id)
+    if lock is None:
+        with _conversation_locks_guard:
+            lock = _conversation_locks.setdefault(conversation_id, threading.RLock())
+    return lock
+
+
+@contextmanager
+def hold_conversation_lock(conversation_id: int) -> Iterator[None]:
+    """
+    Hold conversation_lock() for the block, waiting no longer than the
+    current deadline (core.deadline).
+
+    Raises:
+        DeadlineExceeded: If the deadline passes while another write holds the lock
+    """
+    lock = conversation_lock(conversation_id)
+    left = remaining()
+    if not lock.acquire(timeout=-1 if left is None else max(left, 0)):
+        raise DeadlineExceeded(f"Deadline exceeded waiting for conversation {conversation_id}'s write lock")
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+# Poll interval of file_lock() with a timeout (flock itself can't time out)
+FILE_LOCK_POLL_SECONDS = 0.01
+
+
+@contextmanager
+def file_lock(path: str, exclusive: bool = True, timeout: Optional[float] = None) -> Iterator[None]:
+    """
+    Hold a cross-process advisory lock on path for the duration of the block.
+
+    The lock file is created if missing. Shared locks (exclusive=False)
+    coexist with each other but not with an exclusive lock. Falls back to
+    a no-op on platforms without fcntl.
+
+    Args:
+        path: Lock file
+        exclusive: False for a shared lock
+        timeout: Seconds to wait for the lock (None = as long as it takes)
+
+    Raises:
+        TimeoutError: If the lock isn't free within timeout
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with open(path, "a+") as f:
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if timeout is None:
+            fcntl.flock(f.fileno(), operation)
+        else:
+            until = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(f.fileno(), operation | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    left = until - time.monotonic()
+                    if left <= 0:
+                        raise TimeoutError(f"Timed out after {timeout}s waiting for lock on {path}") from None
+                    time.sleep(min(FILE_LOCK_POLL_SECONDS, left))
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,576 @@
+"""
+Pipeline metrics: where the time of add() and search() goes.
+
+With settings.metrics_enabled, every stage of the pipeline (extraction,
+summaries, embeddings, similar-memory and FAISS searches, classification,
+DB commits, index saves, ...) runs in a span() that records its duration
+in the contextmemory_stage_seconds histogram. LLM and embeddings calls
+count requests and tokens per model, and index sizes are read whenever
+the metrics are collected.
+
+Metrics are kept in a MetricsRegistry and leave the process through
+exporters:
+
+- PrometheusExporter: text exposition format (GET /metrics of the HTTP
+  service, or render_prometheus())
+- LoggingExporter: a log record per span and a summary per export_metrics()
+- OpenTelemetryExporter: spans and instruments through the OpenTelemetry
+  API (pip install 'contextmemory[otel]'), so traces nest under the
+  caller's own spans
+
+Disabled (the default), span() returns a shared no-op and the recording
+functions return right away; the only cost is a settings lookup.
+"""
+
+import bisect
+import functools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from contextmemory.core.settings import METRICS_EXPORTERS, get_settings
+
+# Histogram buckets (seconds): from a FAISS lookup to a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Metric names
+STAGE_SECONDS = "contextmemory_stage_seconds"
+STAGE_ERRORS = "contextmemory_stage_errors_total"
+LLM_CALLS = "contextmemory_llm_calls_total"
+LLM_TOKENS = "contextmemory_llm_tokens_total"
+INDEX_CONVERSATIONS = "contextmemory_index_conversations"
+INDEX_VECTORS = "contextmemory_index_vectors"
+INDEX_SEGMENTS = "contextmemory_index_segments_loaded"
+
+HELP = {
+    STAGE_SECONDS: "Duration of pipeline stages in seconds",
+    STAGE_ERRORS: "Pipeline stages that raised",
+    LLM_CALLS: "LLM and embeddings requests",
+    LLM_TOKENS: "Tokens reported by LLM and embeddings responses",
+    INDEX_CONVERSATIONS: "Conversation indexes loaded in this process",
+    INDEX_VECTORS: "Vectors in the loaded conversation indexes",
+    INDEX_SEGMENTS: "Index segments held in memory",
+}
+
+# Sorted (name, value) label pairs
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Metric:
+    """A named metric with one value per label set."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, Any] = {}
+        self._lock = threading.Lock()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1.0, labels: Labels = ()) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def samples(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram(Metric):
+    """
+    Counts of observations per bucket, with their sum, count and max.
+
+    Args:
+        buckets: Upper bounds, ascending (an implicit +Inf bucket follows)
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0, "max": 0.0}
+            state["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            state["sum"] += value
+            state["count"] += 1
+            state["max"] = max(state["max"], value)
+
+    def samples(self) -> Dict[Labels, Dict]:
+        """Per label set: cumulative bucket counts (le -> count), sum, count and max."""
+        with self._lock:
+            result = {}
+            for labels, state in self._values.items():
+                cumulative, total = [], 0
+                for bound, count in zip(self.buckets + (float("inf"),), state["counts"]):
+                    total += count
+                    cumulative.append((bound, total))
+                result[labels] = {"buckets": cumulative, "sum": state["sum"], "count": state["count"], "max": state["max"]}
+            return result
+
+
+class Span:
+    """
+    A timed stage. Use through span(); records its duration and whether it raised.
+
+    Exporters may keep per-span state in span.data.
+    """
+
+    __slots__ = ("registry", "name", "labels", "start", "duration", "error", "data")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.data: Dict[int, Any] = {}
+
+    def __enter__(self) -> "Span":
+        for exporter in self.registry.exporters:
+            exporter.span_started(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.perf_counter() - self.start
+        # A generator closed mid-span (its consumer stopped early) didn't fail
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.error = exc_type.__name__
+        _record_stage(self.registry, self.name, self.labels, self.duration, self.error)
+        for exporter in self.registry.exporters:
+            exporter.span_ended(self)
+        return False
+
+
+def _record_stage(registry: "MetricsRegistry", stage: str, labels: Labels, seconds: float, error: Optional[str]) -> None:
+    labels = (("stage", stage),) + labels
+    registry.observe(STAGE_SECONDS, seconds, labels)
+    if error is not None:
+        registry.increment(STAGE_ERRORS, 1, labels + (("error", error),))
+
+
+class _NoopSpan:
+    """What span() returns with metrics disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Exporter:
+    """Base class of exporters; every hook is optional."""
+
+    def bind(self, registry: "MetricsRegistry") -> None:
+        """Called once when added to a registry."""
+
+    def span_started(self, span: Span) -> None:
+        pass
+
+    def span_ended(self, span: Span) -> None:
+        pass
+
+    def recorded(self, metric: Metric, value: float, labels: Labels) -> None:
+        """A counter was incremented or a histogram observed."""
+
+    def export(self, registry: "MetricsRegistry") -> None:
+        """Push the current values (export_metrics())."""
+
+
+class MetricsRegistry:
+    """
+    Metrics by name, and the exporters they're sent to.
+
+    Metrics are created on first use. Collectors (register_collector())
+    refresh gauges that are cheaper to read on demand, like index sizes,
+    whenever collect() is called.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+        self.exporters: List[Exporter] = []
+
+    def _get(self, name: str, cls, **kwargs) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, HELP.get(name, ""), **kwargs)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name!r} is a {metric.kind}, not a {cls.kind}")
+        return metric
+
+    def counter(self, name: str) -> Counter:
+        return self._get(name, Counter)
+
+    def gauge(self, name: str) -> Gauge:
+        return self._get(name, Gauge)
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(name, Histogram, buckets=buckets)
+
+    def increment(self, name: str, value: float, labels: Labels = ()) -> None:
+        metric = self.counter(name)
+        metric.inc(value, labels)
+        for exporter in self.exporters:
+            exporter.recorded(metric, value, labels)
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        metric = self.histogram(name)
+        metric.observe(value, labels)
+        for exporter in self.exporters:
+            exporter.recorded(metric, value, labels)
+
+    def set_gauge(self, name: str, value: float, labels: Labels = ()) -> None:
+        self.gauge(name).set(value, labels)
+
+    def add_exporter(self, exporter: Exporter) -> None:
+        exporter.bind(self)
+        self.exporters.append(exporter)
+
+    def collect(self) -> List[Metric]:
+        """Run the collectors; returns every metric, sorted by name."""
+        for collector in list(_collectors):
+            collector(self)
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+
+# Exporters
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class PrometheusExporter(Exporter):
+    """Renders the registry in the Prometheus text exposition format (version 0.0.4)."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def render(self, registry: "MetricsRegistry") -> str:
+        lines = []
+        for metric in registry.collect():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, sample in sorted(metric.samples().items()):
+                if metric.kind != "histogram":
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(sample)}")
+                    continue
+                for bound, count in sample["buckets"]:
+                    bucket_labels = labels + (("le", _format_value(bound)),)
+                    lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {sample['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class LoggingExporter(Exporter):
+    """
+    Logs each span, and a line per metric on export_metrics().
+
+    Args:
+        logger: Logger to write to (default: "contextmemory.metrics")
+        span_level: Level of the per-span records
+        level: Level of the export summary
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None, span_level: int = logging.DEBUG, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("contextmemory.metrics")
+        self.span_level = span_level
+        self.level = level
+
+    def span_ended(self, span: Span) -> None:
+        if self.logger.isEnabledFor(self.span_level):
+            error = f" ({span.error})" if span.error else ""
+            self.logger.log(self.span_level, "%s%s took %.1f ms%s", span.name, _format_labels(span.labels), span.duration * 1000, error)
+
+    def export(self, registry: "MetricsRegistry") -> None:
+        for metric in registry.collect():
+            for labels, sample in sorted(metric.samples().items()):
+                if metric.kind == "histogram":
+                    mean = sample["sum"] / sample["count"] if sample["count"] else 0.0
+                    self.logger.log(
+                        self.level, "%s%s count=%d mean=%.4f max=%.4f",
+                        metric.name, _format_labels(labels), sample["count"], mean, sample["max"],
+                    )
+                else:
+                    self.logger.log(self.level, "%s%s %s", metric.name, _format_labels(labels), _format_value(sample))
+
+
+class OpenTelemetryExporter(Exporter):
+    """
+    Sends spans and metrics through the OpenTelemetry API.
+
+    Spans become OpenTelemetry spans (children of whatever span is current),
+    counters and histograms become instruments of the "contextmemory" meter
+    and gauges observable gauges. Where they end up is up to the configured
+    OpenTelemetry SDK; without one, the API discards them.
+
+    Args:
+        tracer_provider: Default: the global tracer provider
+        meter_provider: Default: the global meter provider
+
+    Raises:
+        ImportError: If opentelemetry-api is not installed
+    """
+
+    def __init__(self, tracer_provider=None, meter_provider=None):
+        try:
+            from opentelemetry import context, metrics, trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryExporter requires opentelemetry-api: pip install 'contextmemory[otel]'"
+            ) from e
+        self._context = context
+        self._trace = trace
+        self._metrics = metrics
+        self._tracer = trace.get_tracer("contextmemory", tracer_provider=tracer_provider)
+        self._meter = metrics.get_meter("contextmemory", meter_provider=meter_provider)
+        self._instruments: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def bind(self, registry: "MetricsRegistry") -> None:
+        # Gauges are read on collection; create the ones collectors know about
+        for metric in registry.collect():
+            if metric.kind == "gauge":
+                self._meter.create_observable_gauge(
+                    metric.name, callbacks=[self._observe_gauge(registry, metric.name)], description=metric.help
+                )
+
+    def _observe_gauge(self, registry: "MetricsRegistry", name: str) -> Callable:
+        def callback(options):
+            registry.collect()
+            return [
+                self._metrics.Observation(value, dict(labels))
+                for labels, value in registry.gauge(name).samples().items()
+            ]
+        return callback
+
+    def span_started(self, span: Span) -> None:
+        otel_span = self._tracer.start_span(span.name, attributes=dict(span.labels))
+        token = self._context.attach(self._trace.set_span_in_context(otel_span))
+        span.data[id(self)] = (otel_span, token)
+
+    def span_ended(self, span: Span) -> None:
+        otel_span, token = span.data.pop(id(self))
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end()
+        self._context.detach(token)
+
+    def recorded(self, metric: Metric, value: float, labels: Labels) -> None:
+        instrument = self._instruments.get(metric.name)
+        if instrument is None:
+            with self._lock:
+                instrument = self._instruments.get(metric.name)
+                if instrument is None:
+                    if metric.kind == "histogram":
+                        instrument = self._meter.create_histogram(metric.name, unit="s", description=metric.help)
+                    else:
+                        instrument = self._meter.create_counter(metric.name, description=metric.help)
+                    self._instruments[metric.name] = instrument
+        if metric.kind == "histogram":
+            instrument.record(value, attributes=dict(labels))
+        else:
+            instrument.add(value, attributes=dict(labels))
+
+
+def _make_exporter(name: str) -> Exporter:
+    if name == "logging":
+        return LoggingExporter()
+    if name == "otel":
+        return OpenTelemetryExporter()
+    raise ValueError(f"Unknown metrics exporter {name!r}, expected one of {METRICS_EXPORTERS}")
+
+
+# Collectors refreshing gauges on collect()
+_collectors: List[Callable[[MetricsRegistry], None]] = []
+
+
+def register_collector(collector: Callable[[MetricsRegistry], None]) -> None:
+    """Run collector(registry) whenever metrics are collected, e.g. to set gauges."""
+    _collectors.append(collector)
+
+
+# Global registry (lazy initialized)
+_registry: Optional[MetricsRegistry] = None
+_registry_guard = threading.Lock()
+
+
+def get_metrics() -> Optional[MetricsRegistry]:
+    """The process-wide metrics registry, or None if metrics are off."""
+    global _registry
+    settings = get_settings()
+    if not settings.metrics_enabled:
+        return None
+    if _registry is None:
+        with _registry_guard:
+            if _registry is None:
+                registry = MetricsRegistry()
+                for name in settings.metrics_exporters or ():
+                    registry.add_exporter(_make_exporter(name))
+                _registry = registry
+    return _registry
+
+
+def span(stage: str, **labels: Any):
+    """
+    Time a pipeline stage.
+
+    Example:
+        >>> with span("extraction"):
+        ...     result = extract_memories(...)
+
+    Args:
+        stage: Stage name (the "stage" label of contextmemory_stage_seconds)
+        labels: Extra labels, e.g. model="gpt-4o-mini"
+    """
+    registry = get_metrics()
+    if registry is None:
+        return _NOOP_SPAN
+    return Span(registry, stage, _labels(labels) if labels else ())
+
+
+def timed(stage: str) -> Callable:
+    """Decorator running a function in span(stage)."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            registry = get_metrics()
+            if registry is None:
+                return fn(*args, **kwargs)
+            with Span(registry, stage, ()):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_stage(stage: str, seconds: float, error: Optional[str] = None, **labels: Any) -> None:
+    """
+    Record a stage timed by hand, as span() would (no-op with metrics off).
+
+    For stages whose time is interleaved with other work, like a streamed
+    reply read between the caller's own stages. Exporters see the
+    observation but no span.
+
+    Args:
+        stage: Stage name
+        seconds: Time spent in the stage
+        error: Exception class name if the stage raised
+        labels: Extra labels, e.g. model="gpt-4o-mini"
+    """
+    registry = get_metrics()
+    if registry is not None:
+        _record_stage(registry, stage, _labels(labels) if labels else (), seconds, error)
+
+
+def increment(name: str, value: float = 1, **labels: Any) -> None:
+    """Add to a counter (no-op with metrics off)."""
+    registry = get_metrics()
+    if registry is not None:
+        registry.increment(name, value, _labels(labels))
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Record a histogram observation (no-op with metrics off)."""
+    registry = get_metrics()
+    if registry is not None:
+        registry.observe(name, value, _labels(labels))
+
+
+def record_usage(kind: str, model: str, response: Any) -> None:
+    """Count one LLM ("chat") or embeddings request and the tokens its response reports."""
+    registry = get_metrics()
+    if registry is None:
+        return
+    registry.increment(LLM_CALLS, 1, _labels({"kind": kind, "model": model}))
+    usage = getattr(response, "usage", None)
+    for token_type in ("prompt_tokens", "completion_tokens"):
+        tokens = getattr(usage, token_type, None)
+        if isinstance(tokens, int) and tokens:
+            registry.increment(LLM_TOKENS, tokens, _labels({"kind": kind, "model": model, "type": token_type[:-7]}))
+
+
+def render_prometheus() -> str:
+    """The metrics in the Prometheus text format ("" with metrics off)."""
+    registry = get_metrics()
+    return PrometheusExporter().render(registry) if registry is not None else ""
+
+
+def export_metrics() -> None:
+    """Push the current metrics through every exporter (e.g. periodically, or at exit)."""
+    registry = get_metrics()
+    if registry is not None:
+        for exporter in registry.exporters:
+            exporter.export(registry)
+
+
+def get_metrics_summary() -> Dict[str, Dict]:
+    """Count, mean and max seconds per stage."""
+    registry = get_metrics()
+    if registry is None:
+        return {}
+    summary = {}
+    for labels, sample in registry.histogram(STAGE_SECONDS).samples().items():
+        labels = dict(labels)
+        name = ",".join([labels.pop("stage")] + [f"{key}={value}" for key, value in labels.items()])
+        summary[name] = {
+            "count": sample["count"],
+            "mean_seconds": round(sample["sum"] / sample["count"], 6) if sample["count"] else 0.0,
+            "max_seconds": round(sample["max"], 6),
+        }
+    return summary
+
+
+def reset_metrics() -> None:
+    """Drop the registry and its values. Useful for testing."""
+    global _registry
+    _registry = None
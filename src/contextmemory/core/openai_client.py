@@ -4,14 +4,21 @@ LLM client management with lazy initialization.
 Supports multiple providers:
 - openai: Direct OpenAI API
 - openrouter: OpenRouter API (OpenAI-compatible)
+
+Clients don't retry on their own (max_retries=0): retries and backoff are
+done by the shared rate limiter (core.rate_limiter), which every call
+goes through. Every client has a finite request timeout: its stage's
+(settings.get_stage()) or settings.embedding_timeout.
 """
 
+from typing import Dict
 from openai import OpenAI
-from contextmemory.core.settings import get_settings
+from contextmemory.core.settings import STAGES, Stage, get_settings
 
 # Global clients (lazy initialized)
 _llm_client = None
 _embedding_client = None
+_stage_clients: Dict[str, OpenAI] = {}
 
 
 def get_llm_client() -> OpenAI:
@@ -30,18 +37,22 @@ def get_llm_client() -> OpenAI:
     if _llm_client is None:
         settings = get_settings()
         settings.validate()
+        # Stage clients set their own; this covers direct use of the base client
+        timeout = max(settings.get_stage(stage).timeout for stage in STAGES)
         
         if settings.llm_provider == "openrouter":
             _llm_client = OpenAI(
                 api_key=settings.openrouter_api_key,
                 base_url="https://openrouter.ai/api/v1",
+                max_retries=0,
+                timeout=timeout,
                 default_headers={
                     "HTTP-Referer": "https://github.com/contextmemory",
                     "X-Title": "ContextMemory"
                 }
             )
         else:
-            _llm_client = OpenAI(api_key=settings.openai_api_key)
+            _llm_client = OpenAI(api_key=settings.openai_api_key, max_retries=0, timeout=timeout)
     
     return _llm_client
 
@@ -68,6 +79,8 @@ def get_embedding_client() -> OpenAI:
             _embedding_client = OpenAI(
                 api_key=settings.openrouter_api_key,
                 base_url="https://openrouter.ai/api/v1",
+                max_retries=0,
+                timeout=settings.embedding_timeout,
                 default_headers={
                     "HTTP-Referer": "https://github.com/contextmemory",
                     "X-Title": "ContextMemory"
@@ -75,7 +88,9 @@ def get_embedding_client() -> OpenAI:
             )
         elif settings.openai_api_key:
             # Fallback to OpenAI
-            _embedding_client = OpenAI(api_key=settings.openai_api_key)
+            _embedding_client = OpenAI(
+                api_key=settings.openai_api_key, max_retries=0, timeout=settings.embedding_timeout
+            )
         else:
             raise RuntimeError(
                 "API key required for embeddings. "
@@ -85,6 +100,23 @@ def get_embedding_client() -> OpenAI:
     return _embedding_client
 
 
+def get_stage_client(stage: Stage) -> OpenAI:
+    """
+    Get or create the client for one LLM stage ("extraction", "classification", "summary").
+    
+    Each stage gets its own client instance carrying its request timeout
+    (settings.get_stage()). All share the LLM client's connection pool.
+    
+    Returns:
+        OpenAI-compatible client instance
+    """
+    client = _stage_clients.get(stage)
+    if client is None:
+        client = get_llm_client().with_options(timeout=get_settings().get_stage(stage).timeout)
+        _stage_clients[stage] = client
+    return client
+
+
 # Backward compatibility alias
 def get_openai_client() -> OpenAI:
     """
@@ -102,4 +134,5 @@ def reset_client() -> None:
     """
     global _llm_client, _embedding_client
     _llm_client = None
-    _embedding_client = None
\ No newline at end of file
+    _embedding_client = None
+    _stage_clients.clear()
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""
+Token-budgeted prompt assembly.
+
+Extraction, classification and summary prompts are built from sections of
+unbounded size: the conversation summary, recent messages, the latest
+pair, similar memories, whole conversations. PromptBuilder gives each
+section a token budget and truncates what doesn't fit:
+
+- Text sections keep their start and end and cut the middle, at word
+  boundaries, with a marker saying how much was left out.
+- List sections (messages, memories) drop whole items from the far end
+  (oldest messages, least similar memories) and cap each item's length, so
+  one long pasted message can't crowd out the rest.
+
+Tokens are counted with tiktoken when it is installed
+(pip install 'contextmemory[tokens]'), otherwise estimated at about
+4 characters per token. Budgets default to DEFAULT_BUDGETS and can be
+changed per section with settings.prompt_budgets. Every prompt's size per
+section, and what was cut, is counted in get_prompt_stats().
+"""
+
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from contextmemory.core.settings import get_settings
+
+# Token budget per prompt section (sections without one are never truncated)
+DEFAULT_BUDGETS: Dict[str, int] = {
+    # extraction
+    "summary": 1000,
+    "recent_messages": 1500,
+    "latest_pair": 3000,
+    # classification
+    "candidate_fact": 300,
+    "similar_memories": 1200,
+    # summary
+    "conversation": 12000,
+}
+
+# Max tokens of one item of a list section
+DEFAULT_ITEM_BUDGETS: Dict[str, int] = {
+    "recent_messages": 400,
+    "similar_memories": 200,
+    "conversation": 400,
+}
+
+# Average characters per token when tiktoken isn't installed
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: Optional[str]):
+    """tiktoken encoding of a model, or None to estimate."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    name = (model or "").split("/")[-1]
+    try:
+        return tiktoken.encoding_for_model(name)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; estimate if that fails
+        if get_settings().debug:
+            print(f"[DEBUG] tiktoken unavailable for {name}, estimating tokens: {e}")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens of text for a model (estimated without tiktoken)."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Shorten text to about max_tokens by cutting out its middle.
+
+    The start and end are kept, cut back to word boundaries, around a
+    "[... N tokens omitted ...]" marker.
+    """
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+
+    # Room for the marker
+    keep = max(max_tokens - 12, 2)
+    head_tokens, tail_tokens = keep * 2 // 3, keep - keep * 2 // 3
+    encoding = _encoding(model)
+    if encoding is None:
+        head = text[:head_tokens * CHARS_PER_TOKEN]
+        tail = text[len(text) - tail_tokens * CHARS_PER_TOKEN:]
+    else:
+        ids = encoding.encode(text, disallowed_special=())
+        head = encoding.decode(ids[:head_tokens])
+        tail = encoding.decode(ids[len(ids) - tail_tokens:])
+
+    # Don't end or start mid-word
+    if " " in head.strip():
+        head = head.rstrip().rsplit(" ", 1)[0]
+    if " " in tail.strip():
+        tail = tail.lstrip().split(" ", 1)[1]
+    omitted = tokens - count_tokens(head, model) - count_tokens(tail, model)
+    return f"{head.rstrip()} [... {omitted} tokens omitted ...] {tail.lstrip()}"
+
+
+def get_budget(section: str) -> Optional[int]:
+    """Token budget of a section: settings.prompt_budgets, else DEFAULT_BUDGETS (None = unlimited)."""
+    overrides = get_settings().prompt_budgets or {}
+    if section in overrides:
+        return overrides[section]
+    return DEFAULT_BUDGETS.get(section)
+
+
+class PromptBuilder:
+    """
+    Fits the sections of one prompt into their token budgets and accounts for them.
+
+    Args:
+        stage: LLM stage the prompt is for ("extraction", "classification", "summary")
+        model: Model the prompt is for (picks the tokenizer)
+
+    Example:
+        >>> builder = PromptBuilder("extraction", stage.model)
+        >>> summary_text = builder.text("summary", summary_text)
+        >>> recent = builder.items("recent_messages", recent, keep="last")
+        >>> builder.record()
+        {'summary': 212, 'recent_messages': 1480}
+    """
+
+    def __init__(self, stage: str, model: Optional[str] = None):
+        self.stage = stage
+        self.model = model
+        self.tokens: Dict[str, int] = {}
+        self.truncated_tokens = 0
+        self.dropped_items = 0
+
+    def text(self, section: str, text: str, budget: Optional[int] = None) -> str:
+        """A text section, truncated to its budget."""
+        budget = budget if budget is not None else get_budget(section)
+        tokens = count_tokens(text, self.model)
+        if budget is not None and tokens > budget:
+            text = truncate(text, budget, self.model)
+            fitted = count_tokens(text, self.model)
+            self.truncated_tokens += tokens - fitted
+            tokens = fitted
+        self.tokens[section] = self.tokens.get(section, 0) + tokens
+        return text
+
+    def items(
+        self,
+        section: str,
+        items: List[str],
+        keep: str = "first",
+        item_budget: Optional[int] = None,
+    ) -> List[str]:
+        """
+        A list section: each item capped, then whole items dropped to fit the budget.
+
+        Args:
+            keep: "first" keeps items from the start (e.g. most similar
+                  memories first), "last" from the end (newest messages)
+            item_budget: Max tokens per item (default: DEFAULT_ITEM_BUDGETS)
+
+        Returns:
+            The kept items, in their original order
+        """
+        if keep not in ("first", "last"):
+            raise ValueError(f"keep must be 'first' or 'last', got {keep!r}")
+        budget = get_budget(section)
+        item_budget = item_budget if item_budget is not None else DEFAULT_ITEM_BUDGETS.get(section)
+        if budget is not None:
+            item_budget = min(item_budget or budget, budget)
+
+        ordered = items if keep == "first" else list(reversed(items))
+        kept = []
+        used = 0
+        for position, item in enumerate(ordered):
+            tokens = count_tokens(item, self.model)
+            if item_budget is not None and tokens > item_budget:
+                item = truncate(item, item_budget, self.model)
+                fitted = count_tokens(item, self.model)
+                self.truncated_tokens += tokens - fitted
+                tokens = fitted
+            if budget is not None and used + tokens > budget and kept:
+                rest = ordered[position + 1:]
+                self.dropped_items += 1 + len(rest)
+                self.truncated_tokens += tokens + sum(count_tokens(i, self.model) for i in rest)
+                break
+            kept.append(item)
+            used += tokens
+
+        self.tokens[section] = self.tokens.get(section, 0) + used
+        return kept if keep == "first" else list(reversed(kept))
+
+    @property
+    def total(self) -> int:
+        return sum(self.tokens.values())
+
+    def record(self) -> Dict[str, int]:
+        """Add this prompt to the stats; returns its tokens per section."""
+        _stats.record(self)
+        if get_settings().debug and (self.truncated_tokens or self.dropped_items):
+            print(
+                f"[DEBUG] {self.stage} prompt: {self.total} tokens, cut {self.truncated_tokens} "
+                f"tokens ({self.dropped_items} items dropped)"
+            )
+        return dict(self.tokens)
+
+
+class PromptStats:
+    """Prompt tokens per stage and section, and how much budgets cut."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict] = {}
+
+    def record(self, builder: PromptBuilder) -> None:
+        with self._lock:
+            stage = self._stages.setdefault(
+                builder.stage,
+                {"prompts": 0, "tokens": 0, "truncated_tokens": 0, "dropped_items": 0, "truncated_prompts": 0, "sections": {}},
+            )
+            stage["prompts"] += 1
+            stage["tokens"] += builder.total
+            stage["truncated_tokens"] += builder.truncated_tokens
+            stage["dropped_items"] += builder.dropped_items
+            if builder.truncated_tokens or builder.dropped_items:
+                stage["truncated_prompts"] += 1
+            for section, tokens in builder.tokens.items():
+                stage["sections"][section] = stage["sections"].get(section, 0) + tokens
+
+    def as_dict(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {
+                    **stage,
+                    "sections": dict(stage["sections"]),
+                    "avg_tokens": round(stage["tokens"] / stage["prompts"], 1),
+                }
+                for name, stage in self._stages.items()
+            }
+
+
+_stats = PromptStats()
+
+
+def get_prompt_stats() -> Dict[str, Dict]:
+    """Prompt tokens per stage and section, and how many were cut to fit budgets."""
+    return _stats.as_dict()
+
+
+def reset_prompt_stats() -> None:
+    """Clear the prompt stats. Useful for testing."""
+    global _stats
+    _stats = PromptStats()
@@ -0,0 +1,445 @@
+"""
+Process-wide rate limiting for LLM and embedding calls.
+
+Every chat completion and embeddings request goes through one RateLimiter
+(limited_chat_completion() / limited_embeddings()), which keeps a token
+bucket per (provider, model) with a requests-per-minute and a
+tokens-per-minute budget:
+
+- Callers wait for budget instead of sending requests the provider would
+  reject. Token use is estimated up front and corrected from the
+  response's usage.
+- Waiters are served by priority, then arrival: interactive work (search
+  query embeddings) goes ahead of background work (add() extraction,
+  classification, summaries, bulk imports). Code runs as BACKGROUND unless
+  wrapped in request_priority(INTERACTIVE).
+- A 429 pauses the whole bucket for the provider's Retry-After (or an
+  exponential backoff), so concurrent callers back off together instead
+  of each retrying on its own. Connection errors and 5xx responses are
+  retried with backoff as well; the OpenAI clients' own retries are off.
+
+Budgets come from settings.requests_per_minute / tokens_per_minute
+(applied to every model; None = unlimited) and set_rate_limit() for
+per-model limits.
+
+Calls made under a deadline (core.deadline) never wait, back off or run
+past it: they raise DeadlineExceeded instead, and each request's timeout
+is cut to the time left. Embeddings requests are hedged when
+settings.hedge_embeddings is on (core.hedging).
+
+With settings.metrics_enabled, each call (including its waits and
+retries) is timed as the "llm" stage, and its requests and tokens are
+counted (core.metrics).
+"""
+
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from contextmemory.core.deadline import DeadlineExceeded, remaining
+from contextmemory.core.hedging import get_hedger
+from contextmemory.core.metrics import record_usage, span
+from contextmemory.core.settings import get_settings
+
+# Priorities (lower goes first)
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Backoff after a 429 without Retry-After / a transient error: base * 2^attempt, capped
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Completion tokens assumed for a chat call until its usage is known
+DEFAULT_COMPLETION_TOKENS = 512
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("contextmemory_priority", default=BACKGROUND)
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run provider calls made in this block (on this thread) at the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class _Bucket:
+    """Request and token budgets of one (provider, model), refilled continuously."""
+
+    def __init__(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = requests_per_minute or 0.0
+        self.tokens = tokens_per_minute or 0.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiters: List[Tuple[int, int]] = []
+
+        # Stats
+        self.calls = 0
+        self.tokens_used = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.deadline_exceeded = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        self.updated = now
+        if self.requests_per_minute:
+            self.requests = min(self.requests_per_minute, self.requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self.tokens = min(self.tokens_per_minute, self.tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _cost(self, tokens: int) -> float:
+        # A request larger than the whole budget still goes through once the bucket is full
+        return min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0.0
+
+    def delay(self, tokens: int, now: float) -> float:
+        """Seconds until a request of this size fits (0 = now)."""
+        self._refill(now)
+        wait = max(0.0, self.paused_until - now)
+        if self.requests_per_minute and self.requests < 1:
+            wait = max(wait, (1 - self.requests) * 60 / self.requests_per_minute)
+        cost = self._cost(tokens)
+        if self.tokens_per_minute and self.tokens < cost:
+            wait = max(wait, (cost - self.tokens) * 60 / self.tokens_per_minute)
+        return wait
+
+    def take(self, tokens: int) -> None:
+        if self.requests_per_minute:
+            self.requests -= 1
+        self.tokens -= self._cost(tokens)
+        self.calls += 1
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token budget once a response reports its real usage."""
+        if self.tokens_per_minute:
+            self.tokens -= self._cost(actual) - self._cost(estimated)
+        self.tokens_used += actual
+
+
+class RateLimiter:
+    """
+    Token buckets per (provider, model) with a priority queue of waiters.
+
+    Args:
+        requests_per_minute: Default request budget of each model (None = unlimited)
+        tokens_per_minute: Default token budget of each model (None = unlimited)
+        max_retries: Retries of a call after a 429, connection error or 5xx
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 2,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self._limits: Dict[Tuple[str, str], Tuple[Optional[float], Optional[float]]] = {}
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+
+    def set_limit(
+        self,
+        provider: str,
+        model: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        """Set the budgets of one model (None = unlimited)."""
+        with self._cond:
+            self._limits[(provider, model)] = (requests_per_minute, tokens_per_minute)
+            self._buckets.pop((provider, model), None)
+            self._cond.notify_all()
+
+    def _bucket(self, key: Tuple[str, str]) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rpm, tpm = self._limits.get(key, (self.requests_per_minute, self.tokens_per_minute))
+            bucket = self._buckets[key] = _Bucket(rpm, tpm)
+        return bucket
+
+    def acquire(self, provider: str, model: str, tokens: int, priority: Optional[int] = None) -> None:
+        """
+        Block until a request of about `tokens` tokens may be sent.
+
+        Raises:
+            DeadlineExceeded: If the budget won't be there before the current deadline
+        """
+        priority = _priority.get() if priority is None else priority
+        entry = (priority, next(self._seq))
+        started = time.monotonic()
+
+        with self._cond:
+            bucket = self._bucket((provider, model))
+            heapq.heappush(bucket.waiters, entry)
+            try:
+                while True:
+                    wait = None
+                    # Only the highest-priority, longest-waiting caller may take budget
+                    if bucket.waiters[0] == entry:
+                        wait = bucket.delay(tokens, time.monotonic())
+                        if wait <= 0:
+                            bucket.take(tokens)
+                            bucket.wait_seconds += time.monotonic() - started
+                            return
+                    left = remaining()
+                    if left is not None:
+                        if left <= 0 or (wait is not None and wait > left):
+                            bucket.deadline_exceeded += 1
+                            raise DeadlineExceeded(f"Deadline exceeded waiting for {provider}/{model} rate limit")
+                        wait = left if wait is None else min(wait, left)
+                    self._cond.wait(wait)
+                    # set_limit() may have replaced the bucket
+                    if self._buckets.get((provider, model)) is not bucket:
+                        bucket.waiters.remove(entry)
+                        heapq.heapify(bucket.waiters)
+                        bucket = self._bucket((provider, model))
+                        heapq.heappush(bucket.waiters, entry)
+            finally:
+                if entry in bucket.waiters:
+                    bucket.waiters.remove(entry)
+                    heapq.heapify(bucket.waiters)
+                self._cond.notify_all()
+
+    def try_acquire(self, provider: str, model: str, tokens: int) -> bool:
+        """Take budget for a request only if it's free right now and nobody is waiting."""
+        with self._cond:
+            bucket = self._bucket((provider, model))
+            if bucket.waiters or bucket.delay(tokens, time.monotonic()) > 0:
+                return False
+            bucket.take(tokens)
+            return True
+
+    def settle(self, provider: str, model: str, estimated: int, actual: int) -> None:
+        with self._cond:
+            self._bucket((provider, model)).settle(estimated, actual)
+
+    def pause(self, provider: str, model: str, seconds: float) -> None:
+        """Hold every caller of a model for `seconds` (after a 429)."""
+        with self._cond:
+            bucket = self._bucket((provider, model))
+            bucket.paused_until = max(bucket.paused_until, time.monotonic() + seconds)
+            bucket.rate_limited += 1
+
+    def call(self, provider: str, model: str, tokens: int, fn: Callable[[], Any]) -> Any:
+        """
+        Run one provider request under the model's budget, retrying transient failures.
+
+        Args:
+            tokens: Estimated tokens of the request
+            fn: Sends the request; returns the response
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(provider, model, tokens)
+            try:
+                response = fn()
+            except RateLimitError as e:
+                delay = _retry_after(e) or _backoff(attempt)
+                self.pause(provider, model, delay)
+                if attempt == self.max_retries:
+                    raise
+                if get_settings().debug:
+                    print(f"[DEBUG] Rate limited by {provider} on {model}; pausing {delay:.1f}s")
+            except (APIConnectionError, InternalServerError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = _backoff(attempt)
+                left = remaining()
+                if left is not None and left <= delay:
+                    raise DeadlineExceeded(f"Deadline exceeded retrying {provider}/{model}") from e
+                time.sleep(delay)
+            else:
+                usage = getattr(response, "usage", None)
+                actual = getattr(usage, "total_tokens", None)
+                if isinstance(actual, int):
+                    self.settle(provider, model, tokens, actual)
+                return response
+            with self._cond:
+                self._bucket((provider, model)).retries += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-model counters: calls, tokens, 429s, retries, waiting callers, time spent waiting."""
+        with self._cond:
+            return {
+                f"{provider}/{model}": {
+                    "requests_per_minute": bucket.requests_per_minute,
+                    "tokens_per_minute": bucket.tokens_per_minute,
+                    "calls": bucket.calls,
+                    "tokens": bucket.tokens_used,
+                    "rate_limited": bucket.rate_limited,
+                    "retries": bucket.retries,
+                    "deadline_exceeded": bucket.deadline_exceeded,
+                    "waiting": len(bucket.waiters),
+                    "wait_seconds": round(bucket.wait_seconds, 3),
+                }
+                for (provider, model), bucket in self._buckets.items()
+            }
+
+
+def _retry_after(error: RateLimitError) -> Optional[float]:
+    """Delay the provider asked for, in seconds."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+# Global limiter (lazy initialized)
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_guard = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the process-wide rate limiter."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_guard:
+            if _rate_limiter is None:
+                settings = get_settings()
+                _rate_limiter = RateLimiter(
+                    requests_per_minute=settings.requests_per_minute,
+                    tokens_per_minute=settings.tokens_per_minute,
+                    max_retries=settings.llm_max_retries,
+                )
+    return _rate_limiter
+
+
+def set_rate_limit(
+    model: str,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    provider: Optional[str] = None,
+) -> None:
+    """
+    Set the budgets of one model, e.g. set_rate_limit("gpt-4o-mini", 5000, 2_000_000).
+
+    Args:
+        provider: "openai" or "openrouter" (default: settings.llm_provider)
+    """
+    get_rate_limiter().set_limit(provider or get_settings().llm_provider, model, requests_per_minute, tokens_per_minute)
+
+
+def get_rate_limit_stats() -> Dict[str, Dict]:
+    return get_rate_limiter().stats()
+
+
+def _embedding_provider() -> str:
+    settings = get_settings()
+    return "openrouter" if settings.llm_provider == "openrouter" and settings.openrouter_api_key else "openai"
+
+
+def _with_deadline(client, kwargs: Dict) -> Dict:
+    """kwargs with the request timeout cut to the time left before the deadline."""
+    left = remaining()
+    if left is None:
+        return kwargs
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before sending request")
+    # The client's own timeout: the stage's (settings.get_stage()) or embedding_timeout
+    timeout = kwargs.get("timeout", getattr(client, "timeout", None))
+    if isinstance(timeout, (int, float)):
+        left = min(left, timeout)
+    return {**kwargs, "timeout": left}
+
+
+def limited_chat_completion(client, **kwargs) -> Any:
+    """
+    client.chat.completions.create(**kwargs) under the shared rate limiter.
+
+    A streamed completion (stream=True) returns once the reply starts, so
+    the caller times reading it and calls record_usage() at the end (see
+    extractor.stream_memories()).
+    """
+    tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in kwargs.get("messages", []))
+    tokens += kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+
+    def send():
+        return get_rate_limiter().call(
+            get_settings().llm_provider,
+            kwargs["model"],
+            tokens,
+            lambda: client.chat.completions.create(**_with_deadline(client, kwargs)),
+        )
+
+    if kwargs.get("stream"):
+        return send()
+
+    with span("llm", kind="chat", model=kwargs["model"]):
+        response = send()
+    record_usage("chat", kwargs["model"], response)
+    return response
+
+
+def limited_embeddings(client, **kwargs) -> Any:
+    """
+    client.embeddings.create(**kwargs) under the shared rate limiter.
+
+    With settings.hedge_embeddings on, a request slower than the recent
+    p95 gets a duplicate, if the limiter has budget for it right away.
+    """
+    texts = kwargs["input"] if isinstance(kwargs["input"], list) else [kwargs["input"]]
+    tokens = sum(estimate_tokens(text) for text in texts)
+    provider, limiter = _embedding_provider(), get_rate_limiter()
+
+    def send():
+        return client.embeddings.create(**_with_deadline(client, kwargs))
+
+    hedger = get_hedger()
+    if hedger is None:
+        with span("llm", kind="embeddings", model=kwargs["model"]):
+            response = limiter.call(provider, kwargs["model"], tokens, send)
+        record_usage("embeddings", kwargs["model"], response)
+        return response
+
+    # Hedger threads don't inherit the caller's deadline; run each request in a copy of its context
+    context = contextvars.copy_context()
+
+    def send_hedged():
+        return hedger.call(
+            lambda: context.copy().run(send),
+            may_hedge=lambda: limiter.try_acquire(provider, kwargs["model"], tokens),
+        )
+
+    with span("llm", kind="embeddings", model=kwargs["model"]):
+        response = limiter.call(provider, kwargs["model"], tokens, send_hedged)
+    record_usage("embeddings", kwargs["model"], response)
+    return response
+
+
+def reset_rate_limiter() -> None:
+    """Drop the limiter and its per-model limits. Useful for testing."""
+    global _rate_limiter
+    _rate_limiter = None
@@ -11,12 +11,61 @@ Supports multiple LLM providers:
 """
 
 from dataclasses import dataclass
-from typing import Optional, Literal
+from typing import Dict, List, NamedTuple, Optional, Literal
 import os
 from dotenv import load_dotenv
 
 
 LLMProvider = Literal["openai", "openrouter"]
+ExtractionGateMode = Literal["off", "on", "shadow"]
+
+# LLM pipeline stages that can each use their own model, temperature and timeout
+Stage = Literal["extraction", "classification", "summary"]
+STAGES = ("extraction", "classification", "summary")
+
+# Exporters of pipeline metrics besides Prometheus (see core.metrics)
+MetricsExporter = Literal["logging", "otel"]
+METRICS_EXPORTERS = ("logging", "otel")
+
+# Temperatures each stage has always used
+DEFAULT_STAGE_TEMPERATURES = {"extraction": 0.1, "classification": 0.0, "summary": 0.2}
+
+# Request timeouts (seconds) unless configured: the OpenAI client's own
+# default is 10 minutes, long enough for one hung connection to stall add()
+DEFAULT_STAGE_TIMEOUTS = {"extraction": 60.0, "classification": 30.0, "summary": 60.0}
+DEFAULT_EMBEDDING_TIMEOUT = 30.0
+
+
+class StageSettings(NamedTuple):
+    """Model, temperature and request timeout (seconds) of one LLM stage."""
+
+    model: str
+    temperature: float
+    timeout: float
+
+# Native vector size per embedding model; other models need embedding_dimensions
+NATIVE_EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def native_embedding_dimensions(model: str) -> int:
+    """
+    Size of a model's vectors without a dimensions parameter.
+    
+    Raises:
+        ValueError: If the model's size isn't known (set embedding_dimensions)
+    """
+    # OpenRouter names carry a provider prefix ("openai/text-embedding-3-large")
+    size = NATIVE_EMBEDDING_DIMENSIONS.get(model.split("/")[-1])
+    if size is None:
+        raise ValueError(
+            f"Unknown vector size of embedding model {model!r}; set embedding_dimensions "
+            f"(known models: {', '.join(NATIVE_EMBEDDING_DIMENSIONS)})"
+        )
+    return size
 
 
 @dataclass
@@ -33,6 +82,62 @@ class ContextMemorySettings:
     llm_model: str = "anthropic/claude-sonnet-4.5"
     embedding_model: str = "text-embedding-3-small"
 
+    # Size of stored/indexed embeddings (None = the model's native size).
+    # text-embedding-3 models can return shortened vectors directly.
+    embedding_dimensions: Optional[int] = None
+
+    # Search result cache (entries, 0 disables)
+    search_cache_size: int = 1024
+    # Conversations whose summary and recent messages are kept in memory (LRU)
+    context_cache_size: int = 1024
+    # Conversations whose connection graph is kept in memory for graph expansion (LRU)
+    connection_graph_cache_size: int = 256
+
+    # Turns extracted per LLM call when importing history (1 = one call per turn)
+    extraction_window: int = 1
+    # Stream the extraction reply and store each memory as soon as it's generated
+    stream_extraction: bool = False
+
+    # Skip extraction on trivial turns: "off", "on", or "shadow" (measure only)
+    extraction_gate: ExtractionGateMode = "off"
+    # Saved HashedNgramClassifier the gate uses after its heuristics (None = heuristics only)
+    extraction_gate_model: Optional[str] = None
+
+    # Per-stage overrides (None = llm_model / the stage's default temperature and timeout).
+    # Classification (ADD/UPDATE/NOOP, once per fact) is much easier than
+    # extraction and can use a smaller, faster model.
+    extraction_model: Optional[str] = None
+    classification_model: Optional[str] = None
+    summary_model: Optional[str] = None
+    extraction_temperature: Optional[float] = None
+    classification_temperature: Optional[float] = None
+    summary_temperature: Optional[float] = None
+    extraction_timeout: Optional[float] = None
+    classification_timeout: Optional[float] = None
+    summary_timeout: Optional[float] = None
+    # Request timeout of embeddings calls (seconds)
+    embedding_timeout: float = DEFAULT_EMBEDDING_TIMEOUT
+
+    # Shared rate limiter budgets per (provider, model) (None = unlimited)
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    # Retries after a 429, connection error or 5xx (done by the rate limiter)
+    llm_max_retries: int = 2
+
+    # Token budgets of prompt sections, e.g. {"recent_messages": 800} (see core.prompt_builder)
+    prompt_budgets: Optional[Dict[str, int]] = None
+
+    # Duplicate embeddings requests slower than hedge_delay_ms (None = recent p95)
+    hedge_embeddings: bool = False
+    hedge_delay_ms: Optional[float] = None
+
+    # Time pipeline stages and count LLM calls/tokens (core.metrics)
+    metrics_enabled: bool = False
+    metrics_exporters: Optional[List[MetricsExporter]] = None
+
+    # Unix socket of a shared local index server (None = in-process indexes)
+    index_server_socket: Optional[str] = None
+
     def get_database_url(self) -> str:
         """
         Return database URL or default SQLite path.
@@ -67,6 +172,22 @@ class ContextMemorySettings:
                 )
             return self.openai_api_key
     
+    def get_stage(self, stage: Stage) -> StageSettings:
+        """Model, temperature and timeout an LLM stage runs with."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown LLM stage {stage!r}, expected one of {STAGES}")
+        temperature = getattr(self, f"{stage}_temperature")
+        timeout = getattr(self, f"{stage}_timeout")
+        return StageSettings(
+            model=getattr(self, f"{stage}_model") or self.llm_model,
+            temperature=DEFAULT_STAGE_TEMPERATURES[stage] if temperature is None else temperature,
+            timeout=DEFAULT_STAGE_TIMEOUTS[stage] if timeout is None else timeout,
+        )
+    
+    def get_embedding_dimensions(self) -> int:
+        """Size of the embedding vectors stored in the DB and indexes."""
+        return self.embedding_dimensions or native_embedding_dimensions(self.embedding_model)
+    
     def get_base_url(self) -> Optional[str]:
         """Get the base URL for the LLM provider."""
         if self.llm_provider == "openrouter":
@@ -105,6 +226,33 @@ def configure(
     openrouter_api_key: Optional[str] = None,
     llm_model: str = "gpt-4o-mini",
     embedding_model: str = "text-embedding-3-small",
+    embedding_dimensions: Optional[int] = None,
+    search_cache_size: int = 1024,
+    context_cache_size: int = 1024,
+    connection_graph_cache_size: int = 256,
+    index_server_socket: Optional[str] = None,
+    extraction_window: int = 1,
+    stream_extraction: bool = False,
+    extraction_gate: ExtractionGateMode = "off",
+    extraction_gate_model: Optional[str] = None,
+    extraction_model: Optional[str] = None,
+    classification_model: Optional[str] = None,
+    summary_model: Optional[str] = None,
+    extraction_temperature: Optional[float] = None,
+    classification_temperature: Optional[float] = None,
+    summary_temperature: Optional[float] = None,
+    extraction_timeout: Optional[float] = None,
+    classification_timeout: Optional[float] = None,
+    summary_timeout: Optional[float] = None,
+    embedding_timeout: float = DEFAULT_EMBEDDING_TIMEOUT,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+    llm_max_retries: int = 2,
+    prompt_budgets: Optional[Dict[str, int]] = None,
+    hedge_embeddings: bool = False,
+    hedge_delay_ms: Optional[float] = None,
+    metrics_enabled: bool = False,
+    metrics_exporters: Optional[List[MetricsExporter]] = None,
 ) -> None:
     """
     Initialize ContextMemory configuration.
@@ -118,6 +266,58 @@ def configure(
         openrouter_api_key: Required when llm_provider is "openrouter".
         llm_model: Model to use for LLM calls. Default: "gpt-4o-mini"
         embedding_model: Model to use for embeddings. Default: "text-embedding-3-small"
+        embedding_dimensions: Optional. Shorten embeddings to this many dimensions
+                              (text-embedding-3 models only, e.g. 256 or 512).
+                              Changing it requires re-embedding existing memories
+                              (contextmemory reindex). Required for models not in
+                              NATIVE_EMBEDDING_DIMENSIONS.
+        search_cache_size: Max cached search results and query embeddings (LRU).
+                           0 disables the caches.
+        context_cache_size: Conversations whose summary and recent messages
+                            are kept in memory for extraction (LRU).
+                            0 disables the cache.
+        connection_graph_cache_size: Conversations whose connection graph is
+                                     kept in memory for expansion="graph"
+                                     searches (LRU). 0 disables the cache.
+        index_server_socket: Optional. Unix socket of a running index server
+                             (contextmemory index-server). When set, vector
+                             indexes live in that process instead of this one.
+        extraction_window: Turns extracted per LLM call by add_many() and
+                           backfill (e.g. 8). Larger windows cut extraction
+                           calls and prompt tokens but need a longer context.
+        stream_extraction: Stream the extraction reply in add() and embed,
+                           classify and store each memory as soon as the
+                           LLM has written it. Default: False
+        extraction_gate: Skip the extraction call on trivial turns ("ok thanks").
+                         "off" (default), "on", or "shadow" to only measure
+                         what would be skipped (see memory.extraction_gate).
+        extraction_gate_model: Optional. Path of a saved HashedNgramClassifier
+                               the gate consults after its heuristics.
+        extraction_model / classification_model / summary_model: Optional.
+            Model for one LLM stage instead of llm_model, e.g. a small fast
+            model for classification (the ADD/UPDATE/NOOP decision per fact).
+        extraction_temperature / classification_temperature / summary_temperature:
+            Optional. Defaults: 0.1 / 0 / 0.2
+        extraction_timeout / classification_timeout / summary_timeout:
+            Optional. Request timeout of a stage in seconds. Defaults: 60 / 30 / 60
+        embedding_timeout: Request timeout of embeddings calls in seconds. Default: 30
+        requests_per_minute: Optional. Request budget per model, shared by
+                             every call in this process (see core.rate_limiter).
+        tokens_per_minute: Optional. Token budget per model.
+        llm_max_retries: Retries of an LLM/embeddings call after a rate limit,
+                         connection error or server error. Default: 2
+        prompt_budgets: Optional. Token budgets of prompt sections, overriding
+                        core.prompt_builder.DEFAULT_BUDGETS, e.g.
+                        {"summary": 500, "recent_messages": 800}.
+        hedge_embeddings: Send a duplicate of an embeddings request that is
+                          slower than usual and use whichever answers first
+                          (see core.hedging). Default: False
+        hedge_delay_ms: Optional. Fixed hedge delay instead of the p95 of
+                        recent embeddings latencies.
+        metrics_enabled: Record stage timings, LLM calls/tokens and index
+                         sizes (see core.metrics). Default: False
+        metrics_exporters: Optional. Where metrics go besides Prometheus:
+                           "logging" and/or "otel" (OpenTelemetry).
     
     Example:
         >>> from contextmemory import configure
@@ -133,6 +333,40 @@ def configure(
         ...     llm_model="openai/gpt-4o-mini"
         ... )
     """
+    if embedding_dimensions is not None and embedding_dimensions <= 0:
+        raise ValueError(f"embedding_dimensions must be positive, got {embedding_dimensions}")
+    if embedding_dimensions is None:
+        native_embedding_dimensions(embedding_model)
+    if extraction_window <= 0:
+        raise ValueError(f"extraction_window must be positive, got {extraction_window}")
+    if extraction_gate not in ("off", "on", "shadow"):
+        raise ValueError(f"extraction_gate must be 'off', 'on' or 'shadow', got {extraction_gate!r}")
+    for name, timeout in (
+        ("extraction_timeout", extraction_timeout),
+        ("classification_timeout", classification_timeout),
+        ("summary_timeout", summary_timeout),
+        ("embedding_timeout", embedding_timeout),
+    ):
+        if timeout is not None and timeout <= 0:
+            raise ValueError(f"{name} must be positive, got {timeout}")
+    for name, budget in (("requests_per_minute", requests_per_minute), ("tokens_per_minute", tokens_per_minute)):
+        if budget is not None and budget <= 0:
+            raise ValueError(f"{name} must be positive, got {budget}")
+    if llm_max_retries < 0:
+        raise ValueError(f"llm_max_retries must be >= 0, got {llm_max_retries}")
+    for section, budget in (prompt_budgets or {}).items():
+        if budget <= 0:
+            raise ValueError(f"prompt budget of {section!r} must be positive, got {budget}")
+    if hedge_delay_ms is not None and hedge_delay_ms <= 0:
+        raise ValueError(f"hedge_delay_ms must be positive, got {hedge_delay_ms}")
+    for exporter in metrics_exporters or ():
+        if exporter not in METRICS_EXPORTERS:
+            raise ValueError(f"Unknown metrics exporter {exporter!r}, expected one of {METRICS_EXPORTERS}")
+    if context_cache_size < 0:
+        raise ValueError(f"context_cache_size must be >= 0, got {context_cache_size}")
+    if connection_graph_cache_size < 0:
+        raise ValueError(f"connection_graph_cache_size must be >= 0, got {connection_graph_cache_size}")
+    
     global _settings
     _settings = ContextMemorySettings(
         openai_api_key=openai_api_key,
@@ -142,9 +376,53 @@ def configure(
         openrouter_api_key=openrouter_api_key,
         llm_model=llm_model,
         embedding_model=embedding_model,
+        embedding_dimensions=embedding_dimensions,
+        search_cache_size=search_cache_size,
+        context_cache_size=context_cache_size,
+        connection_graph_cache_size=connection_graph_cache_size,
+        index_server_socket=index_server_socket,
+        extraction_window=extraction_window,
+        stream_extraction=stream_extraction,
+        extraction_gate=extraction_gate,
+        extraction_gate_model=extraction_gate_model,
+        extraction_model=extraction_model,
+        classification_model=classification_model,
+        summary_model=summary_model,
+        extraction_temperature=extraction_temperature,
+        classification_temperature=classification_temperature,
+        summary_temperature=summary_temperature,
+        extraction_timeout=extraction_timeout,
+        classification_timeout=classification_timeout,
+        summary_timeout=summary_timeout,
+        embedding_timeout=embedding_timeout,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        llm_max_retries=llm_max_retries,
+        prompt_budgets=prompt_budgets,
+        hedge_embeddings=hedge_embeddings,
+        hedge_delay_ms=hedge_delay_ms,
+        metrics_enabled=metrics_enabled,
+        metrics_exporters=metrics_exporters,
     )
 
 
+def _env_float(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+def _env_budgets(name: str) -> Optional[Dict[str, int]]:
+    """Parse "summary=500,recent_messages=800" into a dict."""
+    value = os.environ.get(name)
+    if not value:
+        return None
+    budgets = {}
+    for entry in value.split(","):
+        section, _, budget = entry.partition("=")
+        budgets[section.strip()] = int(budget)
+    return budgets
+
+
 def get_settings() -> ContextMemorySettings:
     """
     Get current settings.
@@ -173,6 +451,21 @@ def get_settings() -> ContextMemorySettings:
         
         llm_model = os.environ.get("LLM_MODEL", "gpt-4o-mini")
         embedding_model = os.environ.get("EMBEDDING_MODEL", "text-embedding-3-small")
+        embedding_dimensions = int(os.environ["EMBEDDING_DIMENSIONS"]) if os.environ.get("EMBEDDING_DIMENSIONS") else None
+        search_cache_size = int(os.environ.get("SEARCH_CACHE_SIZE", "1024"))
+        index_server_socket = os.environ.get("INDEX_SERVER_SOCKET") or None
+        extraction_window = int(os.environ.get("EXTRACTION_WINDOW", "1"))
+        extraction_gate = os.environ.get("EXTRACTION_GATE", "off").lower()
+        if extraction_gate not in ("off", "on", "shadow"):
+            extraction_gate = "off"
+        extraction_gate_model = os.environ.get("EXTRACTION_GATE_MODEL") or None
+        
+        # Per-stage overrides: EXTRACTION_MODEL, CLASSIFICATION_TEMPERATURE, SUMMARY_TIMEOUT, ...
+        stage_settings = {}
+        for stage in STAGES:
+            stage_settings[f"{stage}_model"] = os.environ.get(f"{stage.upper()}_MODEL") or None
+            stage_settings[f"{stage}_temperature"] = _env_float(f"{stage.upper()}_TEMPERATURE")
+            stage_settings[f"{stage}_timeout"] = _env_float(f"{stage.upper()}_TIMEOUT")
         
         _settings = ContextMemorySettings(
             openai_api_key=openai_key,
@@ -182,6 +475,28 @@ def get_settings() -> ContextMemorySettings:
             openrouter_api_key=openrouter_key,
             llm_model=llm_model,
             embedding_model=embedding_model,
+            embedding_dimensions=embedding_dimensions,
+            search_cache_size=search_cache_size,
+            context_cache_size=int(os.environ.get("CONTEXT_CACHE_SIZE", "1024")),
+            connection_graph_cache_size=int(os.environ.get("CONNECTION_GRAPH_CACHE_SIZE", "256")),
+            index_server_socket=index_server_socket,
+            extraction_window=extraction_window,
+            stream_extraction=os.environ.get("STREAM_EXTRACTION", "").lower() in ("true", "1", "yes"),
+            extraction_gate=extraction_gate,
+            extraction_gate_model=extraction_gate_model,
+            embedding_timeout=_env_float("EMBEDDING_TIMEOUT") or DEFAULT_EMBEDDING_TIMEOUT,
+            requests_per_minute=_env_float("RATE_LIMIT_RPM"),
+            tokens_per_minute=_env_float("RATE_LIMIT_TPM"),
+            llm_max_retries=int(os.environ.get("LLM_MAX_RETRIES", "2")),
+            prompt_budgets=_env_budgets("PROMPT_BUDGETS"),
+            hedge_embeddings=os.environ.get("HEDGE_EMBEDDINGS", "").lower() in ("true", "1", "yes"),
+            hedge_delay_ms=_env_float("HEDGE_DELAY_MS"),
+            metrics_enabled=os.environ.get("METRICS_ENABLED", "").lower() in ("true", "1", "yes"),
+            metrics_exporters=[
+                name.strip() for name in os.environ.get("METRICS_EXPORTERS", "").split(",")
+                if name.strip() in METRICS_EXPORTERS
+            ] or None,
+            **stage_settings,
         )
     
     return _settings
@@ -5,7 +5,7 @@ Uses lazy initialization - engine is created only when first accessed.
 Supports both PostgreSQL and SQLite (default fallback).
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -86,14 +86,45 @@ def create_table():
     """
     try:
         import contextmemory.db.models
+        from contextmemory.memory.lexical_index import ensure_lexical_index
         
         Base.metadata.create_all(bind=get_engine())
+        add_missing_columns(get_engine())
+        ensure_lexical_index(get_engine())
         print("Tables created successfully")
     except Exception as e:
         print("Error while creating tables")
         raise e
 
 
+def add_missing_columns(engine) -> None:
+    """
+    Add nullable columns (and their indexes) that were introduced after a
+    table was first created.
+    
+    create_all() only creates missing tables, so databases from older
+    versions would otherwise lack new optional columns.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            added = [c for c in table.columns if c.name not in existing and c.nullable]
+            
+            for column in added:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            
+            if added:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
+
+
 def reset_engine():
     """
     Reset engine and session factory. Useful for testing.
@@ -4,6 +4,7 @@ from .conversation import Conversation
 from .message import Message, SenderEnum
 from .conversation_summary import ConversationSummary
 from .memory import Memory
+from .memory_connection import MemoryConnection
 
 __all__ = [
     "Base",
@@ -12,4 +13,5 @@ __all__ = [
     "SenderEnum",
     "ConversationSummary",
     "Memory",
+    "MemoryConnection",
 ]
\ No newline at end of file
@@ -0,0 +1,32 @@
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import Integer, Float, DateTime, ForeignKey, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from contextmemory.db.database import Base
+
+class MemoryConnection(Base):
+    """
+    memory_connections
+    ----------------------
+    src_id (PK, FK -> memories.id)
+    dst_id (PK, FK -> memories.id)
+    conversation_id (FK -> conversations.id)
+    score           (similarity between the two memories)
+    created_at
+
+    One row per directed edge. Bubble links are stored in both directions,
+    so expanding a memory's neighbours is a single indexed lookup on src_id.
+    """
+
+    __tablename__ = "memory_connections"
+    __table_args__ = (
+        Index("ix_memory_connections_dst_id", "dst_id"),
+        Index("ix_memory_connections_conversation_id", "conversation_id"),
+    )
+
+    src_id: Mapped[int] = mapped_column(Integer, ForeignKey("memories.id", ondelete="CASCADE"), primary_key=True)
+    dst_id: Mapped[int] = mapped_column(Integer, ForeignKey("memories.id", ondelete="CASCADE"), primary_key=True)
+    conversation_id: Mapped[int] = mapped_column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
@@ -1,15 +1,31 @@
-from typing import List
+from typing import Any, Callable, List, Optional
 import json
 from sqlalchemy.orm import Session
 
+from contextmemory.core.metrics import span, timed
 from contextmemory.db.models.message import Message, SenderEnum
-from contextmemory.db.models.conversation_summary import ConversationSummary
-from contextmemory.memory.extractor import extract_memories
+from contextmemory.memory.context_cache import format_message, get_context_cache
+from contextmemory.memory.extractor import extract_memories, stream_memories
+from contextmemory.memory.extraction_gate import observe_extraction, should_extract
 from contextmemory.summary.summary_generator import generate_conversation_summary
 
-def extraction_phase(db: Session, messages: List[dict], conversation_id: int):
+def extraction_phase(
+    db: Session,
+    messages: List[dict],
+    conversation_id: int,
+    on_memory: Optional[Callable[[str, Any], None]] = None,
+):
     """
     Extraction phase of ContextMemory add() - extracts both semantic facts and episodic bubbles
+    
+    The latest pair is committed before the extraction call, so it is
+    stored even if extraction fails or runs out of time.
+    
+    Args:
+        on_memory: Stream the extraction reply and call on_memory(kind, value)
+                   with each memory as soon as the LLM has written it - kind
+                   is "semantic" (value: fact) or "bubbles" (value: bubble
+                   dict). The returned lists hold the same memories.
     """
 
     # latest msg pair
@@ -19,39 +35,13 @@ def extraction_phase(db: Session, messages: List[dict], conversation_id: int):
     user_msg = messages[-2]
     assistant_msg = messages[-1]
 
-    latest_pair = [
-        f"{user_msg['role'].upper()}: {user_msg['content']}"
-        f"{assistant_msg['role'].upper()}: {assistant_msg['content']}"
-    ]
-
-    # db extract latest summary
-    summary_row = (
-        db.query(ConversationSummary)
-        .filter(ConversationSummary.conversation_id == conversation_id)
-        .one_or_none()
-    )
-    summary_text = summary_row.summary_text if summary_row else ""
-
-    # db extract 10 recent msgs
-    recent_messages = (
-        db.query(Message)
-        .filter(Message.conversation_id == conversation_id)
-        .order_by(Message.timestamp.desc())
-        .limit(10)
-        .all()
-    )
-    recent_messages_formatted = [
-        f"{msg.sender.upper()}: {msg.message_text}"
-        for msg in reversed(recent_messages)
-    ]
-
-    # Call extraction agent
-    extraction_result = extract_memories(
-        latest_pair=latest_pair,
-        summary_text=summary_text,
-        recent_messages=recent_messages_formatted,
-    )
+    # Cheap check before spending an LLM call on "ok thanks"
+    decision = should_extract(user_msg["content"], assistant_msg["content"])
 
+    # latest summary and 10 recent msgs, read before the pair joins them
+    # (cached; read from the db only for inactive conversations)
+    if decision.extract:
+        summary_text, recent_messages_formatted = get_context_cache().get(db, conversation_id)
 
     # add latest msg pair to the db
     db.add_all(
@@ -68,7 +58,21 @@ def extraction_phase(db: Session, messages: List[dict], conversation_id: int):
             ),
         ]
     )
-    db.commit()
+    with span("db_commit"):
+        db.commit()
+    get_context_cache().append_messages(
+        conversation_id,
+        [
+            format_message(SenderEnum.USER, user_msg["content"]),
+            format_message(SenderEnum.ASSISTANT, assistant_msg["content"]),
+        ],
+    )
+
+    if decision.extract:
+        extraction_result = _extract(user_msg, assistant_msg, summary_text, recent_messages_formatted, on_memory)
+        observe_extraction(user_msg["content"], decision, extraction_result)
+    else:
+        extraction_result = {"semantic": [], "bubbles": []}
 
     # to check db to update summary
     generate_conversation_summary(db, conversation_id)
@@ -78,4 +82,34 @@ def extraction_phase(db: Session, messages: List[dict], conversation_id: int):
     return {
         "semantic": extraction_result.get("semantic", []),
         "bubbles": extraction_result.get("bubbles", [])
-    }
\ No newline at end of file
+    }
+
+
+@timed("extraction")
+def _extract(
+    user_msg: dict,
+    assistant_msg: dict,
+    summary_text: str,
+    recent_messages_formatted: List[str],
+    on_memory: Optional[Callable[[str, Any], None]] = None,
+) -> dict:
+    """Run the extraction agent on the latest pair with the conversation's context."""
+    latest_pair = [
+        f"{user_msg['role'].upper()}: {user_msg['content']}"
+        f"{assistant_msg['role'].upper()}: {assistant_msg['content']}"
+    ]
+
+    # Call extraction agent
+    if on_memory is None:
+        return extract_memories(
+            latest_pair=latest_pair,
+            summary_text=summary_text,
+            recent_messages=recent_messages_formatted,
+        )
+    
+    # Hand each memory on while the rest are still being generated
+    result = {"semantic": [], "bubbles": []}
+    for kind, value in stream_memories(latest_pair, summary_text, recent_messages_formatted):
+        result[kind].append(value)
+        on_memory(kind, value)
+    return result
@@ -2,30 +2,47 @@
 Update Phase - Processes semantic facts using LLM-decided actions.
 """
 
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
+from contextmemory.core.metrics import span, timed
 from contextmemory.db.models.memory import Memory
-from contextmemory.memory.embeddings import embed_text
+from contextmemory.memory.embeddings import embed_texts
+from contextmemory.memory.embedding_space import embedding_space
 from contextmemory.memory.similar_memory_search import search_similar_memories
 from contextmemory.memory.tool_classifier import llm_tool_call
-from contextmemory.memory.vector_store import get_vector_store, save_vector_store
+from contextmemory.memory.connection_finder import remove_connections
+from contextmemory.memory.vector_store import get_vector_store, index_memory, save_vector_store
+from contextmemory.memory.search_cache import bump_generation
 from contextmemory.core.settings import get_settings
 
 
-def update_phase(db: Session, candidate_facts: List[str], conversation_id: int):
+@timed("update_phase")
+def update_phase(
+    db: Session,
+    candidate_facts: List[str],
+    conversation_id: int,
+    fact_embeddings: Optional[List[List[float]]] = None,
+    save_index: bool = True,
+):
     """
     Update phase of ContextMemory add().
     Executes LLM-selected actions and updates FAISS index.
+    
+    Args:
+        fact_embeddings: Precomputed embeddings of candidate_facts (bulk
+                         imports embed many turns in one request)
+        save_index: Save the FAISS index afterwards (bulk imports save once at the end)
     """
     settings = get_settings()
     vector_store = get_vector_store(conversation_id)
     
-    for fact in candidate_facts:
-
-        # Embed candidate facts
-        fact_embedding = embed_text(fact)
+    # Embed all candidate facts in one request
+    if fact_embeddings is None:
+        fact_embeddings = embed_texts(candidate_facts, embedding_space(conversation_id))
+    
+    for fact, fact_embedding in zip(candidate_facts, fact_embeddings):
 
         # Retrieve similar memories (top S = 10)
         similar_memories = search_similar_memories(
@@ -60,10 +77,11 @@ def update_phase(db: Session, candidate_facts: List[str], conversation_id: int):
                 updated_at=datetime.now(timezone.utc),
             )
             db.add(memory)
-            db.flush()  # Get ID before adding to FAISS
+            with span("db_flush"):
+                db.flush()  # Get ID before adding to FAISS
             
             # Add to FAISS index
-            vector_store.add(memory.id, fact_embedding)
+            index_memory(vector_store, memory)
             
             if settings.debug:
                 print(f"[DEBUG] Added memory ID {memory.id}")
@@ -79,7 +97,7 @@ def update_phase(db: Session, candidate_facts: List[str], conversation_id: int):
                 memory.updated_at = datetime.now(timezone.utc)
                 
                 # Add updated to FAISS
-                vector_store.add(memory.id, fact_embedding)
+                index_memory(vector_store, memory)
                 
                 if settings.debug:
                     print(f"[DEBUG] Updated memory ID {memory.id}")
@@ -89,6 +107,7 @@ def update_phase(db: Session, candidate_facts: List[str], conversation_id: int):
             if memory:
                 # Remove from FAISS
                 vector_store.remove(memory.id)
+                remove_connections(db, memory.id, conversation_id)
                 db.delete(memory)
                 
                 if settings.debug:
@@ -100,6 +119,7 @@ def update_phase(db: Session, candidate_facts: List[str], conversation_id: int):
             if old_memory:
                 # Remove old from FAISS and DB
                 vector_store.remove(old_memory.id)
+                remove_connections(db, old_memory.id, conversation_id)
                 db.delete(old_memory)
                 
                 if settings.debug:
@@ -115,10 +135,11 @@ def update_phase(db: Session, candidate_facts: List[str], conversation_id: int):
                 updated_at=datetime.now(timezone.utc),
             )
             db.add(new_memory)
-            db.flush()
+            with span("db_flush"):
+                db.flush()
             
             # Add to FAISS index
-            vector_store.add(new_memory.id, fact_embedding)
+            index_memory(vector_store, new_memory)
             
             if settings.debug:
                 print(f"[DEBUG] Added replacement memory ID {new_memory.id}: {text_to_store[:50]}...")
@@ -128,6 +149,9 @@ def update_phase(db: Session, candidate_facts: List[str], conversation_id: int):
                 print(f"[DEBUG] NOOP - fact already exists or not worth storing")
 
     # Save FAISS index
-    save_vector_store(conversation_id)
+    if save_index:
+        save_vector_store(conversation_id)
     
-    db.commit()
+    with span("db_commit"):
+        db.commit()
+    bump_generation(conversation_id)
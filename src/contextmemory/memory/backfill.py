@@ -0,0 +1,455 @@
+"""
+Bulk import of historical conversations.
+
+ContextMemory.add() handles one new user/assistant pair per call and does
+all the per-turn bookkeeping itself (message insert and commit, summary
+check, index save). For importing existing chat history, add_many() and
+backfill_file() instead:
+
+- process a conversation's turns in order, extracting memories from each
+  pair with the context add() would have seen (the 10 previous messages).
+  With extraction_window > 1, consecutive turns share one extraction call.
+- embed the facts and bubbles of chunk_size turns in one request
+- insert messages in bulk, keeping their original timestamps
+- save the index and generate the summary once per conversation, at the end
+
+backfill_file() streams a JSONL transcript file and imports different
+conversations concurrently. One conversation per line:
+
+    {"conversation_id": 7, "messages": [
+        {"role": "user", "content": "...", "timestamp": "2024-03-01T10:00:00Z"},
+        {"role": "assistant", "content": "..."}
+    ]}
+
+- conversation_id: an existing conversation to append to, or
+- key: any string; the first line with a new key creates a conversation
+  and later lines with the same key continue it (see BackfillStats.conversation_ids)
+- user_id: owner of a conversation created for the line (optional)
+- timestamp: ISO 8601, optional. Messages without one are stamped in
+  order starting from the import time.
+
+Lines for the same conversation are applied in file order.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from contextmemory.core.locks import conversation_lock
+from contextmemory.core.metrics import timed
+from contextmemory.core.settings import get_settings
+from contextmemory.db.models.conversation import Conversation
+from contextmemory.db.models.conversation_summary import ConversationSummary
+from contextmemory.db.models.message import Message, SenderEnum
+from contextmemory.memory.add.add_updation_phase import update_phase
+from contextmemory.memory.bubble_creator import create_bubbles
+from contextmemory.memory.context_cache import get_context_cache
+from contextmemory.memory.embedding_space import embedding_space, migration_guard
+from contextmemory.memory.embeddings import embed_texts
+from contextmemory.memory.extraction_gate import GateDecision, observe_extraction, should_extract
+from contextmemory.memory.extractor import extract_memories_window
+from contextmemory.memory.vector_store import save_vector_store
+from contextmemory.summary.summary_generator import generate_conversation_summary
+
+# Turns whose facts and bubbles share one embeddings request
+DEFAULT_CHUNK_SIZE = 32
+
+# Conversations imported concurrently by backfill_file()
+DEFAULT_BACKFILL_WORKERS = 4
+
+# Previous messages given to the extractor, as in add()
+RECENT_MESSAGES = 10
+
+# Import errors kept in BackfillStats.errors
+MAX_ERRORS = 100
+
+
+@dataclass
+class BackfillStats:
+    """Progress of an import. Safe to read while backfill_file() runs."""
+
+    conversations: int = 0  # histories imported (transcript lines)
+    turns: int = 0
+    messages: int = 0
+    semantic: int = 0
+    bubbles: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+    # key -> id of the conversation created for it
+    conversation_ids: Dict[str, int] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def merge(self, other: "BackfillStats") -> None:
+        with self._lock:
+            self.conversations += other.conversations
+            self.turns += other.turns
+            self.messages += other.messages
+            self.semantic += other.semantic
+            self.bubbles += other.bubbles
+
+    def fail(self, error: str) -> None:
+        with self._lock:
+            self.failed += 1
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append(error)
+
+    def as_dict(self) -> Dict:
+        elapsed = time.time() - self.started_at
+        return {
+            "conversations": self.conversations,
+            "turns": self.turns,
+            "messages": self.messages,
+            "semantic": self.semantic,
+            "bubbles": self.bubbles,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 1),
+            "turns_per_second": round(self.turns / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    # fromisoformat() only accepts a trailing "Z" from Python 3.11
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _format(message: Dict) -> str:
+    return f"{message['role'].upper()}: {message['content']}"
+
+
+def _recent_messages(db: Session, conversation_id: int) -> deque:
+    """The last RECENT_MESSAGES stored messages, formatted as add() does."""
+    recent = (
+        db.query(Message)
+        .filter(Message.conversation_id == conversation_id)
+        .order_by(Message.timestamp.desc())
+        .limit(RECENT_MESSAGES)
+        .all()
+    )
+    return deque(
+        (f"{msg.sender.upper()}: {msg.message_text}" for msg in reversed(recent)),
+        maxlen=RECENT_MESSAGES,
+    )
+
+
+def _chunks(messages: List[Dict], chunk_size: int) -> List[List[Tuple[Dict, Optional[Dict]]]]:
+    """
+    Split messages into chunks of up to chunk_size turns.
+
+    Each entry is (message, reply): a user message with the assistant
+    message answering it, or a lone message (reply None) that is stored
+    but not extracted from.
+    """
+    entries = []
+    i = 0
+    while i < len(messages):
+        message = messages[i]
+        following = messages[i + 1] if i + 1 < len(messages) else None
+        if message["role"] == "user" and following is not None and following["role"] == "assistant":
+            entries.append((message, following))
+            i += 2
+        else:
+            entries.append((message, None))
+            i += 1
+
+    chunks, chunk, turns = [], [], 0
+    for entry in entries:
+        chunk.append(entry)
+        if entry[1] is not None:
+            turns += 1
+            if turns == chunk_size:
+                chunks.append(chunk)
+                chunk, turns = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _extract_chunk(
+    chunk: List[Tuple[Dict, Optional[Dict]]],
+    summary_text: str,
+    recent: deque,
+    window: int,
+) -> List[Tuple[Dict, List[str], List[Dict]]]:
+    """
+    Extract memories from a chunk's turns, window turns per LLM call.
+
+    Each window sees the messages before it as recent context; recent is
+    advanced past the chunk. Turns the extraction gate skips are kept as
+    context only.
+
+    Returns:
+        (user message, facts, bubbles with text) per turn, in order
+    """
+    extracted = []
+    pending: List[Tuple[Dict, Dict, GateDecision]] = []
+
+    def flush():
+        results = extract_memories_window(
+            turns=[f"{_format(message)}\n{_format(reply)}" for message, reply, _ in pending],
+            summary_text=summary_text,
+            recent_messages=list(recent),
+        )
+        for (message, reply, decision), result in zip(pending, results):
+            observe_extraction(message["content"], decision, result)
+            bubbles = [b for b in result.get("bubbles", []) if isinstance(b, dict) and b.get("text")]
+            extracted.append((message, result.get("semantic", []), bubbles))
+            recent.append(_format(message))
+            recent.append(_format(reply))
+        pending.clear()
+
+    for message, reply in chunk:
+        decision = should_extract(message["content"], reply["content"]) if reply is not None else None
+        if decision is None or not decision.extract:
+            # Context only; keep it in order
+            if pending:
+                flush()
+            recent.append(_format(message))
+            if reply is not None:
+                recent.append(_format(reply))
+            continue
+        pending.append((message, reply, decision))
+        if len(pending) == window:
+            flush()
+    if pending:
+        flush()
+    return extracted
+
+
+@timed("backfill")
+def backfill_conversation(
+    db: Session,
+    conversation_id: int,
+    messages: List[Dict],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    extraction_window: Optional[int] = None,
+) -> BackfillStats:
+    """
+    Import a conversation's history: store its messages and extract memories from every turn.
+
+    Equivalent to calling add() on each user/assistant pair in order, with
+    batched embeddings and inserts. The conversation summary is generated
+    once at the end, so every turn is extracted with the summary the
+    conversation had before the import.
+
+    Args:
+        db: SQLAlchemy session
+        conversation_id: Conversation to append to (must exist)
+        messages: [{"role": "user"|"assistant", "content": "...", "timestamp": "..."?}, ...]
+        chunk_size: Turns per embeddings request and message insert
+        extraction_window: Turns per extraction call (default:
+                           settings.extraction_window). Windows don't span
+                           chunks, so use a divisor of chunk_size.
+
+    Returns:
+        BackfillStats for this conversation
+    """
+    window = extraction_window or get_settings().extraction_window
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if window <= 0:
+        raise ValueError("extraction_window must be positive")
+
+    stats = BackfillStats(conversations=1)
+    messages = [msg for msg in messages if msg.get("role") in ("user", "assistant")]
+
+    # Messages without a timestamp keep their order, a microsecond apart
+    base_time = datetime.now(timezone.utc)
+    timestamps = {
+        id(msg): _parse_timestamp(msg.get("timestamp")) or base_time + timedelta(microseconds=i)
+        for i, msg in enumerate(messages)
+    }
+
+    with migration_guard(conversation_id), conversation_lock(conversation_id):
+        summary_row = (
+            db.query(ConversationSummary)
+            .filter(ConversationSummary.conversation_id == conversation_id)
+            .one_or_none()
+        )
+        summary_text = summary_row.summary_text if summary_row else ""
+        recent = _recent_messages(db, conversation_id)
+        space = embedding_space(conversation_id)
+
+        for chunk in _chunks(messages, chunk_size):
+            extracted = _extract_chunk(chunk, summary_text, recent, window)
+
+            # One embeddings request for the whole chunk
+            texts = [fact for _, facts, _ in extracted for fact in facts]
+            texts += [b["text"] for _, _, bubbles in extracted for b in bubbles]
+            vectors = iter(embed_texts(texts, space) if texts else [])
+            fact_vectors = [[next(vectors) for _ in facts] for _, facts, _ in extracted]
+            bubble_vectors = [[next(vectors) for _ in bubbles] for _, _, bubbles in extracted]
+
+            # Apply turns in order, exactly as add() would
+            for (message, facts, bubbles), fact_embeddings, bubble_embeddings in zip(
+                extracted, fact_vectors, bubble_vectors
+            ):
+                if facts:
+                    update_phase(
+                        db=db,
+                        candidate_facts=facts,
+                        conversation_id=conversation_id,
+                        fact_embeddings=fact_embeddings,
+                        save_index=False,
+                    )
+                if bubbles:
+                    create_bubbles(
+                        db=db,
+                        bubbles=bubbles,
+                        conversation_id=conversation_id,
+                        embeddings=bubble_embeddings,
+                        occurred_at=timestamps[id(message)],
+                        save_index=False,
+                    )
+                stats.semantic += len(facts)
+                stats.bubbles += len(bubbles)
+
+            rows = []
+            for message, reply in chunk:
+                for msg in (message, reply) if reply is not None else (message,):
+                    rows.append({
+                        "conversation_id": conversation_id,
+                        "sender": SenderEnum(msg["role"]),
+                        "message_text": msg["content"],
+                        "timestamp": timestamps[id(msg)],
+                    })
+            db.execute(insert(Message), rows)
+            db.commit()
+
+            stats.turns += sum(1 for _, reply in chunk if reply is not None)
+            stats.messages += len(rows)
+
+        # Deferred per-turn bookkeeping; imported messages may predate cached ones
+        save_vector_store(conversation_id)
+        get_context_cache().invalidate(conversation_id)
+        if messages:
+            generate_conversation_summary(db, conversation_id, force=True)
+
+    if get_settings().debug:
+        print(
+            f"[DEBUG] Backfilled conversation {conversation_id}: {stats.turns} turns, "
+            f"{stats.semantic} facts, {stats.bubbles} bubbles"
+        )
+
+    return stats
+
+
+def backfill_file(
+    path: str,
+    workers: int = DEFAULT_BACKFILL_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    extraction_window: Optional[int] = None,
+    session_factory: Optional[Callable[[], Session]] = None,
+    progress: Optional[Callable[[Dict], None]] = None,
+    progress_interval: float = 10.0,
+) -> BackfillStats:
+    """
+    Import a JSONL transcript file (format in the module docstring).
+
+    The file is streamed: at most 2 * workers conversations are read ahead.
+    A line that fails to import is counted in stats.failed and the import
+    continues.
+
+    Args:
+        path: Transcript file
+        workers: Conversations imported concurrently (each uses its own DB session)
+        chunk_size: Turns per embeddings request (see backfill_conversation)
+        extraction_window: Turns per extraction call (see backfill_conversation)
+        session_factory: Creates the DB sessions (default: SessionLocal)
+        progress: Called with BackfillStats.as_dict() every progress_interval seconds
+        progress_interval: Seconds between progress calls
+
+    Returns:
+        Final BackfillStats
+    """
+    if workers <= 0:
+        raise ValueError("workers must be positive")
+    if session_factory is None:
+        from contextmemory.db.database import SessionLocal
+        session_factory = SessionLocal
+
+    stats = BackfillStats()
+    # Last submitted line of each conversation, so later lines wait for it
+    tails: Dict[object, Future] = {}
+    slots = threading.BoundedSemaphore(2 * workers)
+    next_report = time.monotonic() + progress_interval
+
+    def import_line(line_no: int, record: Dict, previous: Optional[Future]) -> None:
+        if previous is not None:
+            previous.exception()  # wait; a failed earlier line doesn't block this one
+        db = session_factory()
+        try:
+            conversation_id = _conversation_for(db, record, stats)
+            stats.merge(backfill_conversation(
+                db, conversation_id, record.get("messages", []), chunk_size, extraction_window
+            ))
+        except Exception as e:
+            db.rollback()
+            stats.fail(f"line {line_no}: {e!r}")
+            if get_settings().debug:
+                print(f"[DEBUG] Backfill of line {line_no} failed: {e!r}")
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="contextmemory-backfill") as executor:
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    stats.fail(f"line {line_no}: {e!r}")
+                    continue
+
+                if "conversation_id" in record:
+                    tail_key = ("id", int(record["conversation_id"]))
+                elif "key" in record:
+                    tail_key = ("key", str(record["key"]))
+                else:
+                    tail_key = ("line", line_no)
+
+                slots.acquire()
+                future = executor.submit(import_line, line_no, record, tails.get(tail_key))
+                future.add_done_callback(lambda _: slots.release())
+                if tail_key[0] != "line":
+                    tails[tail_key] = future
+
+                if progress is not None and time.monotonic() >= next_report:
+                    progress(stats.as_dict())
+                    next_report = time.monotonic() + progress_interval
+
+    if progress is not None:
+        progress(stats.as_dict())
+    return stats
+
+
+def _conversation_for(db: Session, record: Dict, stats: BackfillStats) -> int:
+    """Id of the conversation a transcript line goes to, creating it if needed."""
+    if "conversation_id" in record:
+        conversation_id = int(record["conversation_id"])
+        if db.get(Conversation, conversation_id) is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+        return conversation_id
+
+    key = str(record["key"]) if "key" in record else None
+    if key is not None and key in stats.conversation_ids:
+        return stats.conversation_ids[key]
+
+    conversation = Conversation(user_id=record.get("user_id"))
+    db.add(conversation)
+    db.commit()
+    if key is not None:
+        with stats._lock:
+            stats.conversation_ids[key] = conversation.id
+    return conversation.id
@@ -6,37 +6,53 @@ from datetime import datetime, timezone
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 
+from contextmemory.core.metrics import span, timed
 from contextmemory.db.models.memory import Memory
-from contextmemory.memory.embeddings import embed_text
+from contextmemory.memory.embeddings import embed_texts
+from contextmemory.memory.embedding_space import embedding_space
 from contextmemory.memory.connection_finder import find_connections
-from contextmemory.memory.vector_store import get_vector_store, save_vector_store
+from contextmemory.memory.vector_store import get_vector_store, index_memory, save_vector_store
+from contextmemory.memory.search_cache import bump_generation
 
 
+@timed("bubbles")
 def create_bubbles(
     db: Session,
     bubbles: List[Dict],
     conversation_id: int,
-    session_id: Optional[int] = None
+    session_id: Optional[int] = None,
+    embeddings: Optional[List[List[float]]] = None,
+    occurred_at: Optional[datetime] = None,
+    save_index: bool = True,
 ) -> List[Memory]:
     """
     Create bubble memories and find their connections.
     
     Args:
         bubbles: [{"text": "...", "importance": 0.7}, ...]
+        embeddings: Precomputed embeddings of the bubbles that have text, in order
+        occurred_at: When the bubbles happened (default: now; bulk imports
+                     pass the original message time)
+        save_index: Save the FAISS index afterwards (bulk imports save once at the end)
     
     Returns:
         List of created Memory objects
     """
     created = []
     vector_store = get_vector_store(conversation_id)
+    bubbles = [bubble_data for bubble_data in bubbles if bubble_data.get("text")]
     
-    for bubble_data in bubbles:
-        text = bubble_data.get("text", "")
+    # Embed all bubbles in one request
+    if embeddings is None:
+        embeddings = embed_texts(
+            [bubble_data["text"] for bubble_data in bubbles],
+            embedding_space(conversation_id)
+        )
+    
+    for bubble_data, embedding in zip(bubbles, embeddings):
+        text = bubble_data["text"]
         importance = bubble_data.get("importance", 0.5)
         
-        if not text:
-            continue
-        
         # Ensure importance is a float
         if isinstance(importance, str):
             try:
@@ -44,16 +60,13 @@ def create_bubbles(
             except ValueError:
                 importance = 0.5
         
-        # Generate embedding
-        embedding = embed_text(text)
-        
         # Create bubble record
         bubble = Memory(
             conversation_id=conversation_id,
             memory_text=text,
             embedding=embedding,
             is_episodic=True,
-            occurred_at=datetime.now(timezone.utc),
+            occurred_at=occurred_at or datetime.now(timezone.utc),
             session_id=session_id,
             importance=importance,
             is_active=True,
@@ -61,10 +74,11 @@ def create_bubbles(
         )
         
         db.add(bubble)
-        db.flush()  # Get ID before finding connections
+        with span("db_flush"):
+            db.flush()  # Get ID before finding connections
         
         # Add to FAISS index
-        vector_store.add(bubble.id, embedding)
+        index_memory(vector_store, bubble)
         
         # Find connections (imported from connection_finder.py)
         find_connections(db, bubble, conversation_id)
@@ -72,7 +86,10 @@ def create_bubbles(
         created.append(bubble)
     
     # Save FAISS index
-    save_vector_store(conversation_id)
+    if save_index:
+        save_vector_store(conversation_id)
     
-    db.commit()
+    with span("db_commit"):
+        db.commit()
+    bump_generation(conversation_id)
     return created
\ No newline at end of file
@@ -1,68 +1,189 @@
 """
 Connection Finder - Finds connections between bubbles using FAISS.
+
+Connections live in the memory_connections edge table, one row per
+directed edge. Each memory keeps at most MAX_DEGREE outgoing edges so
+hub memories don't accumulate unbounded reverse links.
 """
 
-from typing import List, Dict
+from collections import defaultdict
+from typing import List, Dict, Iterable, Optional
+from sqlalchemy import select, insert, delete, or_, tuple_
 from sqlalchemy.orm import Session
+from contextmemory.core.metrics import timed
 from contextmemory.db.models.memory import Memory
+from contextmemory.db.models.memory_connection import MemoryConnection
 from contextmemory.memory.vector_store import get_vector_store
+from contextmemory.memory.connection_graph import invalidate_connection_graph, reset_connection_graphs
 
 CONNECTION_THRESHOLD = 0.6
 MAX_CONNECTIONS = 5
+MAX_DEGREE = 20
 
 
+@timed("find_connections")
 def find_connections(db: Session, new_bubble: Memory, conversation_id: int) -> List[int]:
     """
     Find the connection between the new bubble and existing memories using FAISS.
     Return list of connected memory IDs.
-    
+
     Uses FAISS for fast similarity search instead of O(n) loop.
     """
     if not new_bubble.embedding:
         return []
-    
+
     # Use FAISS to find similar memories (O(log n))
     vector_store = get_vector_store(conversation_id)
-    
+
     # Search for more than we need to filter by threshold
     results = vector_store.search(new_bubble.embedding, k=MAX_CONNECTIONS * 2)
-    
+
     if not results:
         return []
-    
+
     # Filter by threshold and exclude self
     scored = []
     for r in results:
         if r["memory_id"] != new_bubble.id and r["score"] >= CONNECTION_THRESHOLD:
             scored.append({"id": r["memory_id"], "score": round(r["score"], 3)})
-    
+
     top_connections = scored[:MAX_CONNECTIONS]
-    
+
     if not top_connections:
         return []
-    
-    # Store in new bubble's metadata
+
     connection_ids = [c["id"] for c in top_connections]
-    connection_scores = {str(c["id"]): c["score"] for c in top_connections}
-    metadata = new_bubble.memory_metadata or {}
-    metadata["connections"] = {
-        "bubble_ids": connection_ids,
-        "scores": connection_scores
-    }
-    new_bubble.memory_metadata = metadata
-
-    # Add reverse connection (bidirectional)
+
+    # Forward edges from the new bubble
+    rows = [
+        {
+            "src_id": new_bubble.id,
+            "dst_id": c["id"],
+            "conversation_id": conversation_id,
+            "score": c["score"],
+        }
+        for c in top_connections
+    ]
+
+    # Reverse edges (bidirectional), capped at MAX_DEGREE per memory.
+    # Fetch the current edges of every neighbour in one query.
+    existing = defaultdict(list)
+    for src_id, dst_id, score in db.execute(
+        select(MemoryConnection.src_id, MemoryConnection.dst_id, MemoryConnection.score)
+        .where(MemoryConnection.src_id.in_(connection_ids))
+    ):
+        existing[src_id].append((score, dst_id))
+
+    evicted = []
     for conn in top_connections:
-        connected_mem = db.get(Memory, conn["id"])
-        if connected_mem:
-            cm_metadata = connected_mem.memory_metadata or {}
-            cm_connections = cm_metadata.get("connections", {"bubble_ids": [], "scores": {}})
-            
-            if new_bubble.id not in cm_connections["bubble_ids"]:
-                cm_connections["bubble_ids"].append(new_bubble.id)
-                cm_connections["scores"][str(new_bubble.id)] = conn["score"]
-                cm_metadata["connections"] = cm_connections
-                connected_mem.memory_metadata = cm_metadata
-    
+        edges = existing[conn["id"]]
+        if any(dst_id == new_bubble.id for _, dst_id in edges):
+            continue
+        if len(edges) >= MAX_DEGREE:
+            # Hub memory: only keep the new link if it beats the weakest one
+            weakest_score, weakest_dst = min(edges)
+            if conn["score"] <= weakest_score:
+                continue
+            evicted.append((conn["id"], weakest_dst))
+        rows.append({
+            "src_id": conn["id"],
+            "dst_id": new_bubble.id,
+            "conversation_id": conversation_id,
+            "score": conn["score"],
+        })
+
+    if evicted:
+        db.execute(
+            delete(MemoryConnection).where(
+                tuple_(MemoryConnection.src_id, MemoryConnection.dst_id).in_(evicted)
+            )
+        )
+
+    # Bulk insert all edges in one statement
+    db.execute(insert(MemoryConnection), rows)
+    invalidate_connection_graph(conversation_id)
+
     # Note: Don't commit here - let caller handle commit
-    return connection_ids
\ No newline at end of file
+    return connection_ids
+
+
+def get_connections(
+    db: Session,
+    memory_ids: Iterable[int],
+    limit_per_memory: Optional[int] = None
+) -> Dict[int, List[int]]:
+    """
+    Fetch the neighbours of several memories with a single query.
+
+    Args:
+        db: Database session
+        memory_ids: Memories to expand
+        limit_per_memory: Optional cap on neighbours returned per memory
+
+    Returns:
+        Dict of memory_id -> connected memory IDs, strongest first
+    """
+    memory_ids = list(memory_ids)
+    if not memory_ids:
+        return {}
+
+    rows = db.execute(
+        select(MemoryConnection.src_id, MemoryConnection.dst_id)
+        .where(MemoryConnection.src_id.in_(memory_ids))
+        .order_by(MemoryConnection.src_id, MemoryConnection.score.desc())
+    )
+
+    connections: Dict[int, List[int]] = defaultdict(list)
+    for src_id, dst_id in rows:
+        if limit_per_memory is None or len(connections[src_id]) < limit_per_memory:
+            connections[src_id].append(dst_id)
+    return dict(connections)
+
+
+def remove_connections(db: Session, memory_id: int, conversation_id: int) -> None:
+    """
+    Drop every edge touching a memory (used when a memory is hard-deleted).
+    """
+    db.execute(
+        delete(MemoryConnection).where(
+            or_(MemoryConnection.src_id == memory_id, MemoryConnection.dst_id == memory_id)
+        )
+    )
+    invalidate_connection_graph(conversation_id)
+
+
+def migrate_metadata_connections(db: Session) -> int:
+    """
+    Copy legacy connections stored in memory_metadata["connections"] into
+    the memory_connections table.
+
+    Safe to run more than once - existing edges are skipped.
+
+    Returns:
+        Number of edges inserted
+    """
+    existing = set(db.execute(select(MemoryConnection.src_id, MemoryConnection.dst_id)).all())
+    active_ids = set(db.scalars(select(Memory.id)))
+
+    rows = []
+    for mem in db.query(Memory).filter(Memory.memory_metadata.isnot(None)).yield_per(500):
+        connections = (mem.memory_metadata or {}).get("connections")
+        if not connections:
+            continue
+        scores = connections.get("scores", {})
+        for dst_id in connections.get("bubble_ids", [])[:MAX_DEGREE]:
+            if (mem.id, dst_id) in existing or dst_id not in active_ids:
+                continue
+            existing.add((mem.id, dst_id))
+            rows.append({
+                "src_id": mem.id,
+                "dst_id": dst_id,
+                "conversation_id": mem.conversation_id,
+                "score": float(scores.get(str(dst_id), CONNECTION_THRESHOLD)),
+            })
+
+    if rows:
+        db.execute(insert(MemoryConnection), rows)
+    db.commit()
+    reset_connection_graphs()
+    return len(rows)
@@ -0,0 +1,186 @@
+"""
+Connection Graph - In-memory sparse adjacency over memory connections.
+
+The memory_connections edges of a conversation are loaded once into CSR
+arrays and cached, so multi-hop expansion during search is pure NumPy
+with no extra DB or LLM calls. The cache is invalidated whenever edges
+for the conversation change, and a cached graph is only reused while the
+conversation's write generation is unchanged, so a graph built from
+uncommitted state by a concurrent reader is discarded after the commit.
+Graphs of the least recently searched conversations are evicted past
+settings.connection_graph_cache_size.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from contextmemory.core.settings import get_settings
+from contextmemory.db.models.memory_connection import MemoryConnection
+from contextmemory.memory.search_cache import get_generation
+
+GRAPH_DAMPING = 0.85
+GRAPH_MAX_HOPS = 3
+GRAPH_BUDGET_MS = 5.0
+GRAPH_TOLERANCE = 1e-4
+
+
+class ConnectionGraph:
+    """
+    Weighted directed graph in CSR form.
+
+    Attributes:
+        node_ids: Position -> memory_id
+        node_index: memory_id -> position
+        indptr: CSR row pointers (one row per source node)
+        indices: CSR column indices (destination positions)
+        weights: Transition probabilities (each row sums to 1)
+    """
+
+    def __init__(self, src_ids: np.ndarray, dst_ids: np.ndarray, scores: np.ndarray):
+        self.node_ids = np.unique(np.concatenate([src_ids, dst_ids])).astype(np.int64)
+        self.node_index: Dict[int, int] = {int(m): i for i, m in enumerate(self.node_ids)}
+        n = len(self.node_ids)
+
+        src = np.searchsorted(self.node_ids, src_ids)
+        dst = np.searchsorted(self.node_ids, dst_ids)
+
+        # Sort edges by source row to get CSR layout
+        order = np.argsort(src, kind="stable")
+        src, dst, scores = src[order], dst[order], scores[order].astype(np.float64)
+
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+        self.indices = dst
+
+        # Row-normalise similarity scores into transition probabilities
+        row_sums = np.bincount(src, weights=scores, minlength=n)
+        self.weights = scores / np.where(row_sums[src] > 0, row_sums[src], 1.0)
+        self._rows = src
+
+    @classmethod
+    def from_db(cls, db: Session, conversation_id: int) -> "ConnectionGraph":
+        """Load every edge of a conversation in one query."""
+        rows = db.execute(
+            select(MemoryConnection.src_id, MemoryConnection.dst_id, MemoryConnection.score)
+            .where(MemoryConnection.conversation_id == conversation_id)
+        ).all()
+        if not rows:
+            empty = np.array([], dtype=np.int64)
+            return cls(empty, empty, np.array([], dtype=np.float64))
+        src, dst, scores = (np.array(col) for col in zip(*rows))
+        return cls(src.astype(np.int64), dst.astype(np.int64), scores.astype(np.float64))
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    def personalized_pagerank(
+        self,
+        seeds: Dict[int, float],
+        damping: float = GRAPH_DAMPING,
+        max_hops: int = GRAPH_MAX_HOPS,
+        budget_ms: float = GRAPH_BUDGET_MS,
+        tolerance: float = GRAPH_TOLERANCE,
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank memories by personalized PageRank from weighted seed memories.
+
+        Each iteration propagates activation one hop along the edges, so
+        max_hops bounds how far the expansion reaches. Iteration also stops
+        once budget_ms has elapsed or the scores have converged.
+
+        Args:
+            seeds: memory_id -> seed weight (e.g. search score)
+            damping: Probability of following an edge instead of restarting
+            max_hops: Maximum number of propagation steps
+            budget_ms: Hard wall-clock budget for the iteration
+            tolerance: L1 change below which iteration stops early
+
+        Returns:
+            (memory_id, score) pairs for non-seed memories, best first
+        """
+        n = self.num_nodes
+        if n == 0 or self.num_edges == 0:
+            return []
+
+        restart = np.zeros(n, dtype=np.float64)
+        for memory_id, weight in seeds.items():
+            i = self.node_index.get(memory_id)
+            if i is not None:
+                restart[i] += max(weight, 0.0)
+        total = restart.sum()
+        if total <= 0:
+            # Seeds present but unweighted - fall back to uniform restart
+            hit = [self.node_index[m] for m in seeds if m in self.node_index]
+            if not hit:
+                return []
+            restart[hit] = 1.0
+            total = float(len(hit))
+        restart /= total
+
+        deadline = time.perf_counter() + budget_ms / 1000
+        scores = restart.copy()
+        for _ in range(max_hops):
+            # y = P^T x, vectorised over all edges
+            spread = np.bincount(
+                self.indices, weights=scores[self._rows] * self.weights, minlength=n
+            )
+            updated = damping * spread + (1 - damping) * restart
+            delta = np.abs(updated - scores).sum()
+            scores = updated
+            if delta < tolerance or time.perf_counter() >= deadline:
+                break
+
+        seed_mask = restart > 0
+        candidates = np.flatnonzero((scores > 0) & ~seed_mask)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(self.node_ids[i]), float(scores[i])) for i in order]
+
+
+# Global LRU cache of connection graphs: conversation_id -> (generation, graph)
+_graphs: "OrderedDict[int, Tuple[int, ConnectionGraph]]" = OrderedDict()
+_graphs_lock = threading.Lock()
+
+
+def get_connection_graph(db: Session, conversation_id: int) -> ConnectionGraph:
+    """
+    Get the cached connection graph for a conversation, building it on first use.
+    """
+    generation = get_generation(conversation_id)
+    with _graphs_lock:
+        entry = _graphs.get(conversation_id)
+        if entry is not None and entry[0] == generation:
+            _graphs.move_to_end(conversation_id)
+            return entry[1]
+
+    # Built outside the lock: searches of other conversations don't wait for the query
+    graph = ConnectionGraph.from_db(db, conversation_id)
+    capacity = get_settings().connection_graph_cache_size
+    if capacity > 0:
+        with _graphs_lock:
+            _graphs[conversation_id] = (generation, graph)
+            _graphs.move_to_end(conversation_id)
+            while len(_graphs) > capacity:
+                _graphs.popitem(last=False)
+    return graph
+
+
+def invalidate_connection_graph(conversation_id: int) -> None:
+    """Drop a conversation's cached graph after its edges change."""
+    with _graphs_lock:
+        _graphs.pop(conversation_id, None)
+
+
+def reset_connection_graphs() -> None:
+    """Clear all cached graphs. Useful for testing."""
+    with _graphs_lock:
+        _graphs.clear()
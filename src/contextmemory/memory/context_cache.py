@@ -0,0 +1,186 @@
+"""
+Context Cache - the hot part of each active conversation, kept in memory.
+
+Every add() gives extraction the conversation's summary and its last few
+messages. Those rows were usually written by the previous add() moments
+earlier, so the cache keeps them per conversation: the summary and a ring
+buffer of the last RECENT_MESSAGES formatted messages.
+
+Entries are loaded from the database on first use and then updated
+write-through by the code that writes messages (extraction_phase) and
+summaries (generate_conversation_summary), so extraction on an active
+conversation reads nothing. The least recently used conversations are
+evicted past settings.context_cache_size.
+
+Each message or summary write bumps the conversation's shared "context"
+generation (a file next to its index, see search_cache.get_generation), and
+entries remember the generation they are current at. A write made by
+another worker process therefore invalidates every other worker's entry
+instead of leaving it stale; bulk writes (backfill) just bump it.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from contextmemory.core.settings import get_settings
+from contextmemory.db.models.conversation_summary import ConversationSummary
+from contextmemory.db.models.message import Message
+from contextmemory.memory.search_cache import bump_generation, get_generation
+
+# Recent messages given to extraction as context
+RECENT_MESSAGES = 10
+
+# Shared write generation counting message and summary writes
+CONTEXT_GENERATION = "context_generation"
+
+
+@dataclass
+class ConversationContext:
+    """Cached summary and recent messages (oldest first) of one conversation, as of a context generation."""
+
+    summary_text: str
+    generation: int
+    recent_messages: Deque[str] = field(default_factory=lambda: deque(maxlen=RECENT_MESSAGES))
+
+
+def format_message(sender: str, text: str) -> str:
+    """A message as extraction sees it: "USER: ..." / "ASSISTANT: ..."."""
+    return f"{sender.upper()}: {text}"
+
+
+class ContextCache:
+    """
+    LRU cache of ConversationContext per conversation.
+
+    Args:
+        max_conversations: Capacity; 0 disables caching (every lookup reads the database)
+    """
+
+    def __init__(self, max_conversations: int = 1024):
+        self.max_conversations = max_conversations
+        self._entries: "OrderedDict[int, ConversationContext]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    def get(self, db: Session, conversation_id: int) -> Tuple[str, List[str]]:
+        """(summary text, recent messages oldest first), loading on a miss."""
+        generation = get_generation(conversation_id, CONTEXT_GENERATION)
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and entry.generation == generation:
+                self._entries.move_to_end(conversation_id)
+                self.hits += 1
+                return entry.summary_text, list(entry.recent_messages)
+            if entry is not None:
+                # Written to by another process since it was cached
+                del self._entries[conversation_id]
+                self.stale += 1
+            self.misses += 1
+
+        # Read before the rows, so a write landing in between leaves the entry stale rather than wrong
+        entry = _load(db, conversation_id, generation)
+        if self.max_conversations > 0:
+            with self._lock:
+                self._entries[conversation_id] = entry
+                self._entries.move_to_end(conversation_id)
+                while len(self._entries) > self.max_conversations:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return entry.summary_text, list(entry.recent_messages)
+
+    def append_messages(self, conversation_id: int, messages: List[str]) -> None:
+        """Record committed messages (formatted with format_message())."""
+        generation = bump_generation(conversation_id, CONTEXT_GENERATION)
+        with self._lock:
+            entry = self._current(conversation_id, generation)
+            if entry is not None:
+                entry.recent_messages.extend(messages)
+
+    def set_summary(self, conversation_id: int, summary_text: str) -> None:
+        """Record a committed summary."""
+        generation = bump_generation(conversation_id, CONTEXT_GENERATION)
+        with self._lock:
+            entry = self._current(conversation_id, generation)
+            if entry is not None:
+                entry.summary_text = summary_text
+
+    def _current(self, conversation_id: int, generation: int) -> Optional[ConversationContext]:
+        """
+        The entry to apply a write that moved the generation to `generation`
+        to, or None. Dropped if some other write came in between.
+        """
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return None
+        if entry.generation != generation - 1:
+            del self._entries[conversation_id]
+            self.stale += 1
+            return None
+        entry.generation = generation
+        return entry
+
+    def invalidate(self, conversation_id: int) -> None:
+        """Forget a conversation in every process, e.g. after a bulk write; the next lookup reloads it."""
+        bump_generation(conversation_id, CONTEXT_GENERATION)
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_conversations": self.max_conversations,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "stale": self.stale,
+        }
+
+
+def _load(db: Session, conversation_id: int, generation: int) -> ConversationContext:
+    summary_row = (
+        db.query(ConversationSummary)
+        .filter(ConversationSummary.conversation_id == conversation_id)
+        .one_or_none()
+    )
+    recent = (
+        db.query(Message)
+        .filter(Message.conversation_id == conversation_id)
+        .order_by(Message.timestamp.desc(), Message.id.desc())
+        .limit(RECENT_MESSAGES)
+        .all()
+    )
+    entry = ConversationContext(summary_text=summary_row.summary_text if summary_row else "", generation=generation)
+    entry.recent_messages.extend(format_message(msg.sender, msg.message_text) for msg in reversed(recent))
+    return entry
+
+
+# Global context cache (lazy initialized)
+_context_cache: Optional[ContextCache] = None
+
+
+def get_context_cache() -> ContextCache:
+    """Get or create the process-wide conversation context cache."""
+    global _context_cache
+    if _context_cache is None:
+        _context_cache = ContextCache(max_conversations=get_settings().context_cache_size)
+    return _context_cache
+
+
+def get_context_cache_stats() -> Dict:
+    """Hit rate and size of the conversation context cache."""
+    return get_context_cache().stats()
+
+
+def reset_context_cache() -> None:
+    """Drop the cache. Useful for testing."""
+    global _context_cache
+    _context_cache = None
@@ -0,0 +1,90 @@
+"""
+Context Packer - fits search results into a prompt-ready block of memories.
+
+Used by ContextMemory.get_context():
+
+1. Near-identical memories (embeddings above DEDUP_SIMILARITY, or the same
+   text) are collapsed into the best-scoring one.
+2. Memories are packed greedily by score per token into the token budget,
+   so several short relevant memories beat one long, slightly more
+   relevant one.
+3. The packed memories are formatted one per line, most relevant first.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from contextmemory.core.prompt_builder import count_tokens
+
+# Cosine similarity above which two memories count as duplicates
+DEDUP_SIMILARITY = 0.95
+
+_SPACE = re.compile(r"\s+")
+
+
+def format_memory(result: Dict) -> str:
+    """One line of context: "- [semantic] text" / "- [bubble, 2025-03-01] text"."""
+    label = result["type"]
+    if result.get("occurred_at"):
+        label = f"{label}, {result['occurred_at'][:10]}"
+    return f"- [{label}] {result['memory']}"
+
+
+def dedupe(
+    results: Sequence[Dict],
+    embeddings: Dict[int, Optional[List[float]]],
+    threshold: float = DEDUP_SIMILARITY,
+) -> List[Dict]:
+    """
+    Drop results that repeat a better-scoring one.
+
+    Args:
+        results: Search results, best first
+        embeddings: Stored embedding per memory_id (None = compare text only)
+        threshold: Cosine similarity above which two memories are duplicates
+    """
+    kept: List[Dict] = []
+    kept_texts = set()
+    kept_vectors: List[np.ndarray] = []
+    for result in results:
+        text = _SPACE.sub(" ", result["memory"].strip().lower())
+        if text in kept_texts:
+            continue
+
+        vector = embeddings.get(result["memory_id"])
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else None
+        if vector is not None and any(
+            len(other) == len(vector) and float(other @ vector) >= threshold for other in kept_vectors
+        ):
+            continue
+
+        kept.append(result)
+        kept_texts.add(text)
+        if vector is not None:
+            kept_vectors.append(vector)
+    return kept
+
+
+def pack(results: Sequence[Dict], token_budget: int, model: Optional[str] = None) -> List[Dict]:
+    """
+    Choose the results to include: greedy knapsack by score per token.
+
+    Returns:
+        The chosen results, best score first
+    """
+    lines = [(result, count_tokens(format_memory(result) + "\n", model)) for result in results]
+    by_density = sorted(lines, key=lambda item: max(item[0]["score"], 0.0) / item[1], reverse=True)
+
+    chosen = []
+    used = 0
+    for result, tokens in by_density:
+        if used + tokens <= token_budget:
+            chosen.append(result)
+            used += tokens
+    chosen.sort(key=lambda result: result["score"], reverse=True)
+    return chosen
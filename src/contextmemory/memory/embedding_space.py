@@ -0,0 +1,209 @@
+"""
+Embedding spaces - which model and size a conversation's vectors come from.
+
+Vectors from different embedding models (or sizes) can't be compared, so a
+query must be embedded in the same space as the index it searches. Normally
+every conversation uses the configured embedding_model/embedding_dimensions.
+While an EmbeddingMigration (see memory.reindex) is running, conversations
+that haven't been cut over yet keep serving from the source space.
+
+Migration state is kept in ~/.contextmemory/embedding_migration.json so
+every worker process sharing the index directory follows the same cutovers.
+Each cutover runs under an exclusive migration_guard(); anything that reads
+or writes a conversation still waiting for its cutover holds the guard
+shared, so no process ever sees the new embeddings with the old space (or
+the reverse).
+"""
+
+import json
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional, Set
+
+from contextmemory.core.deadline import DeadlineExceeded, remaining
+from contextmemory.core.locks import file_lock
+from contextmemory.core.settings import get_settings, native_embedding_dimensions
+
+
+class EmbeddingSpace(NamedTuple):
+    """An embedding model and requested size (None = the model's native size)."""
+
+    model: str
+    dimensions: Optional[int] = None
+
+    @property
+    def size(self) -> int:
+        """Length of the vectors this space produces."""
+        return self.dimensions or native_embedding_dimensions(self.model)
+
+
+def current_space() -> EmbeddingSpace:
+    """The configured embedding space."""
+    settings = get_settings()
+    return EmbeddingSpace(settings.embedding_model, settings.embedding_dimensions)
+
+
+class MigrationState(NamedTuple):
+    source: EmbeddingSpace
+    target: EmbeddingSpace
+    migrated: Set[int]
+    complete: bool
+
+
+# Cached state file contents, keyed by mtime
+_state: Optional[MigrationState] = None
+_state_mtime: Optional[int] = None
+_state_lock = threading.Lock()
+
+# Bumped before and after each in-process cutover (odd = cutover in progress)
+_cutover_epochs: Dict[int, int] = {}
+
+# Conversations whose migration guard the current thread holds
+_held_guards = threading.local()
+
+
+def migration_state_path() -> str:
+    return os.path.expanduser("~/.contextmemory/embedding_migration.json")
+
+
+def get_migration_state() -> Optional[MigrationState]:
+    """The running (or last finished) embedding migration, if any."""
+    global _state, _state_mtime
+
+    path = migration_state_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _state_lock:
+        if mtime != _state_mtime:
+            with open(path) as f:
+                data = json.load(f)
+            _state = MigrationState(
+                source=EmbeddingSpace(*data["source"]),
+                target=EmbeddingSpace(*data["target"]),
+                migrated=set(data["migrated"]),
+                complete=data["complete"],
+            )
+            _state_mtime = mtime
+        return _state
+
+
+def write_migration_state(state: Optional[MigrationState]) -> None:
+    """Publish migration state to all processes (None clears it)."""
+    global _state, _state_mtime
+
+    path = migration_state_path()
+    with _state_lock:
+        _state, _state_mtime = None, None
+        if state is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, "w") as f:
+            json.dump({
+                "source": list(state.source),
+                "target": list(state.target),
+                "migrated": sorted(state.migrated),
+                "complete": state.complete,
+            }, f)
+        os.replace(tmp, path)
+        _state, _state_mtime = state, os.stat(path).st_mtime_ns
+
+
+def embedding_space(conversation_id: Optional[int] = None) -> EmbeddingSpace:
+    """
+    The space a conversation's stored embeddings and index are in.
+
+    Without a conversation, returns the space new conversations use.
+    """
+    state = get_migration_state()
+    if state is None:
+        return current_space()
+    if state.complete or (conversation_id is not None and conversation_id in state.migrated):
+        return state.target
+    return state.source
+
+
+def cutover_epoch(conversation_id: int) -> int:
+    """
+    Counter that changes whenever a conversation is cut over in this process.
+
+    A search that read the same even epoch before embedding its query and
+    after searching the index saw one consistent embedding space.
+    """
+    return _cutover_epochs.get(conversation_id, 0)
+
+
+def begin_cutover(conversation_id: int) -> None:
+    """Mark a cutover as in progress. Caller holds the conversation lock."""
+    _cutover_epochs[conversation_id] = cutover_epoch(conversation_id) + 1
+
+
+def end_cutover(conversation_id: int) -> None:
+    """Mark a cutover as finished (after its state was written)."""
+    _cutover_epochs[conversation_id] = cutover_epoch(conversation_id) + 1
+
+
+def _cutover_pending(conversation_id: int) -> bool:
+    state = get_migration_state()
+    return state is not None and not state.complete and conversation_id not in state.migrated
+
+
+@contextmanager
+def migration_guard(conversation_id: int, exclusive: bool = False) -> Iterator[None]:
+    """
+    Cross-process lock ordering a conversation's cutover against its users.
+
+    The migration holds it exclusively while it commits the new embeddings,
+    flips the conversation's space and swaps its index. Everything else
+    holds it shared around work that depends on the space staying put.
+    Shared holds are a no-op unless the conversation is still waiting for
+    its cutover. Reentrant within a thread. Waits no longer than the
+    current deadline (core.deadline).
+
+    Take it before conversation_lock(), never while holding it.
+
+    Args:
+        conversation_id: Conversation to guard
+        exclusive: True for the cutover itself
+
+    Raises:
+        DeadlineExceeded: If the deadline passes while the lock is held elsewhere
+    """
+    held = getattr(_held_guards, "ids", None)
+    if held is None:
+        held = _held_guards.ids = set()
+
+    if conversation_id in held or not (exclusive or _cutover_pending(conversation_id)):
+        yield
+        return
+
+    lock_dir = os.path.expanduser("~/.contextmemory/indexes")
+    os.makedirs(lock_dir, exist_ok=True)
+    with ExitStack() as stack:
+        # Only the wait is turned into DeadlineExceeded, not timeouts raised by the block
+        try:
+            stack.enter_context(file_lock(
+                os.path.join(lock_dir, f"conv_{conversation_id}.cutover.lock"),
+                exclusive=exclusive,
+                timeout=remaining(),
+            ))
+        except TimeoutError:
+            raise DeadlineExceeded(f"Deadline exceeded waiting for conversation {conversation_id}'s cutover") from None
+        held.add(conversation_id)
+        try:
+            yield
+        finally:
+            held.discard(conversation_id)
+
+
+def clear_migration_state() -> None:
+    """Forget a finished migration once every worker is configured with its target."""
+    write_migration_state(None)
+
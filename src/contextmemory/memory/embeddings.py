@@ -1,26 +1,106 @@
-from typing import List
+from typing import Dict, List, Optional
+import numpy as np
+from contextmemory.core.metrics import timed
 from contextmemory.core.openai_client import get_embedding_client
+from contextmemory.core.rate_limiter import limited_embeddings
 from contextmemory.core.settings import get_settings
+from contextmemory.memory.embedding_space import EmbeddingSpace, embedding_space
 
+# Max inputs per embeddings request
+EMBED_BATCH_SIZE = 512
 
-def embed_text(text: str) -> List[float]:
+
+def _embedding_model(space: Optional[EmbeddingSpace] = None) -> str:
+    """
+    Embedding model name to send to the provider.
+    
+    OpenRouter requires the provider prefix for embedding models;
+    it is only added if not already present.
+    """
+    settings = get_settings()
+    model = (space or embedding_space()).model
+    if settings.llm_provider == "openrouter" and not model.startswith("openai/"):
+        model = f"openai/{model}"
+    return model
+
+
+def _dimensions_kwargs(space: EmbeddingSpace) -> Dict:
+    """Extra request arguments asking the model for shortened embeddings."""
+    return {"dimensions": space.dimensions} if space.dimensions else {}
+
+
+def _fit(embedding: List[float], space: EmbeddingSpace) -> List[float]:
+    """
+    Shorten an embedding to the space's size.
+    
+    Some providers ignore the dimensions parameter. text-embedding-3
+    vectors are Matryoshka-trained, so keeping the leading dimensions and
+    renormalizing gives the same result the API would have returned.
+    """
+    dimensions = space.dimensions
+    if not dimensions or len(embedding) == dimensions:
+        return embedding
+    if len(embedding) < dimensions:
+        raise ValueError(
+            f"Embedding model returned {len(embedding)}-d vectors, "
+            f"fewer than embedding_dimensions={dimensions}"
+        )
+    vector = np.asarray(embedding[:dimensions], dtype=np.float64)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@timed("embedding")
+def embed_text(text: str, space: Optional[EmbeddingSpace] = None) -> List[float]:
     """
     Generate the embeddings of any text.
     
     Uses the configured provider (OpenAI or OpenRouter).
     For OpenRouter, uses the openai/text-embedding-3-small model format.
+    
+    Args:
+        text: Text to embed
+        space: Embedding space to use - pass embedding_space(conversation_id)
+               for anything compared with a conversation's memories.
+               Default: the space new conversations use.
     """
-    settings = get_settings()
+    space = space or embedding_space()
     client = get_embedding_client()
     
-    # OpenRouter requires the provider prefix for embedding models
-    # Only add prefix if not already present
-    model = settings.embedding_model
-    if settings.llm_provider == "openrouter" and not model.startswith("openai/"):
-        model = f"openai/{model}"
-    
-    response = client.embeddings.create(
-        model=model,
-        input=text
+    response = limited_embeddings(
+        client,
+        model=_embedding_model(space),
+        input=text,
+        **_dimensions_kwargs(space)
     )
-    return response.data[0].embedding
\ No newline at end of file
+    return _fit(response.data[0].embedding, space)
+
+
+@timed("embedding")
+def embed_texts(texts: List[str], space: Optional[EmbeddingSpace] = None) -> List[List[float]]:
+    """
+    Generate embeddings for several texts with as few API calls as possible.
+    
+    Args:
+        texts: Texts to embed
+        space: Embedding space to use (see embed_text)
+        
+    Returns:
+        One embedding per text, in input order
+    """
+    space = space or embedding_space()
+    client = get_embedding_client()
+    model = _embedding_model(space)
+    extra = _dimensions_kwargs(space)
+    
+    embeddings = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        response = limited_embeddings(
+            client,
+            model=model,
+            input=texts[start:start + EMBED_BATCH_SIZE],
+            **extra
+        )
+        # The API may return items out of order; index says where each belongs
+        for item in sorted(response.data, key=lambda d: d.index):
+            embeddings.append(_fit(item.embedding, space))
+    return embeddings
@@ -0,0 +1,337 @@
+"""
+Extraction gate - skips the extraction LLM call on turns with nothing to remember.
+
+Many turns ("ok thanks", "lol", "hi") produce no memories, but still cost a
+full extraction call. A gate looks at the turn first and decides whether
+extraction is worth calling:
+
+- HeuristicGate: skips turns whose user message has no words, or only a
+  few filler words (greetings, acknowledgements, laughter)
+- ClassifierGate: heuristics first, then a HashedNgramClassifier
+  (logistic regression over hashed word and character n-grams) scoring
+  the remaining turns
+
+settings.extraction_gate selects the mode:
+- "off": always extract (default)
+- "on": skipped turns are stored as messages but not extracted from
+- "shadow": always extract, but count how often the gate would have
+  skipped a turn that did produce memories (get_gate_stats()). Shadow
+  runs also collect labelled samples for training a classifier
+  (get_shadow_samples()).
+
+Custom gates subclass ExtractionGate and are installed with set_extraction_gate().
+"""
+
+import math
+import re
+import threading
+import zlib
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from contextmemory.core.settings import get_settings
+
+# User messages made only of these words are not worth extracting from.
+# Answers like "yes"/"no" are deliberately absent: replying to a question
+# ("Are you vegetarian?") they can carry a fact.
+TRIVIAL_WORDS = frozenset("""
+    ok okay k kk okie alright fine
+    thanks thank thx ty tysm you u very much so a lot
+    lol lmao rofl haha hahaha hehe heh xd
+    hi hii hello hey heya yo sup morning evening night good gn gm
+    bye goodbye cya see later cheers
+    cool nice great awesome perfect amazing wow oh ah ahh hmm hm mhm uh um
+    got it gotcha understood makes sense sounds that this is
+    indeed np welcome please pls plz
+    lgtm ack noted
+""".split())
+
+# Most words a trivial message can have
+MAX_TRIVIAL_WORDS = 6
+
+# Shadow-mode samples kept for training (user text, produced memories)
+MAX_SHADOW_SAMPLES = 10_000
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+class GateDecision(NamedTuple):
+    """
+    Whether a turn should be extracted from, and why.
+
+    In shadow mode extract is always True and shadow_skip holds the
+    gate's actual verdict.
+    """
+
+    extract: bool
+    reason: str
+    score: Optional[float] = None
+    shadow_skip: Optional[bool] = None
+
+
+class ExtractionGate:
+    """Base class for gates."""
+
+    def decide(self, user_text: str, assistant_text: str = "") -> GateDecision:
+        raise NotImplementedError
+
+
+class HeuristicGate(ExtractionGate):
+    """
+    Skips turns whose user message is empty or only filler words.
+
+    Memories are extracted from what the user says, so only the user
+    message is looked at.
+
+    Args:
+        max_trivial_words: Longest all-filler message that is skipped
+        trivial_words: Filler vocabulary (lowercase)
+    """
+
+    def __init__(self, max_trivial_words: int = MAX_TRIVIAL_WORDS, trivial_words: Iterable[str] = TRIVIAL_WORDS):
+        self.max_trivial_words = max_trivial_words
+        self.trivial_words = frozenset(trivial_words)
+
+    def decide(self, user_text: str, assistant_text: str = "") -> GateDecision:
+        words = _WORD.findall(user_text.lower())
+        if not words:
+            return GateDecision(False, "no_words")
+        if len(words) <= self.max_trivial_words and all(word in self.trivial_words for word in words):
+            return GateDecision(False, "trivial")
+        return GateDecision(True, "heuristic")
+
+
+class HashedNgramClassifier:
+    """
+    Logistic regression over hashed n-grams: scores how likely a message holds something to remember.
+
+    Features are word unigrams and bigrams plus character trigrams, hashed
+    into n_features buckets, so the model is a single weight vector with
+    no vocabulary to ship. Train it on your own traffic, e.g. on the
+    samples a shadow-mode run collects (get_shadow_samples()).
+
+    Args:
+        n_features: Hash buckets (power of two)
+    """
+
+    def __init__(self, n_features: int = 2 ** 18):
+        self.n_features = n_features
+        self.weights = np.zeros(n_features, dtype=np.float32)
+        self.bias = 0.0
+
+    def features(self, text: str) -> Dict[int, float]:
+        """Sparse, L2-normalized hashed n-gram counts."""
+        text = text.lower()
+        words = _WORD.findall(text)
+        grams = [f"w:{w}" for w in words]
+        grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {' '.join(words)} "
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+        counts: Dict[int, float] = {}
+        for gram in grams:
+            index = zlib.crc32(gram.encode("utf-8")) % self.n_features
+            counts[index] = counts.get(index, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+        return {index: value / norm for index, value in counts.items()}
+
+    def _predict(self, features: Dict[int, float]) -> float:
+        z = self.bias + sum(float(self.weights[i]) * v for i, v in features.items())
+        return 1.0 / (1.0 + math.exp(-max(min(z, 35.0), -35.0)))
+
+    def score(self, text: str) -> float:
+        """Probability that extraction finds something in text."""
+        return self._predict(self.features(text))
+
+    def train(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[bool],
+        epochs: int = 5,
+        learning_rate: float = 0.5,
+        l2: float = 1e-5,
+    ) -> "HashedNgramClassifier":
+        """
+        Fit with SGD.
+
+        Args:
+            texts: User messages
+            labels: Whether extraction produced memories for each
+        """
+        if len(texts) != len(labels):
+            raise ValueError("texts and labels must have the same length")
+
+        samples = [(self.features(text), 1.0 if label else 0.0) for text, label in zip(texts, labels)]
+        rng = np.random.default_rng(0)
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch)
+            for i in rng.permutation(len(samples)):
+                features, target = samples[i]
+                error = self._predict(features) - target
+                for j, v in features.items():
+                    self.weights[j] -= rate * (error * v + l2 * self.weights[j])
+                self.bias -= rate * error
+        return self
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, weights=self.weights, bias=np.float32(self.bias))
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNgramClassifier":
+        data = np.load(path)
+        classifier = cls(n_features=len(data["weights"]))
+        classifier.weights = data["weights"].astype(np.float32)
+        classifier.bias = float(data["bias"])
+        return classifier
+
+
+class ClassifierGate(ExtractionGate):
+    """
+    Heuristics first, then a classifier for the turns they let through.
+
+    Args:
+        classifier: Trained HashedNgramClassifier
+        threshold: Skip turns scoring below this. Keep it low: a false
+                   skip loses a memory, a false extract only costs a call.
+        heuristics: Gate applied before the classifier
+    """
+
+    def __init__(
+        self,
+        classifier: HashedNgramClassifier,
+        threshold: float = 0.2,
+        heuristics: Optional[ExtractionGate] = None,
+    ):
+        self.classifier = classifier
+        self.threshold = threshold
+        self.heuristics = heuristics or HeuristicGate()
+
+    def decide(self, user_text: str, assistant_text: str = "") -> GateDecision:
+        decision = self.heuristics.decide(user_text, assistant_text)
+        if not decision.extract:
+            return decision
+        score = self.classifier.score(user_text)
+        return GateDecision(score >= self.threshold, "classifier", score)
+
+
+class GateStats:
+    """
+    Counters of gate decisions.
+
+    In shadow mode, would_skip counts turns the gate would have skipped and
+    false_skips those of them that extraction found memories in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.skipped = 0
+        self.would_skip = 0
+        self.false_skips = 0
+        self.reasons: Dict[str, int] = {}
+        self.samples: "deque[Tuple[str, bool]]" = deque(maxlen=MAX_SHADOW_SAMPLES)
+
+    def record(self, decision: GateDecision, skipped: bool) -> None:
+        with self._lock:
+            self.evaluated += 1
+            self.reasons[decision.reason] = self.reasons.get(decision.reason, 0) + 1
+            if skipped:
+                self.skipped += 1
+
+    def record_shadow(self, user_text: str, would_skip: bool, produced: bool) -> None:
+        with self._lock:
+            self.samples.append((user_text, produced))
+            if would_skip:
+                self.would_skip += 1
+                if produced:
+                    self.false_skips += 1
+
+    def as_dict(self) -> Dict:
+        return {
+            "evaluated": self.evaluated,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skipped / self.evaluated, 4) if self.evaluated else 0.0,
+            "reasons": dict(self.reasons),
+            "shadow_would_skip": self.would_skip,
+            "shadow_false_skips": self.false_skips,
+            "shadow_false_skip_rate": round(self.false_skips / self.would_skip, 4) if self.would_skip else 0.0,
+        }
+
+
+# Global gate and counters (lazy initialized)
+_gate: Optional[ExtractionGate] = None
+_stats = GateStats()
+
+
+def get_extraction_gate() -> ExtractionGate:
+    """
+    Get or create the process-wide gate.
+
+    A ClassifierGate if settings.extraction_gate_model points to a saved
+    classifier, otherwise a HeuristicGate.
+    """
+    global _gate
+    if _gate is None:
+        model_path = get_settings().extraction_gate_model
+        if model_path:
+            _gate = ClassifierGate(HashedNgramClassifier.load(model_path))
+        else:
+            _gate = HeuristicGate()
+    return _gate
+
+
+def set_extraction_gate(gate: Optional[ExtractionGate]) -> None:
+    """Install a custom gate (None restores the default)."""
+    global _gate
+    _gate = gate
+
+
+def should_extract(user_text: str, assistant_text: str = "") -> GateDecision:
+    """
+    Decide whether to run extraction on a turn, per settings.extraction_gate.
+
+    Callers skip extraction when decision.extract is False, and pass the
+    decision to observe_extraction() once extraction has run.
+    """
+    mode = get_settings().extraction_gate
+    if mode == "off":
+        return GateDecision(True, "off")
+
+    decision = get_extraction_gate().decide(user_text, assistant_text)
+    skipped = mode == "on" and not decision.extract
+    _stats.record(decision, skipped)
+
+    if skipped and get_settings().debug:
+        print(f"[DEBUG] Extraction gate skipped turn ({decision.reason}): {user_text[:80]!r}")
+
+    if mode == "shadow":
+        return decision._replace(extract=True, shadow_skip=not decision.extract)
+    return decision
+
+
+def observe_extraction(user_text: str, decision: GateDecision, result: Dict) -> None:
+    """Check a shadow decision against what extraction actually found."""
+    if decision.shadow_skip is None:
+        return
+    produced = bool(result.get("semantic") or result.get("bubbles"))
+    _stats.record_shadow(user_text, decision.shadow_skip, produced)
+
+
+def get_gate_stats() -> Dict:
+    """Gate decision counters, including the shadow-mode false-skip rate."""
+    return _stats.as_dict()
+
+
+def get_shadow_samples() -> List[Tuple[str, bool]]:
+    """(user message, produced memories) pairs seen in shadow mode, for HashedNgramClassifier.train()."""
+    with _stats._lock:
+        return list(_stats.samples)
+
+
+def reset_extraction_gate() -> None:
+    """Drop the gate and counters. Useful for testing."""
+    global _gate, _stats
+    _gate = None
+    _stats = GateStats()
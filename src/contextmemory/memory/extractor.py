@@ -1,9 +1,14 @@
 import json
 import re
-from typing import List, Dict, Any
-from contextmemory.core.openai_client import get_llm_client
+import time
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from contextmemory.core.metrics import observe_stage, record_usage, timed
+from contextmemory.core.openai_client import get_stage_client
+from contextmemory.core.prompt_builder import PromptBuilder
+from contextmemory.core.rate_limiter import limited_chat_completion
 from contextmemory.core.settings import get_settings
-from contextmemory.utils.extraction_system_prompt import EXTRACTION_SYSTEM_PROMPT
+from contextmemory.memory.json_stream import JsonArrayStream
+from contextmemory.utils.extraction_system_prompt import EXTRACTION_SYSTEM_PROMPT, WINDOW_EXTRACTION_PROMPT
 
 
 def extract_memories(latest_pair: List[str], summary_text: str, recent_messages: List[str]) -> Dict[str, Any]:
@@ -17,14 +22,130 @@ def extract_memories(latest_pair: List[str], summary_text: str, recent_messages:
         }
     """
     settings = get_settings()
-    llm_client = get_llm_client()
+    llm_client = get_stage_client("extraction")
+    stage = settings.get_stage("extraction")
+
+    # LLM extracts memory facts (model supports OpenRouter format like "openai/gpt-4o-mini")
+    response = limited_chat_completion(
+        llm_client,
+        model=stage.model,
+        messages=_extraction_messages(latest_pair, summary_text, recent_messages, stage.model),
+        temperature=stage.temperature
+    )
+
+    raw_output = response.choices[0].message.content
+    
+    # Debug logging
+    if settings.debug:
+        print(f"[DEBUG] Raw LLM output: {raw_output[:500]}...")
+    
+    result = _parse_output(raw_output)
+    if result is None:
+        return {"semantic": [], "bubbles": []}
+    
+    # Validate structure
+    if "semantic" not in result:
+        result["semantic"] = []
+    if "bubbles" not in result:
+        result["bubbles"] = []
+        
+    if settings.debug:
+        print(f"[DEBUG] Extracted: {len(result['semantic'])} semantic, {len(result['bubbles'])} bubbles")
+        
+    return result
+
+
+def stream_memories(
+    latest_pair: List[str], summary_text: str, recent_messages: List[str]
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming extract_memories(): yields each memory as soon as the LLM has written it.
+    
+    The completion is streamed and parsed incrementally, so the caller can
+    embed and classify the first facts while the rest are still being
+    generated.
+    
+    Yields:
+        ("semantic", "fact") and ("bubbles", {"text": "...", "importance": 0.7}),
+        in the order the LLM writes them
+    """
+    settings = get_settings()
+    llm_client = get_stage_client("extraction")
+    stage = settings.get_stage("extraction")
+
+    parser = JsonArrayStream(("semantic", "bubbles"))
+    yielded = {"semantic": 0, "bubbles": 0}
+    chunks = []
+    usage = None
+
+    # Only time reading the stream: between chunks this generator is paused
+    # while the caller stores memories (with LLM and embeddings calls of its own)
+    llm_seconds = 0.0
+    error = None
+    started = time.perf_counter()
+    try:
+        stream = iter(limited_chat_completion(
+            llm_client,
+            model=stage.model,
+            messages=_extraction_messages(latest_pair, summary_text, recent_messages, stage.model),
+            temperature=stage.temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+        ))
+        llm_seconds += time.perf_counter() - started
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(stream, None)
+            finally:
+                llm_seconds += time.perf_counter() - started
+            if chunk is None:
+                break
+            # Usage arrives in the final chunk, which has no choices
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content or ""
+            chunks.append(text)
+            for key, value in parser.feed(text):
+                yielded[key] += 1
+                yield key, value
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        observe_stage("llm", llm_seconds, error=error, kind="chat", model=stage.model)
+    record_usage("chat", stage.model, usage)
+
+    raw_output = "".join(chunks)
+    if settings.debug:
+        print(f"[DEBUG] Raw LLM output (streamed): {raw_output[:500]}...")
+
+    # Anything the incremental parser couldn't place, e.g. a reply that isn't one JSON object
+    if not parser.done:
+        result = _parse_output(raw_output)
+        if isinstance(result, dict):
+            for key in yielded:
+                for value in (result.get(key) or [])[yielded[key]:]:
+                    yield key, value
 
-    # List of string -> Single string
-    recent_msgs_text = "\n".join(recent_messages)
-    latest_pair_text = "\n".join(latest_pair)
+
+def _extraction_messages(
+    latest_pair: List[str], summary_text: str, recent_messages: List[str], model: str
+) -> List[Dict]:
+    """Chat messages asking the extraction LLM about the latest pair, fitted to the prompt budgets."""
+    builder = PromptBuilder("extraction", model)
+    builder.text("system", EXTRACTION_SYSTEM_PROMPT)
+    summary_text = builder.text("summary", summary_text)
+
+    # List of string -> Single string (newest messages win when over budget)
+    recent_msgs_text = "\n".join(builder.items("recent_messages", recent_messages, keep="last"))
+    latest_pair_text = builder.text("latest_pair", "\n".join(latest_pair))
+    builder.record()
 
     # Format msgs to give to LLM for extraction
-    messages = [
+    return [
         {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT},
         {
             "role": "user", 
@@ -43,21 +164,110 @@ Extract memory facts (semantic facts and bubbles).
         }
     ]
 
-    # Get model from settings (supports OpenRouter format like "openai/gpt-4o-mini")
-    model = settings.llm_model
 
-    # LLM extracts memory facts 
-    response = llm_client.chat.completions.create(
-        model=model,
+@timed("extraction")
+def extract_memories_window(turns: List[str], summary_text: str, recent_messages: List[str]) -> List[Dict[str, Any]]:
+    """
+    Extract memories from several consecutive turns with one LLM call.
+    
+    The summary and recent messages are sent once for the whole window
+    instead of once per turn, so a window of K turns takes 1 call instead
+    of K. Larger windows save more but make the prompt longer - size them
+    to the model's context (settings.extraction_window).
+    
+    Args:
+        turns: Formatted user/assistant pairs, oldest first
+        summary_text: Conversation summary (context only)
+        recent_messages: Messages before the first turn (context only)
+    
+    Returns:
+        One {"semantic": [...], "bubbles": [...]} per turn, in order
+    """
+    if len(turns) == 1:
+        return [extract_memories(turns, summary_text, recent_messages)]
+
+    settings = get_settings()
+    llm_client = get_stage_client("extraction")
+    stage = settings.get_stage("extraction")
+
+    builder = PromptBuilder("extraction", stage.model)
+    builder.text("system", EXTRACTION_SYSTEM_PROMPT + WINDOW_EXTRACTION_PROMPT)
+    summary_text = builder.text("summary", summary_text)
+    recent_msgs_text = "\n".join(builder.items("recent_messages", recent_messages, keep="last"))
+    # Each turn gets the budget of a single turn's latest pair
+    turns_text = "\n\n".join(
+        f"[Turn {i}]\n{builder.text('latest_pair', turn)}" for i, turn in enumerate(turns, 1)
+    )
+    builder.record()
+
+    messages = [
+        {"role": "system", "content": EXTRACTION_SYSTEM_PROMPT + WINDOW_EXTRACTION_PROMPT},
+        {
+            "role": "user",
+            "content": f"""
+Conversation Summary:
+{summary_text}
+
+Recent Messages:
+{recent_msgs_text}
+
+New Interactions:
+{turns_text}
+
+Extract memory facts (semantic facts and bubbles) from each of the {len(turns)} turns.
+"""
+        }
+    ]
+
+    response = limited_chat_completion(
+        llm_client,
+        model=stage.model,
         messages=messages,
-        temperature=0.1
+        temperature=stage.temperature
     )
 
     raw_output = response.choices[0].message.content
-    
-    # Debug logging
+
     if settings.debug:
-        print(f"[DEBUG] Raw LLM output: {raw_output[:500]}...")
+        print(f"[DEBUG] Raw LLM output ({len(turns)} turns): {raw_output[:500]}...")
+
+    result = _parse_output(raw_output)
+    if not isinstance(result, dict) or not isinstance(result.get("turns"), list):
+        # Don't lose a whole window to one malformed reply
+        if settings.debug:
+            print(f"[DEBUG] Unusable multi-turn output, extracting {len(turns)} turns one by one")
+        return [
+            extract_memories([turn], summary_text, list(recent_messages) + turns[:i])
+            for i, turn in enumerate(turns)
+        ]
+
+    results = [{"semantic": [], "bubbles": []} for _ in turns]
+    for position, entry in enumerate(result["turns"]):
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get("turn", position + 1)) - 1
+        except (TypeError, ValueError):
+            index = position
+        if 0 <= index < len(turns):
+            results[index] = {
+                "semantic": entry.get("semantic") or [],
+                "bubbles": entry.get("bubbles") or [],
+            }
+
+    if settings.debug:
+        print(
+            f"[DEBUG] Extracted from {len(turns)} turns: "
+            f"{sum(len(r['semantic']) for r in results)} semantic, "
+            f"{sum(len(r['bubbles']) for r in results)} bubbles"
+        )
+
+    return results
+
+
+def _parse_output(raw_output: str) -> Optional[Any]:
+    """Parse the extractor's JSON reply, or None if it isn't valid JSON."""
+    settings = get_settings()
     
     # Parse JSON - handle markdown code blocks
     try:
@@ -74,20 +284,9 @@ Extract memory facts (semantic facts and bubbles).
         # Clean up any leading/trailing whitespace
         json_str = json_str.strip()
         
-        result = json.loads(json_str)
-        
-        # Validate structure
-        if "semantic" not in result:
-            result["semantic"] = []
-        if "bubbles" not in result:
-            result["bubbles"] = []
-            
-        if settings.debug:
-            print(f"[DEBUG] Extracted: {len(result['semantic'])} semantic, {len(result['bubbles'])} bubbles")
-            
-        return result
+        return json.loads(json_str)
     except json.JSONDecodeError as e:
         if settings.debug:
             print(f"[DEBUG] JSON parse error: {e}")
             print(f"[DEBUG] Attempted to parse: {json_str[:200]}...")
-        return {"semantic": [], "bubbles": []}
\ No newline at end of file
+        return None
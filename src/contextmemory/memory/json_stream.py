@@ -0,0 +1,138 @@
+"""
+Incremental JSON parsing of streamed LLM output.
+
+JsonArrayStream is fed the text of a completion as it arrives and returns
+each element of selected top-level arrays as soon as the element is
+complete, e.g. every fact of {"semantic": [...], "bubbles": [...]} while
+the rest of the object is still being generated.
+
+Text before the first "{" (a ```json fence, a preamble) and after the
+top-level object closes is ignored. Only the selected arrays' elements are
+decoded; everything else is only scanned for structure.
+"""
+
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+class JsonArrayStream:
+    """
+    Streaming extractor of top-level array elements.
+
+    Args:
+        keys: Top-level keys whose array elements are returned
+
+    Example:
+        >>> stream = JsonArrayStream(["semantic"])
+        >>> stream.feed('{"semantic": ["User likes tea", "Us')
+        [('semantic', 'User likes tea')]
+        >>> stream.feed('er lives in Oslo"]}')
+        [('semantic', 'User lives in Oslo')]
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys = frozenset(keys)
+        self._data = ""
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self.done = False
+
+        # String scanning
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+        # Key of the value being parsed in the top-level object
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+
+        # Selected array being read, and the start of its current element
+        self._array: Optional[str] = None
+        self._element_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Add the next chunk of text; returns the (key, element) pairs it completed."""
+        if self.done or not text:
+            return []
+
+        self._data += text
+        data = self._data
+
+        elements = []
+        while self._pos < len(data) and not self.done:
+            char = data[self._pos]
+            index = self._pos
+            self._pos += 1
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = data[self._string_start:index + 1]
+                    elif self._array is not None and self._depth == 2:
+                        self._emit(data, index + 1, elements)
+                continue
+
+            if char.isspace():
+                continue
+
+            # Start of an element of the selected array
+            if self._array is not None and self._depth == 2 and self._element_start is None and char not in ",]":
+                self._element_start = index
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ":" and self._depth == 1:
+                self._key = _decode(self._last_string)
+            elif char == "," and self._depth == 1:
+                self._key = None
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._depth == 2 and self._key in self.keys:
+                    self._array = self._key
+            elif char in "}]":
+                # A number, true, false or null ends at the bracket
+                if self._array is not None and self._depth == 2 and self._element_start is not None:
+                    self._emit(data, index, elements)
+                self._depth -= 1
+                if self._depth == 1:
+                    self._array = None
+                elif self._array is not None and self._depth == 2:
+                    self._emit(data, index + 1, elements)
+                elif self._depth == 0:
+                    self.done = True
+            elif char == "," and self._array is not None and self._depth == 2 and self._element_start is not None:
+                self._emit(data, index, elements)
+
+        return elements
+
+    def _emit(self, data: str, end: int, elements: List[Tuple[str, Any]]) -> None:
+        start, self._element_start = self._element_start, None
+        if start is None:
+            return
+        try:
+            elements.append((self._array, json.loads(data[start:end])))
+        except json.JSONDecodeError:
+            # Malformed element: skip it, the final parse of the whole reply may still recover it
+            pass
+
+
+def _decode(token: Optional[str]) -> Optional[str]:
+    if token is None:
+        return None
+    try:
+        return json.loads(token)
+    except json.JSONDecodeError:
+        return None
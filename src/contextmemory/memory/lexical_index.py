@@ -0,0 +1,171 @@
+"""
+Lexical Index - Full-text search over memory text.
+
+Uses the database's own full-text engine so the index is maintained by
+the database on every insert/update/delete:
+- sqlite: FTS5 external-content table kept in sync by triggers, ranked by BM25
+- postgresql: GIN index on to_tsvector(memory_text), ranked by ts_rank_cd
+"""
+
+import re
+from typing import List, Dict
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from contextmemory.core.metrics import timed
+from contextmemory.core.settings import get_settings
+
+TS_CONFIG = "english"
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+        memory_text,
+        content='memories',
+        content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS memories_fts_ai AFTER INSERT ON memories BEGIN
+        INSERT INTO memories_fts(rowid, memory_text) VALUES (new.id, new.memory_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS memories_fts_ad AFTER DELETE ON memories BEGIN
+        INSERT INTO memories_fts(memories_fts, rowid, memory_text)
+        VALUES ('delete', old.id, old.memory_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS memories_fts_au AFTER UPDATE OF memory_text ON memories BEGIN
+        INSERT INTO memories_fts(memories_fts, rowid, memory_text)
+        VALUES ('delete', old.id, old.memory_text);
+        INSERT INTO memories_fts(rowid, memory_text) VALUES (new.id, new.memory_text);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_memories_memory_text_tsv
+    ON memories USING GIN (to_tsvector('{TS_CONFIG}', memory_text))
+    """,
+]
+
+# Engines whose lexical index has already been ensured
+_ensured: set = set()
+
+
+def ensure_lexical_index(engine: Engine) -> None:
+    """
+    Create the full-text index for the engine's backend.
+
+    Safe to call multiple times (idempotent). On SQLite, an index created
+    for an existing database is backfilled from the memories table.
+    """
+    dialect = engine.dialect.name
+
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memories_fts'")
+            ).first()
+            for statement in _SQLITE_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text("INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')"))
+        elif dialect == "postgresql":
+            for statement in _POSTGRES_DDL:
+                conn.execute(text(statement))
+        elif get_settings().debug:
+            print(f"[DEBUG] No lexical index support for {dialect}")
+
+    _ensured.add(engine.url)
+
+
+def _tokenize(query: str) -> List[str]:
+    """Split a free-text query into plain word tokens (drops query syntax)."""
+    return re.findall(r"\w+", query.lower())
+
+
+@timed("lexical_search")
+def lexical_search(db: Session, conversation_id: int, query: str, limit: int = 10) -> List[Dict]:
+    """
+    Rank a conversation's active memories by keyword relevance.
+
+    Any query word may match (OR semantics); documents matching more and
+    rarer words rank higher.
+
+    Args:
+        db: Database session
+        conversation_id: Conversation to search
+        query: Free-text query
+        limit: Max results
+
+    Returns:
+        List of dicts with memory_id and score, best first. Scores are
+        relative to the best match, so the top result scores 1.0.
+    """
+    tokens = _tokenize(query)
+    if not tokens:
+        return []
+
+    engine = db.get_bind()
+    if engine.url not in _ensured:
+        ensure_lexical_index(engine)
+
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        rows = db.execute(
+            text(
+                """
+                SELECT m.id, -bm25(memories_fts) AS relevance
+                FROM memories_fts
+                JOIN memories m ON m.id = memories_fts.rowid
+                WHERE memories_fts MATCH :match
+                  AND m.conversation_id = :conversation_id
+                  AND m.is_active = :active
+                ORDER BY bm25(memories_fts)
+                LIMIT :limit
+                """
+            ),
+            {
+                "match": " OR ".join(f'"{t}"' for t in tokens),
+                "conversation_id": conversation_id,
+                "active": True,
+                "limit": limit,
+            },
+        ).all()
+    elif dialect == "postgresql":
+        rows = db.execute(
+            text(
+                f"""
+                SELECT id, ts_rank_cd(to_tsvector('{TS_CONFIG}', memory_text), q) AS relevance
+                FROM memories, to_tsquery('{TS_CONFIG}', :match) AS q
+                WHERE to_tsvector('{TS_CONFIG}', memory_text) @@ q
+                  AND conversation_id = :conversation_id
+                  AND is_active = :active
+                ORDER BY relevance DESC
+                LIMIT :limit
+                """
+            ),
+            {
+                "match": " | ".join(tokens),
+                "conversation_id": conversation_id,
+                "active": True,
+                "limit": limit,
+            },
+        ).all()
+    else:
+        return []
+
+    if not rows:
+        return []
+
+    best = max(float(r[1]) for r in rows) or 1.0
+    return [
+        {"memory_id": r[0], "score": max(float(r[1]), 0.0) / best}
+        for r in rows
+    ]
@@ -1,15 +1,130 @@
+import heapq
+import itertools
 import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import ExitStack
 from datetime import datetime, timezone
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
+from openai import APIError
 
 from contextmemory.memory.add.add_extraction_phase import extraction_phase
 from contextmemory.memory.add.add_updation_phase import update_phase
 
 from contextmemory.memory.embeddings import embed_text
+from contextmemory.memory.embedding_space import EmbeddingSpace, cutover_epoch, embedding_space, migration_guard
 from contextmemory.db.models.memory import Memory
+from contextmemory.db.models.conversation import Conversation
 from contextmemory.memory.bubble_creator import create_bubbles
-from contextmemory.memory.vector_store import get_vector_store, rebuild_index_from_db, save_vector_store
+from contextmemory.memory.backfill import DEFAULT_CHUNK_SIZE, backfill_conversation
+from contextmemory.memory.connection_finder import get_connections
+from contextmemory.memory.connection_graph import get_connection_graph
+from contextmemory.memory.context_packer import DEDUP_SIMILARITY, dedupe, format_memory, pack
+from contextmemory.memory.lexical_index import lexical_search
+from contextmemory.memory.rank_fusion import reciprocal_rank_fusion
+from contextmemory.memory.search_cache import (
+    bump_generation,
+    get_embedding_cache,
+    get_generation,
+    get_search_cache,
+    query_hash,
+)
+from contextmemory.core.settings import get_settings
+from contextmemory.core.prompt_builder import count_tokens
+from contextmemory.core.locks import conversation_lock, hold_conversation_lock
+from contextmemory.core.metrics import timed
+from contextmemory.core.deadline import DeadlineExceeded, deadline, remaining
+from contextmemory.core.rate_limiter import INTERACTIVE, request_priority
+from contextmemory.memory.vector_store import (
+    DEFAULT_IMPORTANCE,
+    SearchFilter,
+    get_vector_store,
+    index_memory,
+    rebuild_index_from_db,
+    save_vector_store,
+)
+
+# Max connected memories appended to search results
+MAX_CONNECTED = 3
+
+# Daily decay of bubble scores: recency = exp(-RECENCY_DECAY * days_ago)
+RECENCY_DECAY = 0.05
+
+# Worker threads used by search_across() to fan out FAISS searches
+SEARCH_ACROSS_WORKERS = 8
+
+# Searches redone when an embedding migration cuts a conversation over mid-search
+CUTOVER_RETRIES = 3
+
+# Part of a search's deadline_ms kept back for the fallback and DB fetch
+DEGRADED_RESERVE_MS = 20
+
+# Worker threads running query embeddings that search(deadline_ms=...) may stop waiting for
+QUERY_EMBED_WORKERS = 8
+
+_search_executor: Optional[ThreadPoolExecutor] = None
+_search_executor_lock = threading.Lock()
+_embed_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for cross-conversation searches (lazy initialized)."""
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(
+                max_workers=SEARCH_ACROSS_WORKERS,
+                thread_name_prefix="contextmemory-search",
+            )
+    return _search_executor
+
+
+def _get_embed_executor() -> ThreadPoolExecutor:
+    """Thread pool for query embeddings raced against a deadline (lazy initialized)."""
+    global _embed_executor
+    with _search_executor_lock:
+        if _embed_executor is None:
+            _embed_executor = ThreadPoolExecutor(
+                max_workers=QUERY_EMBED_WORKERS,
+                thread_name_prefix="contextmemory-query-embed",
+            )
+    return _embed_executor
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """Unix seconds of a datetime (naive values are taken as UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _time_left(soft_until: Optional[float]) -> bool:
+    """Whether a search due at soft_until still has more than the reserve left."""
+    return soft_until is None or soft_until - time.monotonic() > DEGRADED_RESERVE_MS / 1000
+
+
+def _matches(mem: Memory, search_filter: SearchFilter) -> bool:
+    """Check a memory against a SearchFilter (for candidates that did not come from FAISS)."""
+    if search_filter.memory_type is not None and mem.is_episodic != (search_filter.memory_type == "bubble"):
+        return False
+    if search_filter.min_importance is not None:
+        importance = DEFAULT_IMPORTANCE if mem.importance is None else mem.importance
+        if importance < search_filter.min_importance:
+            return False
+    if search_filter.has_time_window:
+        occurred = mem.occurred_at or (mem.created_at if mem.is_episodic else None)
+        if not mem.is_episodic or occurred is None:
+            return False
+        timestamp = _timestamp(occurred)
+        if search_filter.occurred_after is not None and timestamp < search_filter.occurred_after:
+            return False
+        if search_filter.occurred_before is not None and timestamp >= search_filter.occurred_before:
+            return False
+    return True
 
 
 class ContextMemory:
@@ -25,131 +140,311 @@ class ContextMemory:
 
 
     # add()
-    def add(self, messages: List[dict], conversation_id: int):
+    @timed("add")
+    def add(self, messages: List[dict], conversation_id: int, timeout: Optional[float] = None):
         """
         Add facts/memories to the db
-        """
         
-        # Extraction Phase
-        extraction_result = extraction_phase(
-            db=self.db,
-            messages=messages,
-            conversation_id=conversation_id,
-        )
+        Concurrent add() calls for the same conversation run one at a time;
+        different conversations proceed in parallel.
+        
+        With a timeout (seconds), waiting for the conversation's locks and
+        every LLM and embeddings call of the pipeline are bounded by the
+        time left, and each call by its stage's own timeout
+        (settings.extraction_timeout etc.). Running out raises
+        DeadlineExceeded; the messages are stored by then (unless it ran
+        out waiting for a lock), but memories from stages that didn't
+        finish are not.
+        
+        With settings.stream_extraction, each memory is embedded, classified
+        and stored as soon as the extraction LLM has written it, overlapping
+        generation with the rest of the pipeline.
+        """
+        # Serialize the whole pipeline per conversation
+        with deadline(timeout), migration_guard(conversation_id), hold_conversation_lock(conversation_id):
+            if get_settings().stream_extraction:
+                return self._add_streaming(messages, conversation_id)
+            
+            # Extraction Phase
+            extraction_result = extraction_phase(
+                db=self.db,
+                messages=messages,
+                conversation_id=conversation_id,
+            )
 
-        semantic_facts = extraction_result.get("semantic", [])
-        bubbles_data = extraction_result.get("bubbles", [])
+            semantic_facts = extraction_result.get("semantic", [])
+            bubbles_data = extraction_result.get("bubbles", [])
 
 
-        # Update Phase
-        # Process semantic facts (existing logic)
-        if semantic_facts:
-            update_phase(
-                db=self.db,
-                candidate_facts=semantic_facts,
-                conversation_id=conversation_id
-            )
+            # Update Phase
+            # Process semantic facts (existing logic)
+            if semantic_facts:
+                update_phase(
+                    db=self.db,
+                    candidate_facts=semantic_facts,
+                    conversation_id=conversation_id
+                )
+
+            # Create bubbles
+            if bubbles_data:
+                create_bubbles(
+                    db=self.db,
+                    bubbles=bubbles_data,
+                    conversation_id=conversation_id,
+                    session_id=None # Add session tracking later
+                )
+        
+            return {
+                "semantic": semantic_facts,
+                "bubbles": [b.get("text", "") for b in bubbles_data]
+            }
 
-        # Create bubbles
-        if bubbles_data:
-            create_bubbles(
+    def _add_streaming(self, messages: List[dict], conversation_id: int):
+        """add() with streamed extraction. Caller holds the conversation lock."""
+        stored = False
+        
+        def store(kind, value):
+            nonlocal stored
+            if kind == "semantic":
+                update_phase(
+                    db=self.db,
+                    candidate_facts=[value],
+                    conversation_id=conversation_id,
+                    save_index=False,
+                )
+            else:
+                create_bubbles(
+                    db=self.db,
+                    bubbles=[value],
+                    conversation_id=conversation_id,
+                    save_index=False,
+                )
+            stored = True
+        
+        try:
+            extraction_result = extraction_phase(
                 db=self.db,
-                bubbles=bubbles_data,
+                messages=messages,
                 conversation_id=conversation_id,
-                session_id=None # Add session tracking later
+                on_memory=store,
             )
+        finally:
+            # One index save for the whole turn, including memories stored
+            # before the stream broke off
+            if stored:
+                save_vector_store(conversation_id)
         
         return {
-            "semantic": semantic_facts,
-            "bubbles": [b.get("text", "") for b in bubbles_data]
+            "semantic": extraction_result.get("semantic", []),
+            "bubbles": [b.get("text", "") for b in extraction_result.get("bubbles", [])]
+        }
+
+    def add_many(
+        self,
+        messages: List[dict],
+        conversation_id: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        extraction_window: Optional[int] = None,
+    ):
+        """
+        Import a conversation's history in bulk
+        
+        Same result as calling add() on each user/assistant pair in order,
+        with batched embeddings and message inserts, one index save and one
+        summary at the end. Messages may carry an ISO 8601 "timestamp".
+        extraction_window turns (default: settings.extraction_window) share
+        one extraction call. See memory.backfill for importing transcript files.
+        
+        Returns:
+            Counts: {"turns": ..., "messages": ..., "semantic": ..., "bubbles": ...}
+        """
+        stats = backfill_conversation(
+            self.db, conversation_id, messages, chunk_size=chunk_size, extraction_window=extraction_window
+        )
+        return {
+            "turns": stats.turns,
+            "messages": stats.messages,
+            "semantic": stats.semantic,
+            "bubbles": stats.bubbles,
         }
 
 
 
     # search()
-    def search(self, query: str, conversation_id: int, limit: int = 10, include_connections: bool = True) -> Dict:
+    @timed("search")
+    def search(
+        self,
+        query: str,
+        conversation_id: int,
+        limit: int = 10,
+        include_connections: bool = True,
+        expansion: str = "direct",
+        mode: str = "vector",
+        memory_type: Optional[str] = None,
+        min_importance: Optional[float] = None,
+        occurred_after: Optional[datetime] = None,
+        occurred_before: Optional[datetime] = None,
+        timeout: Optional[float] = None,
+        deadline_ms: Optional[float] = None,
+    ) -> Dict:
         """
-        Search for relevant memories using FAISS.
+        Search for relevant memories using FAISS and/or the lexical index.
+        
+        Results are cached per conversation until its next write, so repeated
+        searches skip the embeddings call, FAISS scan and DB fetch.
         
         Args:
             query: Search query text
             conversation_id: Conversation to search
             limit: Max results
             include_connections: Include connected bubbles
+            expansion: How connected bubbles are found. "direct" follows the
+                strongest links of each hit one hop; "graph" runs a bounded
+                personalized PageRank from all hits over the cached
+                connection graph, surfacing memories several hops away.
+            mode: "vector" (FAISS only), "lexical" (full-text index only, no
+                embeddings call) or "hybrid" (both, fused with reciprocal
+                rank fusion; falls back to lexical if embedding fails).
+            memory_type: Only "semantic" facts or only "bubble"s
+            min_importance: Only memories at least this important
+            occurred_after: Only bubbles that occurred at or after this time
+            occurred_before: Only bubbles that occurred before this time
+            timeout: Seconds the query embedding may take, including time
+                spent waiting on the rate limiter. Past it, vector search
+                raises DeadlineExceeded and hybrid search serves lexical results.
+            deadline_ms: Latency budget that degrades instead of failing.
+                If the query embedding (cached per query) isn't back in
+                time, results come from the lexical index, or are the most
+                recent memories when no keyword matches. Connection
+                expansion is skipped when time runs short. Either way the
+                response is flagged "degraded": True. The embeddings call
+                finishes in the background, so a retry hits the cache.
+            
+        Filters are applied inside the FAISS search, so the vector results
+        are the exact top matches among memories that pass them.
             
         Returns:
             Dict with query and results
         """
-        # Generate query embedding
-        query_embedding = embed_text(query)
+        if expansion not in ("direct", "graph"):
+            raise ValueError(f"Unknown expansion mode: {expansion}")
+        if mode not in ("vector", "hybrid", "lexical"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        if deadline_ms is not None and deadline_ms <= 0:
+            raise ValueError(f"deadline_ms must be positive, got {deadline_ms}")
+        soft_until = time.monotonic() + deadline_ms / 1000 if deadline_ms is not None else None
         
-        # Get FAISS index
-        vector_store = get_vector_store(conversation_id)
+        search_filter = None
+        if any(f is not None for f in (memory_type, min_importance, occurred_after, occurred_before)):
+            search_filter = SearchFilter(
+                memory_type=memory_type,
+                min_importance=min_importance,
+                occurred_after=_timestamp(occurred_after),
+                occurred_before=_timestamp(occurred_before),
+            )
         
-        # Rebuild if empty
-        if vector_store.count == 0:
-            vector_store = rebuild_index_from_db(self.db, conversation_id)
+        # Serve repeated searches from the cache until the next write
+        cache = get_search_cache()
+        cache_key = (query_hash(query), limit, include_connections, expansion, mode, search_filter)
+        cached = cache.get(conversation_id, cache_key)
+        if cached is not None:
+            return cached
         
-        # FAISS search (O(log n))
-        faiss_results = vector_store.search(query_embedding, k=limit * 2)
+        generation = get_generation(conversation_id)
+        with deadline(timeout):
+            result = self._search(
+                query, conversation_id, limit, include_connections, expansion, mode, search_filter, soft_until
+            )
         
-        if not faiss_results:
-            return {"query": query, "results": []}
+        # Degraded (fallback) results are not worth keeping around
+        if not result.get("degraded"):
+            cache.put(conversation_id, cache_key, result, generation)
+        
+        return result
+        
+
+
+    def _search(
+        self,
+        query: str,
+        conversation_id: int,
+        limit: int,
+        include_connections: bool,
+        expansion: str,
+        mode: str,
+        search_filter: Optional[SearchFilter] = None,
+        soft_until: Optional[float] = None,
+    ) -> Dict:
+        """
+        Uncached search() implementation.
+        
+        soft_until is the time.monotonic() by which search(deadline_ms=...)
+        must answer.
+        """
+        candidates, degraded = self._find_candidates(
+            query, conversation_id, limit * 2, mode, search_filter, soft_until
+        )
+        
+        if not candidates:
+            return {"query": query, "results": [], **({"degraded": True} if degraded else {})}
         
         # Fetch Memory objects
-        memory_ids = [r["memory_id"] for r in faiss_results]
+        memory_ids = [r["memory_id"] for r in candidates]
         memories = self.db.query(Memory).filter(
             Memory.id.in_(memory_ids),
             Memory.is_active == True
         ).all()
         
-        if not memories:
-            return {"query": query, "results": []}
+        # Lexical candidates aren't pre-filtered
+        if search_filter is not None:
+            memories = [m for m in memories if _matches(m, search_filter)]
         
-        # Create lookup
-        id_to_mem = {m.id: m for m in memories}
-        faiss_scores = {r["memory_id"]: r["score"] for r in faiss_results}
+        if not memories:
+            return {"query": query, "results": [], **({"degraded": True} if degraded else {})}
         
         # Score with recency and importance
-        now = datetime.now(timezone.utc)
-        scored = []
-        
-        for mem in memories:
-            similarity = faiss_scores.get(mem.id, 0)
-            
-            # Recency decay for bubbles
-            if mem.is_episodic and mem.occurred_at:
-                # Handle timezone-naive occurred_at
-                occurred = mem.occurred_at
-                if occurred.tzinfo is None:
-                    occurred = occurred.replace(tzinfo=timezone.utc)
-                days_ago = (now - occurred).days
-                recency = math.exp(-0.05 * days_ago)
-            else:
-                recency = 1.0
-            
-            importance = mem.importance if mem.importance else 0.5
-            final_score = similarity * importance * recency
-            scored.append((final_score, mem))
-        
-        # Sort and limit
-        scored.sort(key=lambda x: x[0], reverse=True)
+        faiss_scores = {r["memory_id"]: r["score"] for r in candidates}
+        scored = self._score_memories(memories, faiss_scores)
         top_results = scored[:limit]
         
-        # Collect connected bubbles
+        # Expand connections with one batched edge lookup
         result_ids = {mem.id for _, mem in top_results}
+        connections = get_connections(self.db, result_ids)
         connected = []
         
-        if include_connections:
-            for _, mem in top_results:
-                if mem.memory_metadata and "connections" in mem.memory_metadata:
-                    conn_ids = mem.memory_metadata["connections"].get("bubble_ids", [])
-                    for conn_id in conn_ids[:2]:
+        # Short on time: skip expansion, the results are partial anyway
+        if include_connections and not degraded and _time_left(soft_until):
+            if expansion == "graph":
+                graph = get_connection_graph(self.db, conversation_id)
+                ranked = graph.personalized_pagerank(
+                    {mem.id: score for score, mem in top_results}
+                )
+                conn_scores = dict(ranked)
+                conn_ids = [mid for mid, _ in ranked if mid not in result_ids][:MAX_CONNECTED * 2]
+            else:
+                conn_scores = {}
+                conn_ids = []
+                for _, mem in top_results:
+                    for conn_id in connections.get(mem.id, [])[:2]:
                         if conn_id not in result_ids:
-                            conn_mem = self.db.get(Memory, conn_id)
-                            if conn_mem and conn_mem.is_active:
-                                connected.append(conn_mem)
-                                result_ids.add(conn_id)
+                            conn_ids.append(conn_id)
+                            result_ids.add(conn_id)
+            
+            if conn_ids:
+                conn_mems = self.db.query(Memory).filter(
+                    Memory.id.in_(conn_ids),
+                    Memory.is_active == True
+                ).all()
+                # Connected memories obey the filter too
+                if search_filter is not None:
+                    conn_mems = [m for m in conn_mems if _matches(m, search_filter)]
+                id_to_conn = {m.id: m for m in conn_mems}
+                connected = [
+                    (conn_scores.get(cid, 0), id_to_conn[cid])
+                    for cid in conn_ids if cid in id_to_conn
+                ]
+        elif include_connections:
+            degraded = True
         
         # Format results
         results = []
@@ -160,20 +455,209 @@ class ContextMemory:
                 "type": "bubble" if mem.is_episodic else "semantic",
                 "occurred_at": mem.occurred_at.isoformat() if mem.occurred_at else None,
                 "score": round(score, 4),
-                "connections": (mem.memory_metadata or {}).get("connections", {}).get("bubble_ids", [])
+                "connections": connections.get(mem.id, [])
             })
         
         # Add connected
-        for conn_mem in connected[:3]:
+        for conn_score, conn_mem in connected[:MAX_CONNECTED]:
             results.append({
                 "memory_id": conn_mem.id,
                 "memory": conn_mem.memory_text,
                 "type": "connected",
                 "occurred_at": conn_mem.occurred_at.isoformat() if conn_mem.occurred_at else None,
-                "score": 0,
+                "score": round(conn_score, 4),
                 "connections": []
             })
         
+        response = {
+            "query": query,
+            "total": len(results),
+            "results": results
+        }
+        if degraded:
+            response["degraded"] = True
+        return response
+        
+
+
+    # get_context()
+    @timed("get_context")
+    def get_context(
+        self,
+        query: str,
+        conversation_id: int,
+        token_budget: int = 1000,
+        candidates: int = 30,
+        mode: str = "vector",
+        include_connections: bool = True,
+        dedup_similarity: float = DEDUP_SIMILARITY,
+        timeout: Optional[float] = None,
+        deadline_ms: Optional[float] = None,
+    ) -> Dict:
+        """
+        Relevant memories as a prompt-ready block of at most token_budget tokens.
+        
+        Searches for candidates, drops near-duplicates (stored embeddings
+        at least dedup_similarity alike, or the same text), then packs the
+        memories with the best score per token into the budget. Results are
+        cached until the conversation's next write.
+        
+        Args:
+            query: Search query text (usually the user's message)
+            conversation_id: Conversation to search
+            token_budget: Max tokens of the returned context
+            candidates: Search results to choose from
+            mode / include_connections / timeout / deadline_ms: As in search()
+            
+        Returns:
+            {"query": ..., "context": "- [semantic] User ...\n...", "memory_ids": [...], "tokens": ...}
+            plus "degraded": True if the search was degraded
+        
+        Example:
+            >>> context = memory.get_context(user_message, conversation_id=1, token_budget=500)
+            >>> system_prompt = f"User memories:\n{context['context']}"
+        """
+        if token_budget <= 0:
+            raise ValueError(f"token_budget must be positive, got {token_budget}")
+        
+        cache = get_search_cache()
+        cache_key = ("context", query_hash(query), token_budget, candidates, mode, include_connections, dedup_similarity)
+        cached = cache.get(conversation_id, cache_key)
+        if cached is not None:
+            return cached
+        
+        generation = get_generation(conversation_id)
+        found = self.search(
+            query,
+            conversation_id,
+            limit=candidates,
+            include_connections=include_connections,
+            mode=mode,
+            timeout=timeout,
+            deadline_ms=deadline_ms,
+        )
+        results = found["results"]
+        
+        # Connected memories can repeat a direct hit
+        unique = {}
+        for result in results:
+            unique.setdefault(result["memory_id"], result)
+        results = list(unique.values())
+        
+        embeddings = dict(
+            self.db.query(Memory.id, Memory.embedding).filter(Memory.id.in_(list(unique)))
+        ) if unique else {}
+        model = get_settings().llm_model
+        packed = pack(dedupe(results, embeddings, dedup_similarity), token_budget, model)
+        
+        context = "\n".join(format_memory(result) for result in packed)
+        response = {
+            "query": query,
+            "context": context,
+            "memory_ids": [result["memory_id"] for result in packed],
+            "tokens": count_tokens(context, model),
+        }
+        if found.get("degraded"):
+            response["degraded"] = True
+        else:
+            cache.put(conversation_id, cache_key, response, generation)
+        return response
+        
+
+
+    # search_across()
+    @timed("search_across")
+    def search_across(
+        self,
+        query: str,
+        conversation_ids: Optional[List[int]] = None,
+        user_id: Optional[str] = None,
+        limit: int = 10,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """
+        Search memories across several conversations at once.
+        
+        The query is embedded once, the per-conversation FAISS indexes are
+        searched in parallel, the hits are merged into a global top-k and
+        the matching rows are fetched with a single query.
+        
+        Args:
+            query: Search query text
+            conversation_ids: Conversations to search
+            user_id: Search every conversation owned by this user instead
+            limit: Max results
+            timeout: Seconds the query embeddings may take (see search())
+            
+        Returns:
+            Dict with query and results (each tagged with its conversation_id)
+        """
+        if (conversation_ids is None) == (user_id is None):
+            raise ValueError("Pass exactly one of conversation_ids or user_id")
+        
+        if user_id is not None:
+            conversation_ids = [
+                cid for (cid,) in self.db.query(Conversation.id).filter(Conversation.user_id == user_id)
+            ]
+        
+        if not conversation_ids:
+            return {"query": query, "results": []}
+        
+        # Embed once per embedding space (once, unless a migration is running),
+        # with no conversation cut over between reading its space and loading its index
+        with ExitStack() as guards:
+            for cid in sorted(set(conversation_ids)):
+                guards.enter_context(migration_guard(cid))
+            
+            spaces = {cid: embedding_space(cid) for cid in conversation_ids}
+            with deadline(timeout):
+                query_embeddings = {space: self._embed_query(query, space) for space in set(spaces.values())}
+            
+            stores = {}
+            for cid in conversation_ids:
+                store = get_vector_store(cid)
+                if store.count == 0:
+                    store = rebuild_index_from_db(self.db, cid)
+                stores[cid] = store
+        
+        def search_one(cid):
+            return [
+                (r["score"], r["memory_id"])
+                for r in stores[cid].search(query_embeddings[spaces[cid]], k=limit * 2, decay_rate=RECENCY_DECAY)
+            ]
+        
+        # FAISS releases the GIL, so per-conversation searches run in parallel
+        if len(stores) > 1:
+            hits = _get_search_executor().map(search_one, stores)
+        else:
+            hits = map(search_one, stores)
+        
+        # Merge into a global top-k
+        top_hits = heapq.nlargest(limit * 2, itertools.chain.from_iterable(hits))
+        
+        if not top_hits:
+            return {"query": query, "results": []}
+        
+        faiss_scores = {memory_id: score for score, memory_id in top_hits}
+        memories = self.db.query(Memory).filter(
+            Memory.id.in_(list(faiss_scores)),
+            Memory.is_active == True
+        ).all()
+        
+        scored = self._score_memories(memories, faiss_scores)
+        
+        results = [
+            {
+                "memory_id": mem.id,
+                "conversation_id": mem.conversation_id,
+                "memory": mem.memory_text,
+                "type": "bubble" if mem.is_episodic else "semantic",
+                "occurred_at": mem.occurred_at.isoformat() if mem.occurred_at else None,
+                "score": round(score, 4),
+            }
+            for score, mem in scored[:limit]
+        ]
+        
         return {
             "query": query,
             "total": len(results),
@@ -182,7 +666,199 @@ class ContextMemory:
         
 
 
+    def _score_memories(self, memories: List[Memory], similarities: Dict[int, float]) -> List[Tuple[float, Memory]]:
+        """
+        Combine similarity with importance and recency decay, best first.
+        """
+        now = datetime.now(timezone.utc)
+        scored = []
+        
+        for mem in memories:
+            similarity = similarities.get(mem.id, 0)
+            
+            # Recency decay for bubbles
+            if mem.is_episodic and mem.occurred_at:
+                # Handle timezone-naive occurred_at
+                occurred = mem.occurred_at
+                if occurred.tzinfo is None:
+                    occurred = occurred.replace(tzinfo=timezone.utc)
+                days_ago = (now - occurred).days
+                recency = math.exp(-RECENCY_DECAY * days_ago)
+            else:
+                recency = 1.0
+            
+            importance = mem.importance if mem.importance else 0.5
+            final_score = similarity * importance * recency
+            scored.append((final_score, mem))
+        
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return scored
+
+
+
+    def _find_candidates(
+        self,
+        query: str,
+        conversation_id: int,
+        k: int,
+        mode: str,
+        search_filter: Optional[SearchFilter] = None,
+        soft_until: Optional[float] = None,
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Retrieve up to k candidate memories (memory_id + similarity score).
+        
+        Returns:
+            (candidates, degraded) - degraded is True when the query
+            embedding failed (hybrid search) or missed soft_until, and the
+            candidates are lexical matches or recent memories instead
+        """
+        if mode == "lexical":
+            return lexical_search(self.db, conversation_id, query, limit=k), False
+        
+        # The guard holds off other processes' cutovers; in-process ones
+        # bump the epoch and the search is redone
+        with migration_guard(conversation_id):
+            for _ in range(CUTOVER_RETRIES):
+                # Embed in the space of the conversation's index; an even epoch
+                # unchanged across the search means no cutover happened meanwhile
+                epoch = cutover_epoch(conversation_id)
+            
+                # Generate query embedding
+                try:
+                    query_embedding = self._query_embedding(query, embedding_space(conversation_id), soft_until)
+                except (APIError, DeadlineExceeded) as e:
+                    if mode != "hybrid" and soft_until is None:
+                        raise
+                    if get_settings().debug:
+                        print(f"[DEBUG] Embedding failed, serving fallback results: {e}")
+                    query_embedding = None
+            
+                if query_embedding is None:
+                    return self._fallback_candidates(query, conversation_id, k, search_filter), True
+            
+                faiss_results = self._vector_search(conversation_id, query_embedding, k, search_filter)
+                if epoch % 2 == 0 and cutover_epoch(conversation_id) == epoch:
+                    break
+        
+        if mode == "vector":
+            return faiss_results, False
+        
+        lexical_results = lexical_search(self.db, conversation_id, query, limit=k)
+        fused = reciprocal_rank_fusion([
+            [r["memory_id"] for r in faiss_results],
+            [r["memory_id"] for r in lexical_results],
+        ])
+        return fused[:k], False
+
+
+
+    def _query_embedding(
+        self,
+        query: str,
+        space: EmbeddingSpace,
+        soft_until: Optional[float] = None,
+    ) -> Optional[List[float]]:
+        """
+        Cached embedding of a search query, embedding it on a miss.
+        
+        With soft_until, waits for the embeddings call only until then (less
+        DEGRADED_RESERVE_MS) and returns None if it isn't back. The call
+        carries on in the background and fills the cache when it finishes.
+        """
+        cache = get_embedding_cache()
+        embedding = cache.get(space, query)
+        if embedding is not None:
+            return embedding
+        
+        if soft_until is None:
+            embedding = self._embed_query(query, space)
+            cache.put(space, query, embedding)
+            return embedding
+        
+        def fill_cache(future):
+            if future.exception() is None:
+                cache.put(space, query, future.result())
+        
+        # Started even when there's no time to wait, so a retry hits the cache
+        future = _get_embed_executor().submit(self._embed_query, query, space)
+        future.add_done_callback(fill_cache)
+        
+        wait = soft_until - DEGRADED_RESERVE_MS / 1000 - time.monotonic()
+        left = remaining()
+        if left is not None:
+            wait = min(wait, left)
+        if wait <= 0:
+            return None
+        
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeoutError:
+            return None
+
+
+
+    def _fallback_candidates(
+        self,
+        query: str,
+        conversation_id: int,
+        k: int,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict]:
+        """
+        Candidates for a search without a query embedding: keyword matches,
+        or the most recent memories if no keyword matches.
+        """
+        candidates = lexical_search(self.db, conversation_id, query, limit=k)
+        if candidates:
+            return candidates
+        
+        recent = self.db.query(Memory.id).filter(
+            Memory.conversation_id == conversation_id,
+            Memory.is_active == True
+        )
+        if search_filter is not None and search_filter.memory_type is not None:
+            recent = recent.filter(Memory.is_episodic == (search_filter.memory_type == "bubble"))
+        recent = recent.order_by(Memory.created_at.desc(), Memory.id.desc()).limit(k)
+        
+        # Newest first, with scores falling off by rank
+        return [{"memory_id": memory_id, "score": 1.0 / (rank + 1)} for rank, (memory_id,) in enumerate(recent)]
+
+
+
+    def _embed_query(self, query: str, space: Optional[EmbeddingSpace] = None) -> List[float]:
+        """Embed a search query. Overridden by the HTTP service to batch calls."""
+        # Someone is waiting on this one: ahead of background add() work
+        with request_priority(INTERACTIVE):
+            return embed_text(query, space)
+
+
+
+    def _vector_search(
+        self,
+        conversation_id: int,
+        query_embedding: List[float],
+        k: int,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict]:
+        """
+        FAISS search of one conversation. Overridden by the HTTP service to
+        batch concurrent searches.
+        """
+        # Get FAISS index
+        vector_store = get_vector_store(conversation_id)
+        
+        # Rebuild if empty
+        if vector_store.count == 0:
+            vector_store = rebuild_index_from_db(self.db, conversation_id)
+        
+        # Newest time buckets first; old bubbles that can't reach the top k are skipped
+        return vector_store.search(query_embedding, k=k, decay_rate=RECENCY_DECAY, search_filter=search_filter)
+
+
+
     # update()
+    @timed("update_memory")
     def update(self, memory_id: int, text: str):
         """
         Update an existing memory
@@ -195,25 +871,28 @@ class ContextMemory:
         # Get old embedding for removal
         conversation_id = memory.conversation_id
         
-        memory.memory_text = text
-        new_embedding = embed_text(text)
-        memory.embedding = new_embedding
-        memory.updated_at = datetime.now(timezone.utc)
+        with migration_guard(conversation_id), conversation_lock(conversation_id):
+            memory.memory_text = text
+            new_embedding = embed_text(text, embedding_space(conversation_id))
+            memory.embedding = new_embedding
+            memory.updated_at = datetime.now(timezone.utc)
 
-        self.db.commit()
-        self.db.refresh(memory)
+            self.db.commit()
+            self.db.refresh(memory)
         
-        # Update FAISS index
-        vector_store = get_vector_store(conversation_id)
-        vector_store.remove(memory_id)
-        vector_store.add(memory_id, new_embedding)
-        save_vector_store(conversation_id)
+            # Update FAISS index
+            vector_store = get_vector_store(conversation_id)
+            vector_store.remove(memory_id)
+            index_memory(vector_store, memory)
+            save_vector_store(conversation_id)
+            bump_generation(conversation_id)
 
         return memory
     
 
 
     # delete()
+    @timed("delete_memory")
     def delete(self, memory_id: int):
         """
         Delete a memory
@@ -225,13 +904,15 @@ class ContextMemory:
         
         conversation_id = memory.conversation_id
         
-        # Soft delete - mark as inactive
-        memory.is_active = False
-        self.db.commit()
+        with migration_guard(conversation_id), conversation_lock(conversation_id):
+            # Soft delete - mark as inactive
+            memory.is_active = False
+            self.db.commit()
         
-        # Remove from FAISS index
-        vector_store = get_vector_store(conversation_id)
-        vector_store.remove(memory_id)
-        save_vector_store(conversation_id)
+            # Remove from FAISS index
+            vector_store = get_vector_store(conversation_id)
+            vector_store.remove(memory_id)
+            save_vector_store(conversation_id)
+            bump_generation(conversation_id)
 
         return {"deleted_memory_id": memory_id}
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+Rank Fusion - Merges ranked result lists from different retrievers.
+"""
+
+from collections import defaultdict
+from typing import List, Dict
+
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = RRF_K) -> List[Dict]:
+    """
+    Fuse several rankings of memory IDs with reciprocal rank fusion.
+
+    Each list contributes 1 / (k + rank) for every ID it contains, so items
+    ranked well by several retrievers rise to the top without needing
+    comparable raw scores.
+
+    Args:
+        rankings: Lists of memory IDs, each ordered best first
+        k: Damping constant (60 is the standard choice)
+
+    Returns:
+        List of dicts with memory_id and score, best first. Scores are
+        normalised so an item ranked first by every list scores 1.0.
+    """
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, memory_id in enumerate(ranking, start=1):
+            fused[memory_id] += 1.0 / (k + rank)
+
+    if not fused:
+        return []
+
+    best_possible = len(rankings) / (k + 1)
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+    return [{"memory_id": mid, "score": score / best_possible} for mid, score in ordered]
@@ -0,0 +1,364 @@
+"""
+Re-embedding migrations.
+
+Stored embeddings and FAISS indexes of a conversation must all come from
+the same embedding space (model and size). Two ways to move to a new one:
+
+- reembed_conversation() / `contextmemory reindex`: re-embed in place, for
+  a new embedding_dimensions on a small deployment. Searches fail until
+  each conversation is re-embedded.
+- EmbeddingMigration / `contextmemory migrate-embeddings`: build a shadow
+  index per conversation in the background while searches keep using the
+  old one, then cut each conversation over atomically. For switching
+  embedding_model (or size) without downtime.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from contextmemory.core.locks import conversation_lock
+from contextmemory.core.settings import get_settings
+from contextmemory.db.models.conversation import Conversation
+from contextmemory.db.models.memory import Memory
+from contextmemory.memory.embedding_space import (
+    EmbeddingSpace,
+    MigrationState,
+    begin_cutover,
+    current_space,
+    embedding_space,
+    end_cutover,
+    get_migration_state,
+    migration_guard,
+    write_migration_state,
+)
+from contextmemory.memory.embeddings import EMBED_BATCH_SIZE, embed_texts
+from contextmemory.memory.search_cache import bump_generation
+from contextmemory.memory.vector_store import (
+    SegmentedVectorStore,
+    get_local_vector_store,
+    get_vector_store,
+    index_memory,
+    rebuild_index_from_db,
+    save_vector_store,
+)
+
+# Embeddings requests per minute a background migration may use
+DEFAULT_MIGRATION_RPM = 300
+
+# Memory columns a migration reads (rows work with index_memory())
+_MIGRATION_COLUMNS = (
+    Memory.id,
+    Memory.memory_text,
+    Memory.is_episodic,
+    Memory.occurred_at,
+    Memory.created_at,
+    Memory.importance,
+)
+
+
+def reembed_conversation(db: Session, conversation_id: int, force: bool = False) -> int:
+    """
+    Re-embed a conversation's memories at the configured size and rebuild its index.
+
+    Args:
+        db: SQLAlchemy session
+        conversation_id: Conversation to migrate
+        force: Re-embed every memory, not just those of another size
+               (e.g. after switching embedding_model)
+
+    Returns:
+        Number of memories re-embedded
+    """
+    with migration_guard(conversation_id), conversation_lock(conversation_id):
+        space = embedding_space(conversation_id)
+        memories = db.query(Memory).filter(Memory.conversation_id == conversation_id).all()
+        stale = [
+            mem for mem in memories
+            if force or not mem.embedding or len(mem.embedding) != space.size
+        ]
+
+        for start in range(0, len(stale), EMBED_BATCH_SIZE):
+            batch = stale[start:start + EMBED_BATCH_SIZE]
+            for mem, embedding in zip(batch, embed_texts([mem.memory_text for mem in batch], space)):
+                mem.embedding = embedding
+        db.commit()
+
+        rebuild_index_from_db(db, conversation_id)
+        bump_generation(conversation_id)
+
+    if get_settings().debug:
+        print(f"[DEBUG] Conversation {conversation_id}: re-embedded {len(stale)} memories at {space.size} dims")
+
+    return len(stale)
+
+
+def reembed_all(
+    db: Session,
+    conversation_ids: Optional[Iterable[int]] = None,
+    force: bool = False,
+) -> Dict[int, int]:
+    """
+    Run reembed_conversation() over several conversations (default: all).
+
+    Returns:
+        Number of memories re-embedded per conversation
+    """
+    if conversation_ids is None:
+        conversation_ids = list(db.scalars(select(Conversation.id).order_by(Conversation.id)))
+    return {cid: reembed_conversation(db, cid, force=force) for cid in conversation_ids}
+
+
+class EmbeddingMigration:
+    """
+    Moves every conversation to a new embedding space without downtime.
+
+    For each conversation, active memories are streamed from the DB in
+    batch_size pages, embedded one page per request under a
+    requests-per-minute limit and added to a shadow index (no read
+    transaction stays open across API calls), while searches and writes keep
+    using the old embeddings and index. The conversation is then cut over
+    under an exclusive migration_guard (a cross-process file lock) and its
+    conversation lock: memories added, edited or deleted since the shadow
+    pass are applied to the shadow index, the new embeddings are committed
+    to the DB, and the embedding space, index and index file switch before
+    any other process touches the conversation again. In-process searches
+    that straddle the switch are redone. If the migrating process dies
+    mid-cutover the conversation stays in the old space and is redone on
+    resume.
+
+    Progress is kept in the migration state file, so other worker
+    processes follow each cutover and an interrupted migration resumes
+    with the conversations not yet cut over. Conversations created while
+    it runs use the old space and are migrated before it finishes.
+
+    Args:
+        source: Space the existing embeddings are in. Not needed when
+                resuming an unfinished migration to the same target.
+        target: Space to migrate to (default: the configured one)
+        session_factory: Creates the DB sessions the migration uses
+        batch_size: Texts per embeddings request
+        requests_per_minute: Max embeddings requests per minute
+    """
+
+    def __init__(
+        self,
+        source: Optional[EmbeddingSpace] = None,
+        target: Optional[EmbeddingSpace] = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        requests_per_minute: float = DEFAULT_MIGRATION_RPM,
+    ):
+        target = target or current_space()
+        resumed = get_migration_state()
+        if resumed is not None and resumed.target == target and not resumed.complete:
+            source = source or resumed.source
+            migrated = set(resumed.migrated)
+        else:
+            migrated = set()
+
+        if source is None:
+            raise ValueError("source embedding space is required to start a migration")
+        if source == target:
+            raise ValueError(f"Embeddings are already in {target}")
+        if batch_size <= 0 or batch_size > EMBED_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {EMBED_BATCH_SIZE}")
+
+        if session_factory is None:
+            from contextmemory.db.database import SessionLocal
+            session_factory = SessionLocal
+
+        self.state = MigrationState(source=source, target=target, migrated=migrated, complete=False)
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.request_interval = 60.0 / requests_per_minute
+
+        self._next_request = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Progress
+        self.embedded = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+    def start(self) -> "EmbeddingMigration":
+        """Run the migration on a background thread."""
+        self._thread = threading.Thread(target=self._run_safely, name="contextmemory-embedding-migration", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop after the current conversation; run again to resume."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a started migration. Returns True once it has finished."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.finished_at is not None
+
+    def progress(self) -> Dict:
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "source": list(self.state.source),
+            "target": list(self.state.target),
+            "conversations_migrated": len(self.state.migrated),
+            "memories_embedded": self.embedded,
+            "memories_per_second": round(self.embedded / elapsed, 1) if elapsed else 0.0,
+            "complete": self.state.complete,
+            "error": repr(self.error) if self.error else None,
+        }
+
+    def _run_safely(self) -> None:
+        try:
+            self.run()
+        except BaseException as e:
+            self.error = e
+            if get_settings().debug:
+                print(f"[DEBUG] Embedding migration failed: {e!r}")
+
+    def run(self) -> Dict:
+        """
+        Migrate every conversation (blocking).
+
+        Returns:
+            progress() once done or stopped
+        """
+        self.started_at = time.time()
+        write_migration_state(self.state)
+
+        db = self.session_factory()
+        try:
+            while not self._stop.is_set():
+                # Re-listed each round to catch conversations created meanwhile
+                pending = [
+                    cid for cid in db.scalars(select(Conversation.id).order_by(Conversation.id))
+                    if cid not in self.state.migrated
+                ]
+                db.rollback()
+                if not pending:
+                    self.state = self.state._replace(complete=True)
+                    write_migration_state(self.state)
+                    self.finished_at = time.time()
+                    break
+                for conversation_id in pending:
+                    if self._stop.is_set():
+                        break
+                    self._migrate_conversation(conversation_id)
+        finally:
+            db.close()
+
+        return self.progress()
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """One embeddings request in the target space, paced to requests_per_minute."""
+        delay = self._next_request - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_request = time.monotonic() + self.request_interval
+        embeddings = embed_texts(texts, self.state.target)
+        self.embedded += len(texts)
+        return embeddings
+
+    def _shadow_batch(
+        self,
+        shadow: SegmentedVectorStore,
+        rows: List,
+        embeddings: Dict[int, List[float]],
+        texts: Dict[int, str],
+    ) -> None:
+        """Embed memory rows into the shadow index, replacing earlier versions."""
+        for row, embedding in zip(rows, self._embed([row.memory_text for row in rows])):
+            shadow.remove(row.id)
+            index_memory(shadow, row, embedding)
+            embeddings[row.id] = embedding
+            texts[row.id] = row.memory_text
+
+    def _pages(self, db: Session, conversation_id: int) -> Iterable[List]:
+        """Active memory rows of a conversation, batch_size at a time by id."""
+        last_id = 0
+        while True:
+            page = db.execute(
+                select(*_MIGRATION_COLUMNS)
+                .where(
+                    Memory.conversation_id == conversation_id,
+                    Memory.is_active == True,
+                    Memory.id > last_id,
+                )
+                .order_by(Memory.id)
+                .limit(self.batch_size)
+            ).all()
+            # End the read transaction before the (slow, paced) embeddings call
+            db.rollback()
+            if not page:
+                return
+            last_id = page[-1].id
+            yield page
+
+    def _migrate_conversation(self, conversation_id: int) -> None:
+        db = self.session_factory()
+        try:
+            shadow = SegmentedVectorStore(self.state.target.size)
+            embeddings: Dict[int, List[float]] = {}
+            texts: Dict[int, str] = {}
+
+            # Bulk pass: live traffic is unaffected
+            for page in self._pages(db, conversation_id):
+                self._shadow_batch(shadow, page, embeddings, texts)
+
+            # The exclusive guard keeps every process off this conversation
+            # from the DB commit until its space and index have both switched
+            with migration_guard(conversation_id, exclusive=True), conversation_lock(conversation_id):
+                # Catch up with writes made during the bulk pass
+                live = set()
+                changed = []
+                for page in self._pages(db, conversation_id):
+                    live.update(row.id for row in page)
+                    changed.extend(row for row in page if texts.get(row.id) != row.memory_text)
+                    while len(changed) >= self.batch_size:
+                        self._shadow_batch(shadow, changed[:self.batch_size], embeddings, texts)
+                        del changed[:self.batch_size]
+                if changed:
+                    self._shadow_batch(shadow, changed, embeddings, texts)
+                for memory_id in set(embeddings) - live:
+                    shadow.remove(memory_id)
+                    del embeddings[memory_id]
+
+                if embeddings:
+                    db.execute(update(Memory), [
+                        {"id": memory_id, "embedding": embedding}
+                        for memory_id, embedding in embeddings.items()
+                    ])
+                db.commit()
+
+                if get_settings().index_server_socket:
+                    store = get_vector_store(conversation_id)
+                else:
+                    store = get_local_vector_store(conversation_id, load=False)
+
+                # Switch space and index together; searches racing this are redone
+                begin_cutover(conversation_id)
+                try:
+                    migrated = self.state.migrated | {conversation_id}
+                    self.state = self.state._replace(migrated=migrated)
+                    write_migration_state(self.state)
+                    store.replace_contents(shadow, authoritative=True)
+                finally:
+                    end_cutover(conversation_id)
+
+                save_vector_store(conversation_id)
+                bump_generation(conversation_id)
+        finally:
+            db.close()
+
+        if get_settings().debug:
+            print(
+                f"[DEBUG] Conversation {conversation_id} cut over to {self.state.target.model} "
+                f"({len(embeddings)} memories)"
+            )
@@ -0,0 +1,241 @@
+"""
+Search Cache - LRU cache of search results per conversation.
+
+Every write path (update_phase, create_bubbles, update, delete) bumps the
+conversation's write generation. Cached entries remember the generation
+they were computed at, so anything cached before a write is never served
+again and is dropped lazily on the next lookup.
+
+The generation lives in a small file next to the conversation's index
+(conv_{id}.generation), so a write in one worker process invalidates
+what every other worker sharing the index directory has cached,
+including their connection graphs.
+
+Query embeddings are cached separately (QueryEmbeddingCache): they don't
+depend on a conversation's contents, so a repeated query skips the
+embeddings call even after a write invalidated its results.
+"""
+
+import copy
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from contextmemory.core.locks import file_lock
+from contextmemory.core.settings import get_settings
+from contextmemory.memory.vector_store import get_index_path
+
+
+def _generation_path(conversation_id: int, counter: str) -> str:
+    return f"{get_index_path(conversation_id)}.{counter}"
+
+
+def _read_generation(path: str) -> int:
+    try:
+        with open(path, "r") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def get_generation(conversation_id: int, counter: str = "generation") -> int:
+    """
+    Current write generation of a conversation, shared by all worker processes.
+    
+    Cheap enough to call on every cache lookup.
+    
+    Args:
+        conversation_id: Conversation to read
+        counter: Which writes to follow: "generation" counts memory writes;
+                 other caches keep their own counters (e.g. context_cache)
+    """
+    return _read_generation(_generation_path(conversation_id, counter))
+
+
+def bump_generation(conversation_id: int, counter: str = "generation") -> int:
+    """
+    Invalidate everything cached for a conversation, in every process. Call after each committed write.
+    
+    Returns:
+        The new generation
+    """
+    path = _generation_path(conversation_id, counter)
+    with file_lock(f"{path}.lock"):
+        generation = _read_generation(path) + 1
+        tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, "w") as f:
+            f.write(str(generation))
+        os.replace(tmp, path)
+    return generation
+
+
+def query_hash(query: str) -> str:
+    """Stable hash of a query string for use in cache keys."""
+    return hashlib.sha1(query.strip().encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    Bounded LRU cache keyed by (conversation_id, key).
+
+    Attributes:
+        max_entries: Capacity; 0 disables caching
+        hits / misses: Lookup counters
+        evictions: Entries dropped to stay within max_entries
+        stale: Entries dropped because their conversation was written to
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, Hashable], Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    def get(self, conversation_id: int, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss."""
+        if self.max_entries <= 0:
+            return None
+
+        # File read outside the lock: lookups for other conversations don't queue behind it
+        current = get_generation(conversation_id)
+        full_key = (conversation_id, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            generation, value = entry
+            if generation != current:
+                del self._entries[full_key]
+                self.stale += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+
+        return copy.deepcopy(value)
+
+    def put(self, conversation_id: int, key: Hashable, value: Any, generation: int) -> None:
+        """
+        Cache a value computed at the given write generation.
+
+        Values computed before a concurrent write (generation already moved
+        on) are not stored.
+        """
+        if self.max_entries <= 0 or generation != get_generation(conversation_id):
+            return
+
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[(conversation_id, key)] = (generation, value)
+            self._entries.move_to_end((conversation_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "stale": self.stale,
+        }
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.stale = 0
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed by (embedding space, query).
+
+    Args:
+        max_entries: Capacity; 0 disables caching
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, space: Hashable, query: str) -> Optional[List[float]]:
+        if self.max_entries <= 0:
+            return None
+        key = (space, query_hash(query))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, space: Hashable, query: str, embedding: List[float]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (space, query_hash(query))
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global search result and query embedding caches (lazy initialized)
+_search_cache: Optional[SearchCache] = None
+_embedding_cache: Optional[QueryEmbeddingCache] = None
+
+
+def get_search_cache() -> SearchCache:
+    """Get or create the process-wide search result cache."""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(max_entries=get_settings().search_cache_size)
+    return _search_cache
+
+
+def get_embedding_cache() -> QueryEmbeddingCache:
+    """Get or create the process-wide query embedding cache (sized like the search cache)."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = QueryEmbeddingCache(max_entries=get_settings().search_cache_size)
+    return _embedding_cache
+
+
+def get_search_cache_stats() -> Dict:
+    """Hit rate and size of the search result cache (and of the query embedding cache)."""
+    return {**get_search_cache().stats(), "query_embeddings": get_embedding_cache().stats()}
+
+
+def reset_search_cache() -> None:
+    """Drop the caches (write generations stay with the indexes on disk). Useful for testing."""
+    global _search_cache, _embedding_cache
+    _search_cache = None
+    _embedding_cache = None
@@ -7,10 +7,12 @@ This module finds memories similar to a query using vector search.
 from typing import List
 from sqlalchemy.orm import Session
 
+from contextmemory.core.metrics import timed
 from contextmemory.db.models.memory import Memory
 from contextmemory.memory.vector_store import get_vector_store, rebuild_index_from_db
 
 
+@timed("similar_search")
 def search_similar_memories(
     db: Session, 
     conversation_id: int, 
@@ -25,7 +27,7 @@ def search_similar_memories(
     Args:
         db: Database session
         conversation_id: Conversation to search in
-        query_embeddings: Query vector (1536 dimensions)
+        query_embeddings: Query vector (settings.embedding_dimensions long)
         limit: Max results to return
         
     Returns:
@@ -9,7 +9,10 @@ import re
 from typing import List, Optional
 from dataclasses import dataclass
 
-from contextmemory.core.openai_client import get_llm_client
+from contextmemory.core.metrics import timed
+from contextmemory.core.openai_client import get_stage_client
+from contextmemory.core.prompt_builder import PromptBuilder
+from contextmemory.core.rate_limiter import limited_chat_completion
 from contextmemory.core.settings import get_settings
 from contextmemory.utils.tool_call_system_prompt import TOOL_CALL_SYSTEM_PROMPT
 
@@ -29,6 +32,7 @@ class ToolDecision:
     text: Optional[str]
 
 
+@timed("classification")
 def llm_tool_call(candidate_fact: str, similar_memories: List) -> ToolDecision:
     """
     LLM decides which action to take with a candidate fact.
@@ -41,15 +45,21 @@ def llm_tool_call(candidate_fact: str, similar_memories: List) -> ToolDecision:
         ToolDecision with action, memory_id, and text
     """
     settings = get_settings()
-    client = get_llm_client()
+    client = get_stage_client("classification")
+    stage = settings.get_stage("classification")
     
-    # Format existing memories for context
+    builder = PromptBuilder("classification", stage.model)
+    builder.text("system", TOOL_CALL_SYSTEM_PROMPT)
+    candidate_fact_text = builder.text("candidate_fact", candidate_fact)
+    
+    # Format existing memories for context (most similar first, so the least similar go when over budget)
     if similar_memories:
         memory_context = "\n".join(
-            f"- ID {m.id}: {m.memory_text}" for m in similar_memories
+            builder.items("similar_memories", [f"- ID {m.id}: {m.memory_text}" for m in similar_memories])
         )
     else:
         memory_context = "No existing memories found."
+    builder.record()
 
     # Build messages
     messages = [
@@ -57,7 +67,7 @@ def llm_tool_call(candidate_fact: str, similar_memories: List) -> ToolDecision:
         {
             "role": "user",
             "content": f"""Candidate fact:
-{candidate_fact}
+{candidate_fact_text}
 
 Existing similar memories:
 {memory_context}
@@ -67,10 +77,11 @@ Decide the action."""
     ]
 
     # Call LLM
-    response = client.chat.completions.create(
-        model=settings.llm_model,
+    response = limited_chat_completion(
+        client,
+        model=stage.model,
         messages=messages,
-        temperature=0
+        temperature=stage.temperature
     )
 
     raw_output = response.choices[0].message.content
@@ -2,14 +2,116 @@
 FAISS Vector Store for ContextMemory.
 
 This module provides fast vector similarity search using FAISS.
-Each conversation has its own index for isolation.
+Each conversation has its own index for isolation, split into segments
+(see SegmentedVectorStore): one for semantic facts and one per week of
+episodic bubbles, so recency-weighted searches can skip old buckets.
+
+Thread safety:
+- FAISSVectorStore methods are safe to call from multiple threads.
+  search() and count take a shared lock, so searches run concurrently
+  with each other; add(), remove() and load() take it exclusively.
+  save() writes a consistent snapshot (no add/remove can interleave) and
+  concurrent saves of the same store are serialized.
+- get_vector_store() returns the same store object to every thread, and
+  rebuild_index_from_db() refills that object in place, so references
+  held by other threads never go stale.
+- Multi-step write pipelines (ContextMemory.add/update/delete) hold
+  core.locks.conversation_lock(conversation_id). Writers to different
+  conversations never block each other, and readers never wait on it.
+
+Multi-process coherence (several gunicorn/uvicorn workers sharing the
+index directory):
+- Every snapshot carries a monotonically increasing version. save() holds
+  an exclusive advisory lock on conv_{id}.lock, writes to temp files and
+  renames them into place, then publishes the version in conv_{id}.version.
+- If another process saved since this store last synced, save() first
+  reloads that snapshot and replays this store's unsaved adds/removes on
+  top of it, so concurrent writers never clobber each other.
+- get_vector_store() compares the cached store's version with the small
+  segment manifest and reloads only segments whose version moved.
 """
 
 import faiss
+import heapq
+import math
 import numpy as np
-from typing import List, Dict, Optional
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple
 import os
 import json
+import threading
+import time
+
+from contextmemory.core.locks import ReadWriteLock, conversation_lock, file_lock
+from contextmemory.core.metrics import INDEX_CONVERSATIONS, INDEX_SEGMENTS, INDEX_VECTORS, register_collector, timed
+from contextmemory.core.settings import get_settings
+from contextmemory.memory.embedding_space import embedding_space, migration_guard
+
+
+# Importance assumed for memories stored without one (as in search scoring)
+DEFAULT_IMPORTANCE = 0.5
+
+
+class DimensionMismatchError(ValueError):
+    """Raised when vectors don't match the configured embedding_dimensions."""
+
+
+def _check_dimension(expected: int, got: int, what: str) -> None:
+    if got != expected:
+        raise DimensionMismatchError(
+            f"{what} has {got}-d vectors but its embedding space has {expected}. "
+            "Re-embed existing memories with `contextmemory reindex` "
+            "(or contextmemory.memory.reindex.reembed_conversation)."
+        )
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    """
+    Restricts a vector search to matching memories.
+    
+    Compiled into a FAISS IDSelectorBitmap over each segment's attribute
+    arrays, so results are the exact top k among matching memories. Time
+    bounds only match bubbles; semantic facts have no occurrence time.
+    
+    Attributes:
+        memory_type: "semantic" or "bubble"
+        min_importance: Minimum importance
+        occurred_after: Earliest occurred_at, inclusive (unix seconds)
+        occurred_before: Latest occurred_at, exclusive (unix seconds)
+    """
+    memory_type: Optional[str] = None
+    min_importance: Optional[float] = None
+    occurred_after: Optional[float] = None
+    occurred_before: Optional[float] = None
+    
+    def __post_init__(self):
+        if self.memory_type not in (None, "semantic", "bubble"):
+            raise ValueError(f"Unknown memory type: {self.memory_type}")
+    
+    @property
+    def has_time_window(self) -> bool:
+        return self.occurred_after is not None or self.occurred_before is not None
+    
+    def mask(self, timestamps: np.ndarray, importances: np.ndarray) -> np.ndarray:
+        """Boolean mask of entries matching the filter, from aligned attribute arrays."""
+        mask = np.ones(len(timestamps), dtype=bool)
+        # Episodic entries are the ones with an occurrence time
+        episodic = ~np.isnan(timestamps)
+        if self.memory_type == "semantic":
+            mask &= ~episodic
+        elif self.memory_type == "bubble":
+            mask &= episodic
+        if self.min_importance is not None:
+            importances = np.where(np.isnan(importances), DEFAULT_IMPORTANCE, importances)
+            mask &= importances >= self.min_importance
+        # NaN timestamps compare False, so time bounds exclude semantic facts
+        if self.occurred_after is not None:
+            mask &= timestamps >= self.occurred_after
+        if self.occurred_before is not None:
+            mask &= timestamps < self.occurred_before
+        return mask
 
 
 class FAISSVectorStore:
@@ -17,19 +119,21 @@ class FAISSVectorStore:
     A FAISS-backed vector store for fast similarity search.
     
     Attributes:
-        dimension: The size of embedding vectors (1536 for OpenAI)
+        dimension: The size of embedding vectors (settings.embedding_dimensions)
         index: The FAISS index
         id_map: Maps memory_id -> faiss_index
         reverse_map: Maps faiss_index -> memory_id
     """
     
-    def __init__(self, dimension: int = 1536):
+    def __init__(self, dimension: Optional[int] = None):
         """
         Initialize a new vector store.
         
         Args:
-            dimension: Size of vectors (default 1536 for OpenAI embeddings)
+            dimension: Size of vectors (default: the configured embedding_dimensions)
         """
+        if dimension is None:
+            dimension = get_settings().get_embedding_dimensions()
         self.dimension = dimension
         
         # IndexFlatIP = Inner Product (cosine similarity after normalization)
@@ -38,70 +142,151 @@ class FAISSVectorStore:
         # Bidirectional mapping between memory IDs and FAISS indices
         self.id_map: Dict[int, int] = {}  # memory_id -> faiss_index
         self.reverse_map: Dict[int, int] = {}  # faiss_index -> memory_id
+        
+        # Attributes per FAISS index (NaN when unknown), used by search filters:
+        # occurred_at in unix seconds, and importance
+        self.timestamps: List[float] = []
+        self.importances: List[float] = []
+        
+        # Shared for searches, exclusive for mutations
+        self._lock = ReadWriteLock()
+        self._save_lock = threading.Lock()
+        
+        # On-disk snapshot version this store reflects
+        self.version = 0
+        
+        # Adds/removes not yet saved, replayed onto newer snapshots from other processes:
+        # ("add", memory_id, vector, timestamp, importance) / ("remove", memory_id, None, None, None)
+        self._pending: List[Tuple[str, int, Optional[np.ndarray], Optional[float], Optional[float]]] = []
+        
+        # Rebuilt from the DB: save() overwrites instead of merging
+        self._authoritative = False
     
-    def add(self, memory_id: int, embedding: List[float]) -> None:
+    def add(
+        self,
+        memory_id: int,
+        embedding: List[float],
+        timestamp: Optional[float] = None,
+        importance: Optional[float] = None,
+    ) -> None:
         """
         Add a memory embedding to the index.
         
         Args:
             memory_id: The database ID of the memory
-            embedding: The 1536-dimensional embedding vector
+            embedding: The embedding vector (self.dimension long)
+            timestamp: When an episodic memory occurred (unix seconds)
+            importance: The memory's importance, for filtered searches
         """
-        if memory_id in self.id_map:
-            # Already exists, skip (use update method for changes)
-            return
-            
+        timestamp = math.nan if timestamp is None else float(timestamp)
+        importance = math.nan if importance is None else float(importance)
+        
         # Convert to numpy array with correct shape
         vector = np.array([embedding], dtype=np.float32)
+        _check_dimension(self.dimension, vector.shape[1], f"Memory {memory_id}")
         
         # Normalize for cosine similarity
         # After normalization, inner product = cosine similarity
         faiss.normalize_L2(vector)
         
-        # Get the index position before adding
-        faiss_idx = self.index.ntotal
-        
-        # Add to FAISS
-        self.index.add(vector)
-        
-        # Update mappings
-        self.id_map[memory_id] = faiss_idx
-        self.reverse_map[faiss_idx] = memory_id
+        with self._lock.write():
+            if memory_id in self.id_map:
+                # Already exists, skip (use update method for changes)
+                return
+            
+            # Get the index position before adding
+            faiss_idx = self.index.ntotal
+            
+            # Add to FAISS
+            self.index.add(vector)
+            
+            # Update mappings
+            self.id_map[memory_id] = faiss_idx
+            self.reverse_map[faiss_idx] = memory_id
+            self.timestamps.append(timestamp)
+            self.importances.append(importance)
+            self._pending.append(("add", memory_id, vector, timestamp, importance))
     
-    def search(self, query_embedding: List[float], k: int = 10) -> List[Dict]:
+    def search(
+        self,
+        query_embedding: List[float],
+        k: int = 10,
+        search_filter: Optional["SearchFilter"] = None,
+    ) -> List[Dict]:
         """
         Search for similar vectors.
         
         Args:
             query_embedding: The query vector
             k: Number of results to return
+            search_filter: Only consider memories matching this filter
             
         Returns:
             List of dicts with memory_id and score
         """
-        if self.index.ntotal == 0:
-            return []
-        
-        # Prepare query vector
-        vector = np.array([query_embedding], dtype=np.float32)
-        faiss.normalize_L2(vector)
+        return self.search_batch([query_embedding], k=k, search_filter=search_filter)[0]
+    
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: int = 10,
+        search_filter: Optional["SearchFilter"] = None,
+    ) -> List[List[Dict]]:
+        """
+        Search for several query vectors in one FAISS call.
         
-        # Don't request more than we have
-        k = min(k, self.index.ntotal)
+        With a filter, FAISS only scores matching live vectors (via an
+        IDSelectorBitmap), so each query gets the exact top k among them.
         
-        # Search
-        scores, indices = self.index.search(vector, k)
+        Args:
+            query_embeddings: Query vectors
+            k: Number of results to return per query
+            search_filter: Only consider memories matching this filter
+            
+        Returns:
+            One result list (dicts with memory_id and score) per query
+        """
+        # Prepare query vectors
+        vectors = np.array(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        if len(vectors):
+            _check_dimension(self.dimension, vectors.shape[1], "Query")
+        faiss.normalize_L2(vectors)
         
-        # Map back to memory IDs
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx != -1 and idx in self.reverse_map:
-                results.append({
-                    "memory_id": self.reverse_map[idx],
-                    "score": float(score)
-                })
+        with self._lock.read():
+            if self.index.ntotal == 0 or len(vectors) == 0:
+                return [[] for _ in range(len(vectors))]
+            
+            params = None
+            if search_filter is not None:
+                mask = self._filter_mask(search_filter)
+                matching = int(mask.sum())
+                if matching == 0:
+                    return [[] for _ in range(len(vectors))]
+                # Bit i of the bitmap selects FAISS index i; keep it referenced during the search
+                bitmap = np.packbits(mask, bitorder="little")
+                selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+                params = faiss.SearchParameters(sel=selector)
+                k = min(k, matching)
+            
+            # Don't request more than we have
+            k = min(k, self.index.ntotal)
+            
+            # Search
+            scores, indices = self.index.search(vectors, k, params=params)
+            
+            # Map back to memory IDs
+            batch_results = []
+            for row_scores, row_indices in zip(scores, indices):
+                results = []
+                for score, idx in zip(row_scores, row_indices):
+                    if idx != -1 and idx in self.reverse_map:
+                        results.append({
+                            "memory_id": self.reverse_map[idx],
+                            "score": float(score)
+                        })
+                batch_results.append(results)
         
-        return results
+        return batch_results
     
     def remove(self, memory_id: int) -> None:
         """
@@ -110,37 +295,101 @@ class FAISSVectorStore:
         Note: FAISS doesn't support true deletion. The vector remains
         in the index but won't be returned in results.
         """
-        if memory_id in self.id_map:
-            faiss_idx = self.id_map[memory_id]
-            if faiss_idx in self.reverse_map:
-                del self.reverse_map[faiss_idx]
-            del self.id_map[memory_id]
+        with self._lock.write():
+            if memory_id in self.id_map:
+                faiss_idx = self.id_map[memory_id]
+                if faiss_idx in self.reverse_map:
+                    del self.reverse_map[faiss_idx]
+                del self.id_map[memory_id]
+                self._pending.append(("remove", memory_id, None, None, None))
     
-    def save(self, path: str) -> None:
+    def replace_contents(self, other: "FAISSVectorStore", authoritative: bool = False) -> None:
         """
-        Save index and mappings to disk.
+        Atomically take over another store's index and mappings.
+        
+        Used to swap in a rebuilt index without invalidating references
+        to this store held elsewhere.
         
         Args:
-            path: Base path (without extension)
+            other: Store to take the contents of
+            authoritative: The new contents are complete (e.g. rebuilt from
+                the DB); drop unsaved changes and overwrite on next save
         """
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        faiss.write_index(self.index, f"{path}.faiss")
-        with open(f"{path}.map.json", "w") as f:
-            json.dump({
-                "id_map": {str(k): v for k, v in self.id_map.items()},
-                "reverse_map": {str(k): v for k, v in self.reverse_map.items()}
-            }, f)
+        with self._lock.write():
+            self.dimension = other.dimension
+            self.index = other.index
+            self.id_map = other.id_map
+            self.reverse_map = other.reverse_map
+            self.timestamps = other.timestamps
+            self.importances = other.importances
+            if authoritative:
+                self._pending = []
+                self._authoritative = True
     
-    def load(self, path: str) -> bool:
+    def _replay_pending(self, base: "FAISSVectorStore") -> None:
+        """Apply this store's unsaved changes on top of base. Caller holds the write lock."""
+        for op, memory_id, vector, timestamp, importance in self._pending:
+            if op == "add":
+                if memory_id in base.id_map:
+                    continue
+                faiss_idx = base.index.ntotal
+                base.index.add(vector)
+                base.id_map[memory_id] = faiss_idx
+                base.reverse_map[faiss_idx] = memory_id
+                base.timestamps.append(timestamp)
+                base.importances.append(importance)
+            elif memory_id in base.id_map:
+                del base.reverse_map[base.id_map.pop(memory_id)]
+    
+    def save(self, path: str) -> None:
         """
-        Load index and mappings from disk.
+        Save index and mappings to disk as a new versioned snapshot.
+        
+        Files are written to temporaries and renamed into place under an
+        exclusive cross-process lock. If another process saved a newer
+        snapshot since this store last synced, this store's unsaved changes
+        are merged on top of it first.
         
         Args:
             path: Base path (without extension)
-            
-        Returns:
-            True if loaded successfully, False if files don't exist
         """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._save_lock, file_lock(f"{path}.lock"):
+            disk_version = read_index_version(path)
+            
+            if disk_version != self.version and not self._authoritative:
+                newer = FAISSVectorStore(self.dimension)
+                if newer._read_files(path):
+                    with self._lock.write():
+                        self._replay_pending(newer)
+                        self.index = newer.index
+                        self.id_map = newer.id_map
+                        self.reverse_map = newer.reverse_map
+                        self.timestamps = newer.timestamps
+                        self.importances = newer.importances
+            
+            new_version = disk_version + 1
+            with self._lock.read():
+                saved_ops = len(self._pending)
+                _atomic_write(f"{path}.faiss", lambda tmp: faiss.write_index(self.index, tmp))
+                _atomic_write(f"{path}.map.json", lambda tmp: _dump_json(tmp, {
+                    "version": new_version,
+                    "id_map": {str(k): v for k, v in self.id_map.items()},
+                    "reverse_map": {str(k): v for k, v in self.reverse_map.items()},
+                    "timestamps": [None if math.isnan(t) else t for t in self.timestamps],
+                    "importances": [None if math.isnan(i) else i for i in self.importances]
+                }))
+            
+            # Publish last: readers only look at files once the version moves
+            _atomic_write(f"{path}.version", lambda tmp: _write_text(tmp, str(new_version)))
+            
+            with self._lock.write():
+                self.version = new_version
+                del self._pending[:saved_ops]
+                self._authoritative = False
+    
+    def _read_files(self, path: str) -> bool:
+        """Read a snapshot into this (private, unshared) store without locking."""
         if not os.path.exists(f"{path}.faiss"):
             return False
         
@@ -148,20 +397,608 @@ class FAISSVectorStore:
             self.index = faiss.read_index(f"{path}.faiss")
             with open(f"{path}.map.json", "r") as f:
                 data = json.load(f)
-                self.id_map = {int(k): v for k, v in data["id_map"].items()}
-                self.reverse_map = {int(k): v for k, v in data["reverse_map"].items()}
-            return True
         except Exception:
             return False
+        
+        # Refuse to mix vectors from a different embedding size
+        _check_dimension(self.dimension, self.index.d, f"Index {path}")
+        
+        self.id_map = {int(k): v for k, v in data["id_map"].items()}
+        self.reverse_map = {int(k): v for k, v in data["reverse_map"].items()}
+        self.timestamps = [
+            math.nan if t is None else t
+            for t in data.get("timestamps", [None] * self.index.ntotal)
+        ]
+        self.importances = [
+            math.nan if i is None else i
+            for i in data.get("importances", [None] * self.index.ntotal)
+        ]
+        self.version = data.get("version", 0)
+        return True
+    
+    def load(self, path: str) -> bool:
+        """
+        Load index and mappings from disk.
+        
+        Args:
+            path: Base path (without extension)
+            
+        Returns:
+            True if loaded successfully, False if files don't exist
+            
+        Raises:
+            DimensionMismatchError: The saved index holds vectors of another size
+        """
+        loaded = FAISSVectorStore(self.dimension)
+        with file_lock(f"{path}.lock", exclusive=False):
+            if not loaded._read_files(path):
+                return False
+        
+        with self._lock.write():
+            self.index = loaded.index
+            self.id_map = loaded.id_map
+            self.reverse_map = loaded.reverse_map
+            self.timestamps = loaded.timestamps
+            self.importances = loaded.importances
+            self.version = loaded.version
+            self._pending = []
+        return True
+    
+    def refresh(self, path: str) -> bool:
+        """
+        Reload a newer snapshot written by another process, keeping this
+        store's unsaved changes on top of it.
+        
+        Returns:
+            True if a newer snapshot was loaded
+        """
+        newer = FAISSVectorStore(self.dimension)
+        with file_lock(f"{path}.lock", exclusive=False):
+            if not newer._read_files(path):
+                return False
+        
+        with self._lock.write():
+            if newer.version <= self.version:
+                return False
+            self._replay_pending(newer)
+            self.index = newer.index
+            self.id_map = newer.id_map
+            self.reverse_map = newer.reverse_map
+            self.timestamps = newer.timestamps
+            self.importances = newer.importances
+            self.version = newer.version
+            self._authoritative = False
+        return True
+    
+    def _filter_mask(self, search_filter: "SearchFilter") -> np.ndarray:
+        """Boolean mask over FAISS indices of live vectors matching the filter. Caller holds the lock."""
+        alive = np.zeros(self.index.ntotal, dtype=bool)
+        alive[list(self.reverse_map)] = True
+        return alive & search_filter.mask(
+            np.asarray(self.timestamps, dtype=np.float64),
+            np.asarray(self.importances, dtype=np.float64),
+        )
+    
+    def timestamp_of(self, memory_id: int) -> float:
+        """occurred_at (unix seconds) of an indexed memory, NaN if unknown."""
+        faiss_idx = self.id_map.get(memory_id)
+        return math.nan if faiss_idx is None else self.timestamps[faiss_idx]
+    
+    def mark_authoritative(self) -> None:
+        """Treat current contents as complete: the next save overwrites the snapshot."""
+        with self._lock.write():
+            self._pending = []
+            self._authoritative = True
+    
+    def export(self) -> Tuple[List[int], np.ndarray, List[float], List[float]]:
+        """
+        Live entries of the index.
+        
+        Returns:
+            (memory_ids, normalized vectors, timestamps, importances), aligned
+        """
+        with self._lock.read():
+            positions = sorted(self.reverse_map)
+            memory_ids = [self.reverse_map[p] for p in positions]
+            timestamps = [self.timestamps[p] for p in positions]
+            importances = [self.importances[p] for p in positions]
+            if positions:
+                vectors = self.index.reconstruct_n(0, self.index.ntotal)[positions]
+            else:
+                vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        return memory_ids, vectors, timestamps, importances
     
     @property
     def count(self) -> int:
         """Number of vectors in the index."""
-        return len(self.id_map)
+        with self._lock.read():
+            return len(self.id_map)
+
+
+def _atomic_write(path: str, write) -> None:
+    """Write via write(tmp_path) to a temp file, then rename over path."""
+    tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _dump_json(path: str, data: Dict) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def _write_text(path: str, content: str) -> None:
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def read_index_version(path: str) -> int:
+    """
+    Version of the snapshot currently published at path (0 if none).
+    
+    Cheap enough to call on every get_vector_store().
+    """
+    try:
+        with open(f"{path}.version", "r") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+# Segment holding semantic facts (and any memory without a timestamp)
+SEMANTIC_SEGMENT = "semantic"
+
+# Width of an episodic time bucket
+BUCKET_SECONDS = 7 * 24 * 3600
+
+# Buckets older than this are left on disk until a search or remove needs them
+LOAD_RECENT_DAYS = 90
+
+
+def _to_timestamp(occurred_at: datetime) -> float:
+    # Naive datetimes are stored as UTC
+    if occurred_at.tzinfo is None:
+        occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+    return occurred_at.timestamp()
+
+
+def _bucket_key(timestamp: float) -> str:
+    return f"b{int(timestamp // BUCKET_SECONDS)}"
+
+
+def _bucket_end(key: str) -> float:
+    """Exclusive upper bound (unix seconds) of a bucket's timestamps."""
+    return (int(key[1:]) + 1) * BUCKET_SECONDS
+
+
+def _age_days(now: float, timestamp: float) -> int:
+    # Whole days, rounded down like timedelta.days in search scoring
+    return math.floor((now - timestamp) / 86400)
+
+
+def _segment_path(path: str, key: str) -> str:
+    # The semantic segment keeps the pre-segmentation file names
+    return path if key == SEMANTIC_SEGMENT else f"{path}.{key}"
+
+
+def _read_manifest(path: str) -> Tuple[int, Dict[str, int]]:
+    """(version, {segment key: vector count}) of the snapshot at path."""
+    try:
+        with open(f"{path}.segments.json", "r") as f:
+            data = json.load(f)
+        return data["version"], data["segments"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return 0, {}
+
+
+def read_manifest_version(path: str) -> int:
+    """
+    Version of the segment manifest published at path (0 if none).
+    
+    Cheap enough to call on every get_vector_store().
+    """
+    return _read_manifest(path)[0]
+
+
+class SegmentedVectorStore:
+    """
+    A conversation's vector index, split into segments.
+    
+    Semantic facts live in one segment; episodic bubbles are partitioned
+    into weekly time buckets by occurred_at. Each segment is a
+    FAISSVectorStore with its own versioned files, and a small manifest
+    ({path}.segments.json) lists the buckets.
+    
+    Searches given a decay_rate rank episodic hits by
+    similarity * exp(-decay_rate * days_ago) and visit buckets newest-first.
+    Similarity is at most 1, so a bucket can contribute at most
+    exp(-decay_rate * age of its newest edge); once the k-th best score
+    reaches that bound, older buckets are skipped. Buckets older than
+    LOAD_RECENT_DAYS are only read from disk when a search gets that far,
+    and unload() releases old buckets from memory again.
+    """
+    
+    def __init__(self, dimension: Optional[int] = None):
+        if dimension is None:
+            dimension = get_settings().get_embedding_dimensions()
+        self.dimension = dimension
+        self.segments: Dict[str, FAISSVectorStore] = {SEMANTIC_SEGMENT: FAISSVectorStore(dimension)}
+        
+        # Buckets on disk but not in memory: key -> vector count
+        self._unloaded: Dict[str, int] = {}
+        
+        self._segments_lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        
+        # Where segments are loaded from / saved to
+        self.path: Optional[str] = None
+        
+        # Manifest version this store reflects
+        self.version = 0
+        
+        # Rebuilt from the DB: save() overwrites instead of merging
+        self._authoritative = False
+    
+    def add(
+        self,
+        memory_id: int,
+        embedding: List[float],
+        occurred_at: Optional[datetime] = None,
+        importance: Optional[float] = None,
+    ) -> None:
+        """
+        Add a memory embedding to the index.
+        
+        Args:
+            memory_id: The database ID of the memory
+            embedding: The embedding vector
+            occurred_at: For episodic memories; selects the time bucket.
+                Memories without it go to the semantic segment.
+            importance: The memory's importance, for filtered searches
+        """
+        if occurred_at is None:
+            self._segment(SEMANTIC_SEGMENT).add(memory_id, embedding, importance=importance)
+            return
+        
+        timestamp = _to_timestamp(occurred_at)
+        self._segment(_bucket_key(timestamp), create=True).add(
+            memory_id, embedding, timestamp=timestamp, importance=importance
+        )
+    
+    def remove(self, memory_id: int) -> None:
+        """Remove a memory from whichever segment holds it (soft delete)."""
+        with self._segments_lock:
+            for segment in self.segments.values():
+                if memory_id in segment.id_map:
+                    segment.remove(memory_id)
+                    return
+            
+            # Not in memory: look through buckets left on disk, newest first
+            for key in sorted(self._unloaded, key=_bucket_end, reverse=True):
+                segment = self._load_segment(key)
+                if memory_id in segment.id_map:
+                    segment.remove(memory_id)
+                    return
+    
+    def search(
+        self,
+        query_embedding: List[float],
+        k: int = 10,
+        decay_rate: Optional[float] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict]:
+        """
+        Search for similar vectors.
+        
+        Args:
+            query_embedding: The query vector
+            k: Number of results to return
+            decay_rate: Rank episodic hits by similarity * exp(-decay_rate * days_ago)
+                and skip buckets too old to reach the top k. None ranks
+                by similarity alone and searches every bucket.
+            search_filter: Only consider memories matching this filter;
+                segments that cannot match are skipped entirely
+            
+        Returns:
+            List of dicts with memory_id and (undecayed) similarity score
+        """
+        return self.search_batch(
+            [query_embedding], k=k, decay_rate=decay_rate, search_filter=search_filter
+        )[0]
+    
+    @timed("faiss_search")
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: int = 10,
+        decay_rate: Optional[float] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[List[Dict]]:
+        """
+        Search for several query vectors, one FAISS call per visited segment.
+        
+        Args:
+            query_embeddings: Query vectors
+            k: Number of results to return per query
+            decay_rate: See search()
+            search_filter: See search()
+            
+        Returns:
+            One result list (dicts with memory_id and score) per query
+        """
+        vectors = np.array(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        faiss.normalize_L2(vectors)
+        now = time.time()
+        
+        # Per query: (ranking score, similarity, memory_id)
+        hits = [[] for _ in range(len(vectors))]
+        if search_filter is None or (search_filter.memory_type != "bubble" and not search_filter.has_time_window):
+            semantic = self.segments[SEMANTIC_SEGMENT]
+            for i, row in enumerate(semantic.search_batch(vectors, k=k, search_filter=search_filter)):
+                hits[i] = [(r["score"], r["score"], r["memory_id"]) for r in row]
+        
+        active = list(range(len(vectors)))
+        for key in self._bucket_keys(search_filter):
+            if decay_rate is not None:
+                # Best score any memory in this (or an older) bucket could reach
+                bound = math.exp(-decay_rate * _age_days(now, _bucket_end(key)))
+                active = [i for i in active if len(hits[i]) < k or hits[i][k - 1][0] < bound]
+                if not active:
+                    break
+            
+            segment = self._segment(key)
+            if segment is None:
+                continue
+            
+            rows = segment.search_batch(vectors[active], k=k, search_filter=search_filter)
+            for i, row in zip(active, rows):
+                for r in row:
+                    similarity = r["score"]
+                    score = similarity
+                    timestamp = segment.timestamp_of(r["memory_id"])
+                    if decay_rate is not None and not math.isnan(timestamp):
+                        score = similarity * math.exp(-decay_rate * _age_days(now, timestamp))
+                    hits[i].append((score, similarity, r["memory_id"]))
+                hits[i] = heapq.nlargest(k, hits[i])
+        
+        return [
+            [{"memory_id": memory_id, "score": similarity} for _, similarity, memory_id in heapq.nlargest(k, row)]
+            for row in hits
+        ]
+    
+    def unload(self, older_than_days: int = LOAD_RECENT_DAYS) -> int:
+        """
+        Release saved buckets older than older_than_days from memory.
+        
+        They are read back from disk when a search or remove reaches them.
+        
+        Returns:
+            Number of buckets unloaded
+        """
+        cutoff = time.time() - older_than_days * 86400
+        unloaded = 0
+        with self._segments_lock:
+            for key, segment in list(self.segments.items()):
+                if (
+                    key != SEMANTIC_SEGMENT
+                    and _bucket_end(key) < cutoff
+                    and segment.version > 0
+                    and not segment._pending
+                    and not segment._authoritative
+                ):
+                    self._unloaded[key] = segment.count
+                    del self.segments[key]
+                    unloaded += 1
+        return unloaded
+    
+    def replace_contents(self, other: "SegmentedVectorStore", authoritative: bool = False) -> None:
+        """
+        Atomically take over another store's segments.
+        
+        Args:
+            other: Store to take the contents of
+            authoritative: The new contents are complete (e.g. rebuilt from
+                the DB); overwrite every segment on next save and drop
+                buckets that no longer exist
+        """
+        with self._segments_lock:
+            self.dimension = other.dimension
+            self.segments = other.segments
+            self._unloaded = other._unloaded
+            if authoritative:
+                for segment in self.segments.values():
+                    segment.mark_authoritative()
+                self._authoritative = True
+    
+    def export(self) -> Tuple[List[int], np.ndarray, List[float], List[float]]:
+        """
+        Live entries of every segment (buckets on disk are loaded).
+        
+        Returns:
+            (memory_ids, normalized vectors, timestamps, importances), aligned
+        """
+        with self._segments_lock:
+            for key in list(self._unloaded):
+                self._load_segment(key)
+            parts = [segment.export() for segment in self.segments.values()]
+        
+        memory_ids = [m for ids, _, _, _ in parts for m in ids]
+        vectors = np.vstack([v for _, v, _, _ in parts])
+        timestamps = [t for _, _, ts, _ in parts for t in ts]
+        importances = [i for _, _, _, imps in parts for i in imps]
+        return memory_ids, vectors, timestamps, importances
+    
+    def save(self, path: str) -> None:
+        """
+        Save changed segments and publish a new manifest.
+        
+        Each segment is saved (and merged with other processes' changes)
+        as in FAISSVectorStore.save(); the manifest is rewritten under its
+        own lock so bucket lists from concurrent writers are combined.
+        
+        Args:
+            path: Base path (without extension)
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._save_lock, file_lock(f"{path}.segments.lock"):
+            disk_version, on_disk = _read_manifest(path)
+            
+            with self._segments_lock:
+                segments = dict(self.segments)
+                unloaded = dict(self._unloaded)
+                authoritative = self._authoritative
+            
+            for key, segment in segments.items():
+                segment_path = _segment_path(path, key)
+                if segment._pending or segment._authoritative or read_index_version(segment_path) == 0:
+                    segment.save(segment_path)
+            
+            counts = {} if authoritative else dict(on_disk)
+            counts.update(unloaded)
+            counts.update({key: segment.count for key, segment in segments.items()})
+            
+            if authoritative:
+                # Buckets that no longer exist after a rebuild
+                for key in set(on_disk) - set(counts):
+                    for suffix in (".faiss", ".map.json", ".version"):
+                        if os.path.exists(_segment_path(path, key) + suffix):
+                            os.remove(_segment_path(path, key) + suffix)
+            
+            new_version = disk_version + 1
+            _atomic_write(f"{path}.segments.json", lambda tmp: _dump_json(tmp, {
+                "version": new_version,
+                "segments": counts
+            }))
+            
+            with self._segments_lock:
+                self.path = path
+                self.version = new_version
+                self._authoritative = False
+    
+    def load(self, path: str) -> bool:
+        """
+        Load the semantic segment and recent buckets from disk.
+        
+        Indexes saved before segmentation load as a single semantic segment.
+        
+        Returns:
+            True if anything was loaded
+            
+        Raises:
+            DimensionMismatchError: The saved index holds vectors of another size
+        """
+        version, on_disk = _read_manifest(path)
+        cutoff = time.time() - LOAD_RECENT_DAYS * 86400
+        
+        semantic = FAISSVectorStore(self.dimension)
+        loaded = semantic.load(path)
+        segments = {SEMANTIC_SEGMENT: semantic}
+        unloaded = {}
+        
+        for key, count in on_disk.items():
+            if key == SEMANTIC_SEGMENT:
+                continue
+            if _bucket_end(key) < cutoff:
+                unloaded[key] = count
+                continue
+            segment = FAISSVectorStore(self.dimension)
+            segment.load(_segment_path(path, key))
+            segments[key] = segment
+        
+        with self._segments_lock:
+            self.path = path
+            self.segments = segments
+            self._unloaded = unloaded
+            self.version = version
+        return loaded or bool(on_disk)
+    
+    def refresh(self, path: str) -> bool:
+        """
+        Pick up segments saved by other processes since this store last
+        synced, keeping this store's unsaved changes on top.
+        
+        Returns:
+            True if a newer manifest was applied
+        """
+        version, on_disk = _read_manifest(path)
+        cutoff = time.time() - LOAD_RECENT_DAYS * 86400
+        
+        with self._segments_lock:
+            if version <= self.version:
+                return False
+            
+            for key, segment in list(self.segments.items()):
+                if key != SEMANTIC_SEGMENT and key not in on_disk and not segment._pending:
+                    # Dropped by a rebuild in another process
+                    del self.segments[key]
+                    continue
+                segment_path = _segment_path(path, key)
+                if read_index_version(segment_path) > segment.version:
+                    segment.refresh(segment_path)
+            
+            self._unloaded = {}
+            for key, count in on_disk.items():
+                if key in self.segments:
+                    continue
+                if _bucket_end(key) < cutoff:
+                    self._unloaded[key] = count
+                else:
+                    segment = FAISSVectorStore(self.dimension)
+                    segment.load(_segment_path(path, key))
+                    self.segments[key] = segment
+            
+            self.path = path
+            self.version = version
+        return True
+    
+    @property
+    def count(self) -> int:
+        """Number of vectors across all segments."""
+        with self._segments_lock:
+            return sum(s.count for s in self.segments.values()) + sum(self._unloaded.values())
+    
+    def _bucket_keys(self, search_filter: Optional[SearchFilter] = None) -> List[str]:
+        """Episodic bucket keys (loaded or not) that can match the filter, newest first."""
+        if search_filter is not None and search_filter.memory_type == "semantic":
+            return []
+        
+        with self._segments_lock:
+            keys = [k for k in self.segments if k != SEMANTIC_SEGMENT] + list(self._unloaded)
+        
+        if search_filter is not None:
+            if search_filter.occurred_after is not None:
+                keys = [k for k in keys if _bucket_end(k) > search_filter.occurred_after]
+            if search_filter.occurred_before is not None:
+                keys = [k for k in keys if _bucket_end(k) - BUCKET_SECONDS < search_filter.occurred_before]
+        return sorted(keys, key=_bucket_end, reverse=True)
+    
+    def _segment(self, key: str, create: bool = False) -> Optional[FAISSVectorStore]:
+        """Get a segment, loading it from disk if it was unloaded."""
+        with self._segments_lock:
+            segment = self.segments.get(key)
+            if segment is None:
+                if key in self._unloaded:
+                    segment = self._load_segment(key)
+                elif create:
+                    segment = self.segments[key] = FAISSVectorStore(self.dimension)
+            return segment
+    
+    def _load_segment(self, key: str) -> FAISSVectorStore:
+        """Read an unloaded bucket back from disk. Caller holds _segments_lock."""
+        segment = FAISSVectorStore(self.dimension)
+        segment.load(_segment_path(self.path, key))
+        self.segments[key] = segment
+        del self._unloaded[key]
+        return segment
 
 
 # Global cache of vector stores (one per conversation)
-_vector_stores: Dict[int, FAISSVectorStore] = {}
+_vector_stores: Dict[int, SegmentedVectorStore] = {}
+_vector_stores_lock = threading.Lock()
 
 
 def get_index_path(conversation_id: int) -> str:
@@ -171,37 +1008,107 @@ def get_index_path(conversation_id: int) -> str:
     return os.path.join(index_dir, f"conv_{conversation_id}")
 
 
-def get_vector_store(conversation_id: int) -> FAISSVectorStore:
+def get_local_vector_store(conversation_id: int, load: bool = True) -> SegmentedVectorStore:
     """
-    Get or create a vector store for a conversation.
-    
-    This is the main entry point for using FAISS in ContextMemory.
+    Get or create the in-process vector store for a conversation.
     
     Args:
         conversation_id: The conversation to get the store for
+        load: Read the saved index from disk if the store isn't cached yet
+              (or was cut over to a new embedding space). Rebuilds pass
+              False since they overwrite it anyway.
         
     Returns:
-        FAISSVectorStore instance
+        SegmentedVectorStore instance
     """
-    global _vector_stores
+    # Don't load a conversation mid-cutover in another process
+    with migration_guard(conversation_id):
+        store = _vector_stores.get(conversation_id)
+        if store is not None:
+            path = get_index_path(conversation_id)
+            dimension = embedding_space(conversation_id).size
+            if store.dimension != dimension and load:
+                # Cut over to a new embedding space by another process's migration
+                migrated = SegmentedVectorStore(dimension)
+                migrated.load(path)
+                store.replace_contents(migrated)
+                store.version = migrated.version
+            elif read_manifest_version(path) > store.version:
+                # Pick up snapshots saved by other worker processes
+                store.refresh(path)
+            return store
+
+        with _vector_stores_lock:
+            # Another thread may have loaded it while we waited
+            store = _vector_stores.get(conversation_id)
+            if store is None:
+                store = SegmentedVectorStore(embedding_space(conversation_id).size)
+                if load:
+                    store.load(get_index_path(conversation_id))  # Load if exists, otherwise empty
+                _vector_stores[conversation_id] = store
     
-    if conversation_id not in _vector_stores:
-        store = FAISSVectorStore()
+    return store
+
+
+def save_local_vector_store(conversation_id: int) -> None:
+    """Save a conversation's in-process vector store to disk."""
+    store = _vector_stores.get(conversation_id)
+    if store is not None:
         path = get_index_path(conversation_id)
-        store.load(path)  # Load if exists, otherwise empty
-        _vector_stores[conversation_id] = store
+        store.save(path)
+
+
+def get_vector_store(conversation_id: int):
+    """
+    Get or create a vector store for a conversation.
+    
+    This is the main entry point for using FAISS in ContextMemory. When
+    settings.index_server_socket is set, returns a proxy to the store held
+    by the shared index server instead of an in-process one.
     
-    return _vector_stores[conversation_id]
+    Args:
+        conversation_id: The conversation to get the store for
+        
+    Returns:
+        SegmentedVectorStore or RemoteVectorStore instance
+    """
+    if get_settings().index_server_socket:
+        from contextmemory.server.index_client import get_remote_vector_store
+        return get_remote_vector_store(conversation_id)
+    return get_local_vector_store(conversation_id)
 
 
+@timed("save_index")
 def save_vector_store(conversation_id: int) -> None:
     """Save a conversation's vector store to disk."""
-    if conversation_id in _vector_stores:
-        path = get_index_path(conversation_id)
-        _vector_stores[conversation_id].save(path)
+    if get_settings().index_server_socket:
+        from contextmemory.server.index_client import get_remote_vector_store
+        get_remote_vector_store(conversation_id).save()
+        return
+    save_local_vector_store(conversation_id)
 
 
-def rebuild_index_from_db(db, conversation_id: int) -> FAISSVectorStore:
+def index_memory(store, memory, embedding: Optional[List[float]] = None) -> None:
+    """
+    Add a Memory row's embedding to a vector store, with the attributes
+    used for time bucketing and search filters.
+    
+    Args:
+        store: Vector store to add to
+        memory: The Memory row
+        embedding: Vector to index instead of memory.embedding (e.g. a
+                   re-embedding that isn't stored yet)
+    """
+    occurred_at = (memory.occurred_at or memory.created_at) if memory.is_episodic else None
+    store.add(
+        memory.id,
+        memory.embedding if embedding is None else embedding,
+        occurred_at=occurred_at,
+        importance=memory.importance,
+    )
+
+
+def rebuild_index_from_db(db, conversation_id: int) -> SegmentedVectorStore:
     """
     Rebuild FAISS index from database.
     
@@ -215,32 +1122,49 @@ def rebuild_index_from_db(db, conversation_id: int) -> FAISSVectorStore:
         conversation_id: Conversation to rebuild
         
     Returns:
-        New FAISSVectorStore with all memories indexed
+        The conversation's vector store, now holding all memories
     """
     from contextmemory.db.models.memory import Memory
     
-    store = FAISSVectorStore()
-    
-    # Fetch all memories with embeddings
-    memories = db.query(Memory).filter(
-        Memory.conversation_id == conversation_id,
-        Memory.is_active == True,
-        Memory.embedding.isnot(None)
-    ).all()
-    
-    # Add each to the index
-    for mem in memories:
-        if mem.embedding:
-            store.add(mem.id, mem.embedding)
-    
-    # Cache and save
-    _vector_stores[conversation_id] = store
-    save_vector_store(conversation_id)
+    with migration_guard(conversation_id), conversation_lock(conversation_id):
+        rebuilt = SegmentedVectorStore(embedding_space(conversation_id).size)
+        
+        # Fetch all memories with embeddings
+        memories = db.query(Memory).filter(
+            Memory.conversation_id == conversation_id,
+            Memory.is_active == True,
+            Memory.embedding.isnot(None)
+        ).all()
+        
+        # Add each to the index, bubbles into their time buckets
+        for mem in memories:
+            if mem.embedding:
+                index_memory(rebuilt, mem)
+        
+        # Swap into the cached store in place so existing references see it
+        if get_settings().index_server_socket:
+            store = get_vector_store(conversation_id)
+        else:
+            store = get_local_vector_store(conversation_id, load=False)
+        store.replace_contents(rebuilt, authoritative=True)
+        save_vector_store(conversation_id)
     
     return store
 
 
+def _collect_index_metrics(registry) -> None:
+    """Sizes of the in-process indexes, for core.metrics."""
+    with _vector_stores_lock:
+        stores = list(_vector_stores.values())
+    registry.set_gauge(INDEX_CONVERSATIONS, len(stores))
+    registry.set_gauge(INDEX_VECTORS, sum(store.count for store in stores))
+    registry.set_gauge(INDEX_SEGMENTS, sum(len(store.segments) for store in stores))
+
+
+register_collector(_collect_index_metrics)
+
+
 def reset_vector_stores() -> None:
     """Clear all cached vector stores. Useful for testing."""
-    global _vector_stores
-    _vector_stores = {}
+    with _vector_stores_lock:
+        _vector_stores.clear()
@@ -0,0 +1,331 @@
+"""
+HTTP service mode.
+
+A dependency-free ASGI application exposing ContextMemory over HTTP:
+
+    POST /add      {"messages": [...], "conversation_id": 1, "timeout": 30}
+    POST /search   {"query": "...", "conversation_id": 1, "limit": 10, "memory_type": "bubble",
+                    "occurred_after": "2025-01-01T00:00:00Z", "deadline_ms": 300, ...}
+    POST /context  {"query": "...", "conversation_id": 1, "token_budget": 500}
+    POST /update   {"memory_id": 5, "text": "..."}
+    POST /delete   {"memory_id": 5}
+    GET  /health
+    GET  /metrics  (Prometheus text format, with settings.metrics_enabled)
+
+Concurrent searches are micro-batched: queries arriving within
+batch_window_ms of each other share one embeddings request, and their
+FAISS lookups are grouped per conversation into one batch search. Each
+request gets its own session from the engine's connection pool. When more
+than max_pending requests are in flight, new ones are rejected with
+503 and a Retry-After header instead of queueing without bound. Requests
+that run out of their "timeout" (seconds) get 504; searches with a
+"deadline_ms" answer in time with degraded results instead.
+
+Run with any ASGI server, e.g.:
+    contextmemory serve --port 8000
+    uvicorn contextmemory.server.app:create_app --factory
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from openai import APIError
+
+from contextmemory.core.deadline import DeadlineExceeded, remaining
+from contextmemory.core.hedging import get_hedging_stats
+from contextmemory.core.prompt_builder import get_prompt_stats
+from contextmemory.core.metrics import PrometheusExporter, get_metrics, get_metrics_summary
+from contextmemory.core.rate_limiter import get_rate_limit_stats
+from contextmemory.core.settings import get_settings
+from contextmemory.db.database import SessionLocal
+from contextmemory.memory.context_cache import get_context_cache_stats
+from contextmemory.memory.embedding_space import EmbeddingSpace
+from contextmemory.memory.memory import RECENCY_DECAY, ContextMemory
+from contextmemory.memory.search_cache import get_search_cache_stats
+from contextmemory.memory.vector_store import SearchFilter, get_vector_store, rebuild_index_from_db
+from contextmemory.server.batching import (
+    DEFAULT_BATCH_WINDOW_MS,
+    DEFAULT_MAX_BATCH,
+    EmbeddingBatcher,
+    Overloaded,
+    SearchBatcher,
+)
+
+# Max requests in flight before answering 503
+DEFAULT_MAX_PENDING = 256
+
+# Threads running the (synchronous) ContextMemory calls. Matches the
+# default SQLAlchemy pool capacity (pool_size 5 + max_overflow 10).
+DEFAULT_WORKERS = 15
+
+# Seconds clients are told to wait after a 503
+RETRY_AFTER = 1
+
+
+class BatchedContextMemory(ContextMemory):
+    """ContextMemory whose query embeddings and FAISS searches go through shared batchers."""
+
+    def __init__(self, db, embedding_batcher: EmbeddingBatcher, search_batcher: SearchBatcher):
+        super().__init__(db)
+        self.embedding_batcher = embedding_batcher
+        self.search_batcher = search_batcher
+
+    def _embed_query(self, query: str, space: Optional[EmbeddingSpace] = None) -> List[float]:
+        try:
+            return self.embedding_batcher.submit(query, space).result(timeout=remaining())
+        except FutureTimeoutError:
+            raise DeadlineExceeded("Deadline exceeded waiting for the query embedding") from None
+
+    def _vector_search(
+        self,
+        conversation_id: int,
+        query_embedding: List[float],
+        k: int,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict]:
+        # Rebuild if empty
+        if get_vector_store(conversation_id).count == 0:
+            rebuild_index_from_db(self.db, conversation_id)
+
+        vectors = np.asarray([query_embedding], dtype=np.float32)
+        future = self.search_batcher.submit(conversation_id, k, vectors, RECENCY_DECAY, search_filter)
+        return future.result()[0]
+
+
+class HTTPError(Exception):
+    """An error response with a status code."""
+
+    def __init__(self, status: int, message: str, headers: List[Tuple[bytes, bytes]] = ()):
+        super().__init__(message)
+        self.status = status
+        self.headers = list(headers)
+
+
+class MemoryService:
+    """
+    The ASGI application.
+
+    Args:
+        max_pending: Max requests in flight; more are rejected with 503
+        workers: Threads running ContextMemory calls (each holds one DB session)
+        batch_window_ms: Max time a search waits for others to batch with
+        max_batch: Max searches per embeddings request / FAISS batch
+    """
+
+    def __init__(
+        self,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        workers: int = DEFAULT_WORKERS,
+        batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="contextmemory-http")
+        self.embedding_batcher = EmbeddingBatcher(
+            batch_window_ms=batch_window_ms, max_batch=max_batch, max_queue=max_pending
+        )
+        self.search_batcher = SearchBatcher(
+            get_vector_store, batch_window_ms=batch_window_ms, max_batch=max_batch, max_queue=max_pending
+        )
+        self.routes: Dict[Tuple[str, str], Callable[[ContextMemory, Dict], Any]] = {
+            ("POST", "/add"): _add,
+            ("POST", "/search"): _search,
+            ("POST", "/context"): _context,
+            ("POST", "/update"): _update,
+            ("POST", "/delete"): _delete,
+        }
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        try:
+            if scope["method"] == "GET" and scope["path"] == "/health":
+                await _respond(send, 200, self.health())
+                return
+            if scope["method"] == "GET" and scope["path"] == "/metrics":
+                await self._metrics(send)
+                return
+
+            handler = self.routes.get((scope["method"], scope["path"]))
+            if handler is None:
+                raise HTTPError(404, f"No route for {scope['method']} {scope['path']}")
+
+            # Backpressure: shed load instead of growing queues
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPError(503, "Server busy", [(b"retry-after", str(RETRY_AFTER).encode())])
+
+            self.pending += 1
+            try:
+                payload = json.loads(await _read_body(receive) or b"{}")
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor, self._run, handler, payload)
+            finally:
+                self.pending -= 1
+
+            await _respond(send, 200, result)
+        except HTTPError as e:
+            await _respond(send, e.status, {"error": str(e)}, e.headers)
+        except Overloaded as e:
+            self.rejected += 1
+            await _respond(send, 503, {"error": str(e)}, [(b"retry-after", str(RETRY_AFTER).encode())])
+        except (ValueError, KeyError, TypeError) as e:
+            await _respond(send, 400, {"error": f"{type(e).__name__}: {e}"})
+        except DeadlineExceeded as e:
+            await _respond(send, 504, {"error": str(e)})
+        except APIError as e:
+            await _respond(send, 502, {"error": f"Upstream API error: {e}"})
+        except Exception as e:
+            if get_settings().debug:
+                print(f"[DEBUG] Request failed: {e!r}")
+            await _respond(send, 500, {"error": "Internal server error"})
+
+    def _run(self, handler: Callable[[ContextMemory, Dict], Any], payload: Dict) -> Any:
+        """Run one request on a worker thread with its own pooled session."""
+        db = SessionLocal()
+        try:
+            memory = BatchedContextMemory(db, self.embedding_batcher, self.search_batcher)
+            return handler(memory, payload)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def health(self) -> Dict:
+        return {
+            "status": "ok",
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "embedding_batcher": self.embedding_batcher.stats(),
+            "search_batcher": self.search_batcher.stats(),
+            "search_cache": get_search_cache_stats(),
+            "context_cache": get_context_cache_stats(),
+            "rate_limits": get_rate_limit_stats(),
+            "hedging": get_hedging_stats(),
+            "prompts": get_prompt_stats(),
+            "stages": get_metrics_summary(),
+        }
+
+    async def _metrics(self, send) -> None:
+        registry = get_metrics()
+        if registry is None:
+            raise HTTPError(404, "Metrics are disabled (settings.metrics_enabled)")
+        exporter = PrometheusExporter()
+        body = exporter.render(registry).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", exporter.content_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def close(self) -> None:
+        self.embedding_batcher.close()
+        self.search_batcher.close()
+        self.executor.shutdown(wait=True)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.close)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _add(memory: ContextMemory, payload: Dict) -> Dict:
+    return memory.add(payload["messages"], int(payload["conversation_id"]), timeout=_timeout(payload))
+
+
+def _search(memory: ContextMemory, payload: Dict) -> Dict:
+    return memory.search(
+        payload["query"],
+        int(payload["conversation_id"]),
+        limit=int(payload.get("limit", 10)),
+        include_connections=bool(payload.get("include_connections", True)),
+        expansion=payload.get("expansion", "direct"),
+        mode=payload.get("mode", "vector"),
+        memory_type=payload.get("memory_type"),
+        min_importance=payload.get("min_importance"),
+        occurred_after=_datetime(payload.get("occurred_after")),
+        occurred_before=_datetime(payload.get("occurred_before")),
+        timeout=_timeout(payload),
+        deadline_ms=payload.get("deadline_ms"),
+    )
+
+
+def _context(memory: ContextMemory, payload: Dict) -> Dict:
+    return memory.get_context(
+        payload["query"],
+        int(payload["conversation_id"]),
+        token_budget=int(payload.get("token_budget", 1000)),
+        mode=payload.get("mode", "vector"),
+        timeout=_timeout(payload),
+        deadline_ms=payload.get("deadline_ms"),
+    )
+
+
+def _timeout(payload: Dict) -> Optional[float]:
+    timeout = payload.get("timeout")
+    return float(timeout) if timeout is not None else None
+
+
+def _datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp from a request body."""
+    if value is None:
+        return None
+    # fromisoformat() only accepts a trailing "Z" from Python 3.11
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _update(memory: ContextMemory, payload: Dict) -> Dict:
+    updated = memory.update(int(payload["memory_id"]), payload["text"])
+    return {"memory_id": updated.id, "memory": updated.memory_text}
+
+
+def _delete(memory: ContextMemory, payload: Dict) -> Dict:
+    return memory.delete(int(payload["memory_id"]))
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _respond(send, status: int, data: Any, headers: List[Tuple[bytes, bytes]] = ()) -> None:
+    body = json.dumps(data).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_app(**kwargs) -> MemoryService:
+    """Create the ASGI application. Keyword arguments go to MemoryService."""
+    return MemoryService(**kwargs)
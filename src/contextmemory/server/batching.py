@@ -0,0 +1,193 @@
+"""
+Micro-batching helpers.
+
+A MicroBatcher collects requests submitted from many threads and runs
+them in batches on one worker thread: the first request of a batch waits
+at most batch_window_ms for others to join, up to max_batch requests.
+Queues are bounded so callers get Overloaded instead of queueing without
+limit when the batcher falls behind.
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from contextmemory.core.rate_limiter import INTERACTIVE, request_priority
+from contextmemory.memory.embedding_space import EmbeddingSpace, embedding_space
+from contextmemory.memory.embeddings import embed_texts
+from contextmemory.memory.vector_store import SearchFilter
+
+DEFAULT_BATCH_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_QUEUE = 1024
+
+
+class Overloaded(RuntimeError):
+    """Raised when a batcher's queue is full."""
+
+
+class MicroBatcher:
+    """
+    Base class; subclasses implement _execute(items) and resolve each
+    item's future.
+    """
+
+    name = "contextmemory-batcher"
+
+    def __init__(
+        self,
+        batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+        # Stats
+        self.batches = 0
+        self.requests = 0
+
+    def _submit(self, item: Any) -> Future:
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            raise Overloaded(f"{self.name} queue is full")
+        return future
+
+    def close(self) -> None:
+        """Finish queued work and stop the worker thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+
+            try:
+                self._execute(batch)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches += 1
+            self.requests += len(batch)
+            if stop:
+                return
+
+    def _execute(self, batch: List[Tuple[Any, Future]]) -> None:
+        raise NotImplementedError
+
+
+class SearchBatcher(MicroBatcher):
+    """
+    Groups concurrent vector searches per conversation (and decay rate and
+    filter) into one search_batch() call on that conversation's store.
+    """
+
+    name = "contextmemory-search-batcher"
+
+    def __init__(self, get_store: Callable[[int], Any], **kwargs):
+        self.get_store = get_store
+        super().__init__(**kwargs)
+
+    def submit(
+        self,
+        conversation_id: int,
+        k: int,
+        vectors: np.ndarray,
+        decay_rate: Optional[float] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> Future:
+        """Queue a search; the future resolves to one result list per query vector."""
+        return self._submit((conversation_id, k, vectors, decay_rate, search_filter))
+
+    def _execute(self, batch: List[Tuple[Any, Future]]) -> None:
+        by_search = defaultdict(list)
+        for (conversation_id, k, vectors, decay_rate, search_filter), future in batch:
+            by_search[(conversation_id, decay_rate, search_filter)].append((k, vectors, future))
+
+        for (conversation_id, decay_rate, search_filter), items in by_search.items():
+            try:
+                store = self.get_store(conversation_id)
+                matrix = np.vstack([vectors for _, vectors, _ in items])
+                k_max = max(k for k, _, _ in items)
+                results = store.search_batch(
+                    matrix, k=k_max, decay_rate=decay_rate, search_filter=search_filter
+                )
+            except Exception as e:
+                for *_, future in items:
+                    future.set_exception(e)
+                continue
+
+            # Hand each request back its own rows, trimmed to its own k
+            offset = 0
+            for k, vectors, future in items:
+                rows = results[offset:offset + len(vectors)]
+                offset += len(vectors)
+                future.set_result([row[:k] for row in rows])
+
+
+class EmbeddingBatcher(MicroBatcher):
+    """
+    Coalesces concurrent embed requests into one embeddings API call.
+    """
+
+    name = "contextmemory-embedding-batcher"
+
+    def submit(self, text: str, space: Optional[EmbeddingSpace] = None) -> Future:
+        """Queue a text; the future resolves to its embedding in that space."""
+        return self._submit((space or embedding_space(), text))
+
+    def _execute(self, batch: List[Tuple[Any, Future]]) -> None:
+        # One request per embedding space; identical texts are embedded once
+        by_space = defaultdict(dict)
+        for (space, text), future in batch:
+            by_space[space].setdefault(text, []).append(future)
+
+        for space, futures_by_text in by_space.items():
+            texts = list(futures_by_text)
+            try:
+                with request_priority(INTERACTIVE):
+                    embeddings = embed_texts(texts, space)
+            except Exception as e:
+                for futures in futures_by_text.values():
+                    for future in futures:
+                        future.set_exception(e)
+                continue
+            for text, embedding in zip(texts, embeddings):
+                for future in futures_by_text[text]:
+                    future.set_result(embedding)
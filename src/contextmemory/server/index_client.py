@@ -0,0 +1,167 @@
+"""
+Client side of the local index server.
+
+RemoteVectorStore has the same interface as FAISSVectorStore, so
+get_vector_store() can hand it out transparently when
+settings.index_server_socket is configured.
+"""
+
+import socket
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from contextmemory.core.settings import get_settings
+from contextmemory.memory.vector_store import SearchFilter
+from contextmemory.server import protocol
+
+
+class IndexClient:
+    """
+    Connection to the index server. Each thread keeps its own persistent
+    socket, so concurrent requests from one process reach the server in
+    parallel (and can be batched together there).
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        return sock
+
+    def call(self, op: int, payload: bytes) -> bytes:
+        """Send one request and wait for its response payload."""
+        sock = getattr(self._local, "sock", None)
+        for attempt in range(2):
+            if sock is None:
+                sock = self._connect()
+            try:
+                protocol.send_frame(sock, op, payload)
+                status, response = protocol.recv_frame(sock)
+                break
+            except (ConnectionError, OSError):
+                # Server restarted - reconnect once
+                sock.close()
+                sock = self._local.sock = None
+                if attempt:
+                    raise
+        if status != protocol.STATUS_OK:
+            raise protocol.ProtocolError(response.decode("utf-8", "replace"))
+        return response
+
+
+class RemoteVectorStore:
+    """
+    Proxy for a conversation's vector store living in the index server.
+    """
+
+    def __init__(self, conversation_id: int, client: IndexClient):
+        self.conversation_id = conversation_id
+        self.client = client
+
+    def add(
+        self,
+        memory_id: int,
+        embedding: List[float],
+        occurred_at: Optional[datetime] = None,
+        importance: Optional[float] = None,
+    ) -> None:
+        timestamp = None
+        if occurred_at is not None:
+            if occurred_at.tzinfo is None:
+                occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+            timestamp = occurred_at.timestamp()
+        self.client.call(
+            protocol.OP_ADD,
+            protocol.pack_add(self.conversation_id, memory_id, np.asarray(embedding), timestamp, importance),
+        )
+
+    def search(
+        self,
+        query_embedding: List[float],
+        k: int = 10,
+        decay_rate: Optional[float] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[Dict]:
+        return self.search_batch(
+            [query_embedding], k=k, decay_rate=decay_rate, search_filter=search_filter
+        )[0]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: int = 10,
+        decay_rate: Optional[float] = None,
+        search_filter: Optional[SearchFilter] = None,
+    ) -> List[List[Dict]]:
+        vectors = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        response = self.client.call(
+            protocol.OP_SEARCH,
+            protocol.pack_search(self.conversation_id, k, vectors, decay_rate, search_filter),
+        )
+        return protocol.unpack_search_results(response, len(vectors))
+
+    def remove(self, memory_id: int) -> None:
+        self.client.call(
+            protocol.OP_REMOVE,
+            protocol.pack_remove(self.conversation_id, memory_id),
+        )
+
+    def replace_contents(self, other, authoritative: bool = False) -> None:
+        """Replace the server-side index with the contents of a local store."""
+        memory_ids, vectors, timestamps, importances = other.export()
+        self.client.call(
+            protocol.OP_REPLACE,
+            protocol.pack_replace(self.conversation_id, memory_ids, vectors, timestamps, importances),
+        )
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Ask the server to persist the index (the server owns the files)."""
+        self.client.call(protocol.OP_SAVE, protocol.pack_conversation(self.conversation_id))
+
+    @property
+    def count(self) -> int:
+        response = self.client.call(
+            protocol.OP_COUNT,
+            protocol.pack_conversation(self.conversation_id),
+        )
+        return protocol.unpack_count(response)
+
+
+# Global client and proxies (lazy initialized)
+_client: Optional[IndexClient] = None
+_remote_stores: Dict[int, RemoteVectorStore] = {}
+_client_lock = threading.Lock()
+
+
+def get_index_client() -> IndexClient:
+    """Get or create the client for the configured index server socket."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = IndexClient(get_settings().index_server_socket)
+    return _client
+
+
+def get_remote_vector_store(conversation_id: int) -> RemoteVectorStore:
+    """Get the proxy for a conversation's server-side vector store."""
+    store = _remote_stores.get(conversation_id)
+    if store is None:
+        store = _remote_stores.setdefault(
+            conversation_id, RemoteVectorStore(conversation_id, get_index_client())
+        )
+    return store
+
+
+def reset_index_client() -> None:
+    """Drop the client and proxies. Useful for testing."""
+    global _client
+    with _client_lock:
+        _client = None
+        _remote_stores.clear()
@@ -0,0 +1,158 @@
+"""
+Local index server.
+
+Owns every FAISSVectorStore on the host and serves add/remove/search over
+a Unix domain socket (see server/protocol.py), so all worker processes
+share one copy of the vectors and every index write goes through a single
+writer. Concurrent searches are micro-batched: requests arriving within
+batch_window_ms of each other are grouped per conversation and answered
+with one FAISS batch search.
+
+Start it with:
+    contextmemory index-server --socket /tmp/contextmemory-index.sock
+
+and point workers at it with configure(index_server_socket=...) or the
+INDEX_SERVER_SOCKET environment variable.
+"""
+
+import math
+import os
+import signal
+import socketserver
+from datetime import datetime, timezone
+from typing import Optional
+
+from contextmemory.core.settings import get_settings
+from contextmemory.memory.vector_store import (
+    SegmentedVectorStore,
+    get_local_vector_store,
+    save_local_vector_store,
+)
+from contextmemory.server import protocol
+from contextmemory.server.batching import DEFAULT_BATCH_WINDOW_MS, DEFAULT_MAX_BATCH, SearchBatcher
+
+
+def _datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    if timestamp is None or math.isnan(timestamp):
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Serves one client connection until it closes."""
+
+    def handle(self) -> None:
+        sock = self.request
+        while True:
+            try:
+                op, payload = protocol.recv_frame(sock)
+            except (ConnectionError, OSError):
+                return
+            try:
+                response = self.server.dispatch(op, payload)
+            except Exception as e:
+                protocol.send_frame(sock, protocol.STATUS_ERROR, str(e).encode("utf-8"))
+            else:
+                protocol.send_frame(sock, protocol.STATUS_OK, response)
+
+
+class IndexServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server owning all local vector stores."""
+
+    daemon_threads = True
+    # Client connections are persistent; do not wait for them on shutdown
+    block_on_close = False
+
+    def __init__(
+        self,
+        socket_path: str,
+        batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+    ):
+        # Clear a stale socket left by a previous run
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+        self.socket_path = socket_path
+        self.batcher = SearchBatcher(
+            get_local_vector_store,
+            batch_window_ms=batch_window_ms,
+            max_batch=max_batch,
+        )
+
+    def dispatch(self, op: int, payload: bytes) -> bytes:
+        """Execute one request and return the response payload."""
+        if op == protocol.OP_SEARCH:
+            conversation_id, k, vectors, decay_rate, search_filter = protocol.unpack_search(payload)
+            dimension = get_local_vector_store(conversation_id).dimension
+            if vectors.shape[1] != dimension:
+                # Reject here so one bad request cannot fail a whole batch
+                raise ValueError(f"Expected {dimension}-d query vectors, got {vectors.shape[1]}")
+            results = self.batcher.submit(conversation_id, k, vectors, decay_rate, search_filter).result()
+            return protocol.pack_search_results(results)
+
+        if op == protocol.OP_ADD:
+            conversation_id, memory_id, vector, timestamp, importance = protocol.unpack_add(payload)
+            get_local_vector_store(conversation_id).add(
+                memory_id, vector, occurred_at=_datetime(timestamp), importance=importance
+            )
+            return b""
+
+        if op == protocol.OP_REMOVE:
+            conversation_id, memory_id = protocol.unpack_remove(payload)
+            get_local_vector_store(conversation_id).remove(memory_id)
+            return b""
+
+        if op == protocol.OP_COUNT:
+            conversation_id = protocol.unpack_conversation(payload)
+            return protocol.pack_count(get_local_vector_store(conversation_id).count)
+
+        if op == protocol.OP_SAVE:
+            save_local_vector_store(protocol.unpack_conversation(payload))
+            return b""
+
+        if op == protocol.OP_REPLACE:
+            conversation_id, memory_ids, vectors, timestamps, importances = protocol.unpack_replace(payload)
+            rebuilt = SegmentedVectorStore(vectors.shape[1] if len(vectors) else None)
+            for memory_id, vector, timestamp, importance in zip(memory_ids, vectors, timestamps, importances):
+                rebuilt.add(
+                    int(memory_id),
+                    vector,
+                    occurred_at=_datetime(float(timestamp)),
+                    importance=None if math.isnan(importance) else float(importance),
+                )
+            get_local_vector_store(conversation_id, load=False).replace_contents(rebuilt, authoritative=True)
+            return b""
+
+        raise protocol.ProtocolError(f"Unknown opcode {op}")
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.batcher.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def _interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+
+def serve(
+    socket_path: str,
+    batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+    max_batch: int = DEFAULT_MAX_BATCH,
+) -> None:
+    """
+    Run the index server until interrupted.
+    """
+    server = IndexServer(socket_path, batch_window_ms, max_batch)
+    # Shut down cleanly (and remove the socket) on SIGTERM too
+    signal.signal(signal.SIGTERM, _interrupt)
+    if get_settings().debug:
+        print(f"[DEBUG] Index server listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,227 @@
+"""
+Binary wire protocol for the local index server.
+
+Every frame is a 5-byte header followed by a payload:
+
+    header  = length (uint32, payload bytes) + code (uint8)
+
+Requests use code = opcode, responses use code = status. All integers are
+network byte order; vectors are packed float32 (little-endian, as numpy
+stores them) so they can be copied straight into FAISS.
+
+    SEARCH   conversation_id q, k i, n i, dim i, decay_rate d,
+             filter (memory_type B, min_importance d, occurred_after d, occurred_before d),
+             float32[n * dim]
+             -> per query: count i, int64[count] ids, float32[count] scores
+    ADD      conversation_id q, memory_id q, dim i, timestamp d, importance d,
+             float32[dim]                                                 -> empty
+    REMOVE   conversation_id q, memory_id q                               -> empty
+    COUNT    conversation_id q                                            -> count q
+    SAVE     conversation_id q                                            -> empty
+    REPLACE  conversation_id q, n i, dim i, int64[n] ids, float64[n] timestamps,
+             float64[n] importances, float32[n * dim]                     -> empty
+
+Optional floats are sent as NaN when absent; memory_type is 0 (any),
+1 (semantic) or 2 (bubble). Without a filter, all filter fields are unset.
+"""
+
+import math
+import socket
+import struct
+from typing import List, Optional, Tuple
+import numpy as np
+
+from contextmemory.memory.vector_store import SearchFilter
+
+HEADER = struct.Struct("!IB")
+
+OP_SEARCH = 1
+OP_ADD = 2
+OP_REMOVE = 3
+OP_COUNT = 4
+OP_SAVE = 5
+OP_REPLACE = 6
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_SEARCH = struct.Struct("!qiiidBddd")
+_ADD = struct.Struct("!qqidd")
+_IDS = struct.Struct("!qq")
+_CONV = struct.Struct("!q")
+_REPLACE = struct.Struct("!qii")
+_COUNT = struct.Struct("!i")
+
+# SearchFilter.memory_type by wire code
+_MEMORY_TYPES = (None, "semantic", "bubble")
+
+
+class ProtocolError(RuntimeError):
+    """Raised for malformed frames or errors reported by the server."""
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("Index server connection closed")
+        received += n
+    return bytes(buf)
+
+
+def send_frame(sock: socket.socket, code: int, payload: bytes = b"") -> None:
+    """Send one frame."""
+    sock.sendall(HEADER.pack(len(payload), code) + payload)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[int, bytes]:
+    """Receive one frame as (code, payload)."""
+    length, code = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return code, _recv_exact(sock, length) if length else b""
+
+
+def _vectors(data: bytes, offset: int, n: int, dim: int) -> np.ndarray:
+    return np.frombuffer(data, dtype="<f4", count=n * dim, offset=offset).reshape(n, dim)
+
+
+# Requests
+
+def _optional(value: Optional[float]) -> float:
+    # Optional floats travel as NaN when absent
+    return math.nan if value is None else value
+
+
+def _from_optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def pack_search(
+    conversation_id: int,
+    k: int,
+    vectors: np.ndarray,
+    decay_rate: Optional[float] = None,
+    search_filter: Optional[SearchFilter] = None,
+) -> bytes:
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    n, dim = vectors.shape
+    f = search_filter or SearchFilter()
+    header = _SEARCH.pack(
+        conversation_id, k, n, dim, _optional(decay_rate),
+        _MEMORY_TYPES.index(f.memory_type),
+        _optional(f.min_importance), _optional(f.occurred_after), _optional(f.occurred_before),
+    )
+    return header + vectors.tobytes()
+
+
+def unpack_search(data: bytes) -> Tuple[int, int, np.ndarray, Optional[float], Optional[SearchFilter]]:
+    conversation_id, k, n, dim, decay_rate, memory_type, min_importance, after, before = _SEARCH.unpack_from(data)
+    search_filter = SearchFilter(
+        memory_type=_MEMORY_TYPES[memory_type],
+        min_importance=_from_optional(min_importance),
+        occurred_after=_from_optional(after),
+        occurred_before=_from_optional(before),
+    )
+    if search_filter == SearchFilter():
+        search_filter = None
+    return conversation_id, k, _vectors(data, _SEARCH.size, n, dim), _from_optional(decay_rate), search_filter
+
+
+def pack_add(
+    conversation_id: int,
+    memory_id: int,
+    vector: np.ndarray,
+    timestamp: Optional[float] = None,
+    importance: Optional[float] = None,
+) -> bytes:
+    vector = np.ascontiguousarray(vector, dtype="<f4").ravel()
+    header = _ADD.pack(conversation_id, memory_id, len(vector), _optional(timestamp), _optional(importance))
+    return header + vector.tobytes()
+
+
+def unpack_add(data: bytes) -> Tuple[int, int, np.ndarray, Optional[float], Optional[float]]:
+    conversation_id, memory_id, dim, timestamp, importance = _ADD.unpack_from(data)
+    vector = _vectors(data, _ADD.size, 1, dim)[0]
+    return conversation_id, memory_id, vector, _from_optional(timestamp), _from_optional(importance)
+
+
+def pack_remove(conversation_id: int, memory_id: int) -> bytes:
+    return _IDS.pack(conversation_id, memory_id)
+
+
+def unpack_remove(data: bytes) -> Tuple[int, int]:
+    return _IDS.unpack(data)
+
+
+def pack_conversation(conversation_id: int) -> bytes:
+    return _CONV.pack(conversation_id)
+
+
+def unpack_conversation(data: bytes) -> int:
+    return _CONV.unpack(data)[0]
+
+
+def pack_replace(
+    conversation_id: int,
+    memory_ids: List[int],
+    vectors: np.ndarray,
+    timestamps: List[float],
+    importances: List[float],
+) -> bytes:
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    n = len(memory_ids)
+    dim = vectors.shape[1] if n else 0
+    ids = np.asarray(memory_ids, dtype=">i8")
+    times = np.asarray(timestamps, dtype=">f8")
+    imps = np.asarray(importances, dtype=">f8")
+    return (
+        _REPLACE.pack(conversation_id, n, dim)
+        + ids.tobytes() + times.tobytes() + imps.tobytes() + vectors.tobytes()
+    )
+
+
+def unpack_replace(data: bytes) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    conversation_id, n, dim = _REPLACE.unpack_from(data)
+    offset = _REPLACE.size
+    ids = np.frombuffer(data, dtype=">i8", count=n, offset=offset)
+    times = np.frombuffer(data, dtype=">f8", count=n, offset=offset + 8 * n)
+    imps = np.frombuffer(data, dtype=">f8", count=n, offset=offset + 16 * n)
+    return conversation_id, ids, _vectors(data, offset + 24 * n, n, dim), times, imps
+
+
+# Responses
+
+def pack_search_results(batch: List[List[dict]]) -> bytes:
+    parts = []
+    for results in batch:
+        ids = np.array([r["memory_id"] for r in results], dtype=">i8")
+        scores = np.array([r["score"] for r in results], dtype="<f4")
+        parts.append(_COUNT.pack(len(results)) + ids.tobytes() + scores.tobytes())
+    return b"".join(parts)
+
+
+def unpack_search_results(data: bytes, n_queries: int) -> List[List[dict]]:
+    batch = []
+    offset = 0
+    for _ in range(n_queries):
+        (count,) = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        ids = np.frombuffer(data, dtype=">i8", count=count, offset=offset)
+        offset += 8 * count
+        scores = np.frombuffer(data, dtype="<f4", count=count, offset=offset)
+        offset += 4 * count
+        batch.append([
+            {"memory_id": int(mid), "score": float(score)}
+            for mid, score in zip(ids, scores)
+        ])
+    return batch
+
+
+def pack_count(count: int) -> bytes:
+    return _CONV.pack(count)
+
+
+def unpack_count(data: bytes) -> int:
+    return _CONV.unpack(data)[0]
@@ -1,12 +1,16 @@
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import Session
 
 from contextmemory.db.models.conversation_summary import ConversationSummary
 from contextmemory.db.models.message import Message
 
-from contextmemory.core.openai_client import get_llm_client
+from contextmemory.core.metrics import span, timed
+from contextmemory.core.openai_client import get_stage_client
+from contextmemory.core.prompt_builder import PromptBuilder
+from contextmemory.core.rate_limiter import limited_chat_completion
 from contextmemory.core.settings import get_settings
+from contextmemory.memory.context_cache import get_context_cache
 from contextmemory.utils.summary_generator_prompt import SUMMARY_GENERATOR_PROMPT
 
 # Config
@@ -14,12 +18,17 @@ MAX_MESSAGES_FROM_SUMMARY = 200
 SUMMARY_TRIGGER_COUNT = 20
 
 
-def generate_summary_prompt(messages: List[str]) -> List[dict]:
+def generate_summary_prompt(messages: List[str], model: Optional[str] = None) -> List[dict]:
     """
     Builds the prompt sent to the LLM 
-    """
     
-    conversation_text = "\n".join(messages)
+    Long messages are shortened and, past the "conversation" token budget,
+    later messages are left out (see core.prompt_builder).
+    """
+    builder = PromptBuilder("summary", model)
+    builder.text("system", SUMMARY_GENERATOR_PROMPT)
+    conversation_text = "\n".join(builder.items("conversation", messages))
+    builder.record()
 
     return [
         {"role": "system", "content": SUMMARY_GENERATOR_PROMPT},
@@ -38,13 +47,14 @@ Return only the summary text.
 
 
 # Core Function
-def generate_conversation_summary(db: Session, conversation_id: str) -> str:
+def generate_conversation_summary(db: Session, conversation_id: str, force: bool = False) -> str:
     """
     Generates and stores a summary for a conversation.
+    
+    Args:
+        force: Summarize regardless of the message count trigger
+               (bulk imports summarize once at the end)
     """
-    settings = get_settings()
-    llm_client = get_llm_client()
-
     # total count of msgs in the db
     total_count = (
         db.query(Message)
@@ -53,9 +63,18 @@ def generate_conversation_summary(db: Session, conversation_id: str) -> str:
     )
 
     # Trigger condition:
-    if total_count == 0 or total_count % SUMMARY_TRIGGER_COUNT != 0:
+    if total_count == 0 or (not force and total_count % SUMMARY_TRIGGER_COUNT != 0):
         return ""
     
+    return _summarize(db, conversation_id)
+
+
+@timed("summary")
+def _summarize(db: Session, conversation_id: str) -> str:
+    """Summarize the conversation with the LLM and store the summary."""
+    settings = get_settings()
+    llm_client = get_stage_client("summary")
+    stage = settings.get_stage("summary")
     
     # Fetch all past msgs (oldest -> newest)
     messages = (
@@ -76,12 +95,13 @@ def generate_conversation_summary(db: Session, conversation_id: str) -> str:
     ]
 
     # Call llm
-    prompt = generate_summary_prompt(formatted_messages)
+    prompt = generate_summary_prompt(formatted_messages, stage.model)
 
-    response = llm_client.chat.completions.create(
-        model=settings.llm_model,
+    response = limited_chat_completion(
+        llm_client,
+        model=stage.model,
         messages=prompt,
-        temperature=0.2
+        temperature=stage.temperature
     )
 
     summary_text = response.choices[0].message.content.strip()
@@ -104,6 +124,8 @@ def generate_conversation_summary(db: Session, conversation_id: str) -> str:
             )
         )
 
-    db.commit()
+    with span("db_commit"):
+        db.commit()
+    get_context_cache().set_summary(conversation_id, summary_text)
 
     return summary_text
\ No newline at end of file
@@ -130,4 +130,30 @@ RULES:
 - No trailing commas
 - No markdown formatting
 - No explanation outside JSON
-"""
\ No newline at end of file
+"""
+
+# Appended to EXTRACTION_SYSTEM_PROMPT when several turns are extracted in one call
+WINDOW_EXTRACTION_PROMPT = """
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+                            MULTI-TURN MODE
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+This request has a "New Interactions" section with numbered turns instead of
+a single "Latest Interaction". Treat EACH numbered turn as a latest
+interaction, in order:
+- Extract from every turn, following all the rules above
+- Earlier turns are context for later ones, like Recent Messages
+- Attribute each memory to the turn where the USER said it
+- Don't repeat a memory in a later turn unless the user changed it
+
+This OVERRIDES the output format above. Return ONLY valid JSON with one
+entry per turn, in order:
+
+{
+  "turns": [
+    {"turn": 1, "semantic": ["User's name is Samiksha"], "bubbles": []},
+    {"turn": 2, "semantic": [], "bubbles": [{"text": "User is debugging JWT validation issue", "importance": 0.8}]}
+  ]
+}
+"""
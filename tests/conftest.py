@@ -0,0 +1,88 @@
+import hashlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from contextmemory import configure, create_table, get_session_local
+from contextmemory.core import openai_client
+from contextmemory.core.metrics import reset_metrics
+from contextmemory.core.prompt_builder import reset_prompt_stats
+from contextmemory.core.rate_limiter import reset_rate_limiter
+from contextmemory.core.settings import reset_settings
+from contextmemory.db.database import reset_engine
+from contextmemory.memory.connection_graph import reset_connection_graphs
+from contextmemory.memory.context_cache import reset_context_cache
+from contextmemory.memory.extraction_gate import reset_extraction_gate
+from contextmemory.memory.search_cache import reset_search_cache
+from contextmemory.memory.vector_store import reset_vector_stores
+
+
+def fake_embedding(text, dim=1536):
+    """Deterministic unit vector: the sum of one random vector per word."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        seed = int(hashlib.md5(word.encode()).hexdigest(), 16) % 2**32
+        vector += np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    if not vector.any():
+        vector[0] = 1.0
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeOpenAI:
+    """Stands in for the OpenAI client: word-hash embeddings, empty extraction replies."""
+
+    def __init__(self):
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def with_options(self, **options):
+        return self
+
+    def _embed(self, model, input, **kwargs):
+        texts = input if isinstance(input, list) else [input]
+        dim = kwargs.get("dimensions") or 1536
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=fake_embedding(text, dim), index=i) for i, text in enumerate(texts)],
+            usage=SimpleNamespace(prompt_tokens=len(texts), total_tokens=len(texts)),
+        )
+
+    def _chat(self, model, messages, **kwargs):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"semantic": [], "bubbles": []}'))],
+            usage=None,
+        )
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Keep indexes and state files under tmp_path and drop every process-wide cache."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    for name in ("OPENAI_API_KEY", "DATABASE_URL", "PROMPT_BUDGETS", "EMBEDDING_MODEL", "EMBEDDING_DIMENSIONS"):
+        monkeypatch.delenv(name, raising=False)
+    yield
+    reset_settings()
+    reset_engine()
+    openai_client.reset_client()
+    reset_rate_limiter()
+    reset_metrics()
+    reset_prompt_stats()
+    reset_search_cache()
+    reset_context_cache()
+    reset_extraction_gate()
+    reset_connection_graphs()
+    reset_vector_stores()
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A session on a fresh SQLite database, with the OpenAI clients faked."""
+    configure(openai_api_key="sk-test", database_url=f"sqlite:///{tmp_path}/memories.db")
+    reset_engine()
+    client = FakeOpenAI()
+    openai_client._llm_client = client
+    openai_client._embedding_client = client
+    create_table()
+    session = get_session_local()()
+    yield session
+    session.close()
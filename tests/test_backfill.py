@@ -0,0 +1,76 @@
+import json
+import time
+
+import pytest
+
+from contextmemory import get_session_local
+from contextmemory.core import openai_client
+from contextmemory.db.models.message import Message
+from contextmemory.memory.backfill import _chunks, backfill_file
+
+
+def turn(text, **extra):
+    return [{"role": "user", "content": text, **extra}, {"role": "assistant", "content": "ok"}]
+
+
+@pytest.fixture
+def slow_when_asked(db, monkeypatch):
+    """Extraction calls whose prompt mentions "slow" take a while."""
+    chat = openai_client._llm_client.chat.completions
+    create = chat.create
+
+    def slow_create(**kwargs):
+        if "slow" in json.dumps(kwargs["messages"]):
+            time.sleep(0.3)
+        return create(**kwargs)
+
+    monkeypatch.setattr(chat, "create", slow_create)
+
+
+def write_transcript(tmp_path, lines):
+    path = tmp_path / "transcript.jsonl"
+    path.write_text("\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines) + "\n")
+    return str(path)
+
+
+def user_messages(db, conversation_id):
+    rows = db.query(Message).filter(Message.conversation_id == conversation_id).order_by(Message.id)
+    return [row.message_text for row in rows if row.message_text != "ok"]
+
+
+def test_lines_of_a_conversation_apply_in_file_order(db, tmp_path, slow_when_asked):
+    path = write_transcript(tmp_path, [
+        {"key": "a", "messages": turn("a1 slow")},
+        {"key": "b", "messages": turn("b1")},
+        "not json",
+        {"key": "a", "messages": turn("a2")},
+        {"key": "a", "messages": turn("a3", timestamp="yesterday")},
+        {"key": "a", "messages": turn("a4")},
+    ])
+    reports = []
+    stats = backfill_file(path, workers=4, session_factory=get_session_local(), progress=reports.append)
+
+    # A failed line neither stops the import nor blocks later lines of its conversation
+    assert (stats.conversations, stats.turns, stats.failed) == (4, 4, 2)
+    assert [error.split(":")[0] for error in stats.errors] == ["line 3", "line 5"]
+    assert user_messages(db, stats.conversation_ids["a"]) == ["a1 slow", "a2", "a4"]
+    assert user_messages(db, stats.conversation_ids["b"]) == ["b1"]
+    assert reports[-1]["turns"] == 4
+
+
+def test_other_conversations_do_not_wait(db, tmp_path, slow_when_asked):
+    path = write_transcript(tmp_path, [
+        {"key": "a", "messages": turn("a1 slow")},
+        {"key": "b", "messages": turn("b1")},
+    ])
+    stats = backfill_file(path, workers=2, session_factory=get_session_local())
+    first_a = db.query(Message).filter(Message.conversation_id == stats.conversation_ids["a"]).first()
+    first_b = db.query(Message).filter(Message.conversation_id == stats.conversation_ids["b"]).first()
+    assert first_b.id < first_a.id
+
+
+def test_chunks_pair_turns_and_keep_lone_messages():
+    user, reply = turn("hi")
+    lone = {"role": "assistant", "content": "Welcome back"}
+    chunks = _chunks([lone, user, reply, user, reply, user], chunk_size=1)
+    assert chunks == [[(lone, None), (user, reply)], [(user, reply)], [(user, None)]]
@@ -0,0 +1,138 @@
+import pytest
+from sqlalchemy import select
+
+from contextmemory.db.models.conversation import Conversation
+from contextmemory.db.models.memory import Memory
+from contextmemory.db.models.memory_connection import MemoryConnection
+from contextmemory.memory import connection_finder
+from contextmemory.memory.connection_finder import (
+    MAX_CONNECTIONS,
+    MAX_DEGREE,
+    find_connections,
+    get_connections,
+    remove_connections,
+)
+
+
+class StubStore:
+    """Returns fixed search results (memory_id -> score)."""
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def search(self, embedding, k):
+        ranked = sorted(self.scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [{"memory_id": memory_id, "score": score} for memory_id, score in ranked]
+
+
+@pytest.fixture
+def conversation_id(db):
+    conversation = Conversation()
+    db.add(conversation)
+    db.commit()
+    return conversation.id
+
+
+@pytest.fixture
+def make_memory(db, conversation_id):
+    def make(text="bubble"):
+        mem = Memory(conversation_id=conversation_id, memory_text=text, embedding=[1.0, 0.0], is_episodic=True)
+        db.add(mem)
+        db.flush()
+        return mem
+    return make
+
+
+def edges(db):
+    return {
+        (src, dst): score
+        for src, dst, score in db.execute(
+            select(MemoryConnection.src_id, MemoryConnection.dst_id, MemoryConnection.score)
+        )
+    }
+
+
+def stub_search(monkeypatch, scores):
+    monkeypatch.setattr(connection_finder, "get_vector_store", lambda conversation_id: StubStore(scores))
+
+
+def test_links_both_ways_above_threshold(db, conversation_id, make_memory, monkeypatch):
+    bubble, close, far = make_memory(), make_memory(), make_memory()
+    stub_search(monkeypatch, {bubble.id: 1.0, close.id: 0.9, far.id: 0.3})
+
+    assert find_connections(db, bubble, conversation_id) == [close.id]
+    assert edges(db) == {(bubble.id, close.id): 0.9, (close.id, bubble.id): 0.9}
+
+
+def test_forward_edges_are_capped(db, conversation_id, make_memory, monkeypatch):
+    bubble = make_memory()
+    others = [make_memory() for _ in range(MAX_CONNECTIONS + 3)]
+    stub_search(monkeypatch, {mem.id: 0.9 - i * 0.01 for i, mem in enumerate(others)})
+
+    connected = find_connections(db, bubble, conversation_id)
+    assert connected == [mem.id for mem in others[:MAX_CONNECTIONS]]
+    assert sum(1 for src, _ in edges(db) if src == bubble.id) == MAX_CONNECTIONS
+
+
+def test_no_embedding_or_no_match(db, conversation_id, make_memory, monkeypatch):
+    bubble, other = make_memory(), make_memory()
+    stub_search(monkeypatch, {other.id: 0.1})
+    assert find_connections(db, bubble, conversation_id) == []
+
+    bubble.embedding = None
+    assert find_connections(db, bubble, conversation_id) == []
+    assert edges(db) == {}
+
+
+def add_hub_edges(db, conversation_id, hub, neighbours, score):
+    for mem in neighbours:
+        db.add(MemoryConnection(src_id=hub.id, dst_id=mem.id, conversation_id=conversation_id, score=score))
+    db.flush()
+
+
+def test_hub_skips_weaker_reverse_edge(db, conversation_id, make_memory, monkeypatch):
+    hub = make_memory()
+    add_hub_edges(db, conversation_id, hub, [make_memory() for _ in range(MAX_DEGREE)], 0.7)
+    bubble = make_memory()
+    stub_search(monkeypatch, {hub.id: 0.65})
+
+    find_connections(db, bubble, conversation_id)
+    current = edges(db)
+    assert (bubble.id, hub.id) in current
+    assert (hub.id, bubble.id) not in current
+    assert sum(1 for src, _ in current if src == hub.id) == MAX_DEGREE
+
+
+def test_hub_evicts_weakest_edge_for_stronger_one(db, conversation_id, make_memory, monkeypatch):
+    hub = make_memory()
+    neighbours = [make_memory() for _ in range(MAX_DEGREE)]
+    add_hub_edges(db, conversation_id, hub, neighbours[1:], 0.7)
+    add_hub_edges(db, conversation_id, hub, neighbours[:1], 0.62)
+    bubble = make_memory()
+    stub_search(monkeypatch, {hub.id: 0.8})
+
+    find_connections(db, bubble, conversation_id)
+    current = edges(db)
+    assert current[(hub.id, bubble.id)] == 0.8
+    assert (hub.id, neighbours[0].id) not in current
+    assert sum(1 for src, _ in current if src == hub.id) == MAX_DEGREE
+
+
+def test_get_connections_strongest_first(db, conversation_id, make_memory):
+    a, b, c, d = make_memory(), make_memory(), make_memory(), make_memory()
+    for dst, score in ((b, 0.6), (c, 0.9), (d, 0.7)):
+        db.add(MemoryConnection(src_id=a.id, dst_id=dst.id, conversation_id=conversation_id, score=score))
+    db.flush()
+
+    assert get_connections(db, [a.id, b.id]) == {a.id: [c.id, d.id, b.id]}
+    assert get_connections(db, [a.id], limit_per_memory=2) == {a.id: [c.id, d.id]}
+    assert get_connections(db, []) == {}
+
+
+def test_remove_connections_drops_both_directions(db, conversation_id, make_memory, monkeypatch):
+    bubble, other, third = make_memory(), make_memory(), make_memory()
+    stub_search(monkeypatch, {other.id: 0.9, third.id: 0.8})
+    find_connections(db, bubble, conversation_id)
+
+    remove_connections(db, bubble.id, conversation_id)
+    assert edges(db) == {}
@@ -0,0 +1,53 @@
+from contextmemory.core.settings import configure
+from contextmemory.db.models.conversation import Conversation
+from contextmemory.db.models.memory import Memory
+from contextmemory.db.models.memory_connection import MemoryConnection
+from contextmemory.memory import connection_graph
+from contextmemory.memory.connection_graph import get_connection_graph, invalidate_connection_graph
+from contextmemory.memory.search_cache import bump_generation
+
+
+def make_conversation(db):
+    """A conversation with one edge between two memories."""
+    conversation = Conversation()
+    db.add(conversation)
+    db.flush()
+    a, b = (Memory(conversation_id=conversation.id, memory_text=text, is_episodic=True) for text in ("a", "b"))
+    db.add_all([a, b])
+    db.flush()
+    db.add(MemoryConnection(src_id=a.id, dst_id=b.id, conversation_id=conversation.id, score=0.9))
+    db.commit()
+    return conversation.id
+
+
+def test_graph_is_reused_until_a_write(db):
+    conversation_id = make_conversation(db)
+    graph = get_connection_graph(db, conversation_id)
+    assert graph.num_edges == 1
+    assert get_connection_graph(db, conversation_id) is graph
+
+    bump_generation(conversation_id)
+    assert get_connection_graph(db, conversation_id) is not graph
+
+    graph = get_connection_graph(db, conversation_id)
+    invalidate_connection_graph(conversation_id)
+    assert get_connection_graph(db, conversation_id) is not graph
+
+
+def test_least_recently_used_graph_is_evicted(db, tmp_path):
+    configure(openai_api_key="sk-test", database_url=f"sqlite:///{tmp_path}/memories.db", connection_graph_cache_size=2)
+    first, second, third = (make_conversation(db) for _ in range(3))
+    graph = get_connection_graph(db, first)
+    get_connection_graph(db, second)
+    assert get_connection_graph(db, first) is graph
+
+    get_connection_graph(db, third)
+    assert list(connection_graph._graphs) == [first, third]
+    assert get_connection_graph(db, first) is graph
+
+
+def test_disabled_cache_builds_every_time(db, tmp_path):
+    configure(openai_api_key="sk-test", database_url=f"sqlite:///{tmp_path}/memories.db", connection_graph_cache_size=0)
+    conversation_id = make_conversation(db)
+    assert get_connection_graph(db, conversation_id) is not get_connection_graph(db, conversation_id)
+    assert not connection_graph._graphs
@@ -0,0 +1,98 @@
+import pytest
+
+from contextmemory.db.models.conversation import Conversation
+from contextmemory.db.models.conversation_summary import ConversationSummary
+from contextmemory.db.models.message import Message, SenderEnum
+from contextmemory.memory.context_cache import RECENT_MESSAGES, ContextCache, format_message
+
+
+@pytest.fixture
+def conversation_id(db):
+    conversation = Conversation()
+    db.add(conversation)
+    db.commit()
+    return conversation.id
+
+
+def write_messages(db, cache, conversation_id, *texts):
+    """Commit messages and record them in cache, like extraction_phase."""
+    db.add_all(Message(conversation_id=conversation_id, sender=SenderEnum.USER, message_text=text) for text in texts)
+    db.commit()
+    cache.append_messages(conversation_id, [format_message(SenderEnum.USER, text) for text in texts])
+
+
+def test_write_through_keeps_entry(db, conversation_id):
+    cache = ContextCache()
+    write_messages(db, cache, conversation_id, "first")
+    assert cache.get(db, conversation_id) == ("", ["USER: first"])
+
+    write_messages(db, cache, conversation_id, "second")
+    cache.set_summary(conversation_id, "User said two things")
+    assert cache.get(db, conversation_id) == ("User said two things", ["USER: first", "USER: second"])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_keeps_last_messages(db, conversation_id):
+    cache = ContextCache()
+    cache.get(db, conversation_id)
+    for i in range(RECENT_MESSAGES + 3):
+        write_messages(db, cache, conversation_id, f"m{i}")
+    _, recent = cache.get(db, conversation_id)
+    assert recent == [f"USER: m{i}" for i in range(3, RECENT_MESSAGES + 3)]
+    assert cache.misses == 1
+
+
+def test_other_workers_writes_invalidate(db, conversation_id):
+    # Two caches stand in for two worker processes sharing the index directory
+    worker, other = ContextCache(), ContextCache()
+    write_messages(db, worker, conversation_id, "first")
+    assert worker.get(db, conversation_id) == ("", ["USER: first"])
+    other.get(db, conversation_id)
+
+    write_messages(db, other, conversation_id, "from the other worker")
+    assert worker.get(db, conversation_id) == ("", ["USER: first", "USER: from the other worker"])
+    assert worker.stale == 1
+
+    db.add(ConversationSummary(conversation_id=conversation_id, summary_text="new summary"))
+    db.commit()
+    other.set_summary(conversation_id, "new summary")
+    assert worker.get(db, conversation_id)[0] == "new summary"
+    assert worker.stale == 2
+
+
+def test_write_through_after_missed_write_reloads(db, conversation_id):
+    worker, other = ContextCache(), ContextCache()
+    worker.get(db, conversation_id)
+    write_messages(db, other, conversation_id, "missed")
+    # This worker's next write can't be applied on top of an entry that missed one
+    write_messages(db, worker, conversation_id, "own")
+    assert worker.get(db, conversation_id) == ("", ["USER: missed", "USER: own"])
+
+
+def test_invalidate_reaches_other_workers(db, conversation_id):
+    worker, other = ContextCache(), ContextCache()
+    worker.get(db, conversation_id)
+    other.invalidate(conversation_id)
+    worker.get(db, conversation_id)
+    assert worker.stale == 1
+
+
+def test_disabled_reads_every_time(db, conversation_id):
+    cache = ContextCache(max_conversations=0)
+    write_messages(db, cache, conversation_id, "first")
+    assert cache.get(db, conversation_id) == ("", ["USER: first"])
+    assert cache.stats()["size"] == 0
+
+
+def test_evicts_least_recently_used(db):
+    cache = ContextCache(max_conversations=2)
+    ids = []
+    for _ in range(3):
+        conversation = Conversation()
+        db.add(conversation)
+        db.commit()
+        ids.append(conversation.id)
+        cache.get(db, conversation.id)
+    assert cache.evictions == 1
+    cache.get(db, ids[0])
+    assert cache.misses == 4
@@ -0,0 +1,60 @@
+import pytest
+
+from contextmemory.core import prompt_builder
+from contextmemory.core.prompt_builder import count_tokens
+from contextmemory.memory.context_packer import dedupe, format_memory, pack
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Same token counts with or without tiktoken installed
+    monkeypatch.setattr(prompt_builder, "_encoding", lambda model: None)
+
+
+def result(memory_id, text, score=1.0, type="semantic", occurred_at=None):
+    return {"memory_id": memory_id, "memory": text, "score": score, "type": type, "occurred_at": occurred_at}
+
+
+def test_format_memory():
+    assert format_memory(result(1, "User likes tea")) == "- [semantic] User likes tea"
+    bubble = result(2, "User moved to Oslo", type="bubble", occurred_at="2025-03-01T10:00:00")
+    assert format_memory(bubble) == "- [bubble, 2025-03-01] User moved to Oslo"
+
+
+def test_dedupe_same_text_keeps_first():
+    results = [result(1, "User likes tea", 0.9), result(2, "  user LIKES   tea ", 0.8), result(3, "User likes coffee", 0.7)]
+    assert [r["memory_id"] for r in dedupe(results, {})] == [1, 3]
+
+
+def test_dedupe_by_embedding():
+    results = [result(1, "User likes tea"), result(2, "The user enjoys tea"), result(3, "User lives in Oslo")]
+    embeddings = {1: [1.0, 0.0, 0.0], 2: [0.99, 0.05, 0.0], 3: [0.0, 1.0, 0.0]}
+    assert [r["memory_id"] for r in dedupe(results, embeddings)] == [1, 3]
+    assert [r["memory_id"] for r in dedupe(results, embeddings, threshold=0.999)] == [1, 2, 3]
+
+
+def test_dedupe_ignores_missing_and_mismatched_embeddings():
+    results = [result(1, "a"), result(2, "b"), result(3, "c"), result(4, "d")]
+    embeddings = {1: [1.0, 0.0], 2: None, 3: [1.0, 0.0, 0.0], 4: [0.0, 0.0]}
+    assert [r["memory_id"] for r in dedupe(results, embeddings)] == [1, 2, 3, 4]
+
+
+def test_pack_fits_budget_and_orders_by_score():
+    results = [result(1, "short", 0.5), result(2, "also short", 0.9), result(3, "x " * 200, 1.0)]
+    budget = sum(count_tokens(format_memory(r) + "\n") for r in results[:2])
+    chosen = pack(results, budget)
+    assert [r["memory_id"] for r in chosen] == [2, 1]
+
+
+def test_pack_prefers_score_per_token():
+    long = result(1, "word " * 40, 1.0)
+    shorts = [result(i, f"fact {i}", 0.6) for i in range(2, 6)]
+    budget = count_tokens(format_memory(long) + "\n")
+    chosen = pack([long] + shorts, budget)
+    assert 1 not in [r["memory_id"] for r in chosen]
+    assert len(chosen) == 4
+
+
+def test_pack_empty_and_zero_budget():
+    assert pack([], 100) == []
+    assert pack([result(1, "User likes tea")], 0) == []
@@ -0,0 +1,109 @@
+import pytest
+
+from contextmemory import ContextMemory
+from contextmemory.core import openai_client
+from contextmemory.core.settings import get_settings
+from contextmemory.db.models.conversation import Conversation
+from contextmemory.db.models.message import Message
+from contextmemory.memory.extraction_gate import (
+    ClassifierGate,
+    HashedNgramClassifier,
+    HeuristicGate,
+    get_gate_stats,
+    get_shadow_samples,
+    observe_extraction,
+    set_extraction_gate,
+    should_extract,
+)
+
+
+@pytest.fixture
+def gate_mode(monkeypatch):
+    def set_mode(mode):
+        monkeypatch.setattr(get_settings(), "extraction_gate", mode)
+    return set_mode
+
+
+@pytest.mark.parametrize("text, extract, reason", [
+    ("ok thanks!", False, "trivial"),
+    ("Haha lol, got it", False, "trivial"),
+    ("👍", False, "no_words"),
+    ("", False, "no_words"),
+    ("yes", True, "heuristic"),
+    ("thanks, I moved to Oslo", True, "heuristic"),
+    ("ok ok ok ok ok ok ok", True, "heuristic"),
+])
+def test_heuristics(text, extract, reason):
+    decision = HeuristicGate().decide(text)
+    assert (decision.extract, decision.reason) == (extract, reason)
+
+
+def test_off_always_extracts(gate_mode):
+    gate_mode("off")
+    assert should_extract("ok thanks").extract
+    assert get_gate_stats()["evaluated"] == 0
+
+
+def test_on_skips_and_counts(gate_mode):
+    gate_mode("on")
+    assert not should_extract("ok thanks").extract
+    assert should_extract("I'm allergic to peanuts").extract
+
+    stats = get_gate_stats()
+    assert (stats["evaluated"], stats["skipped"], stats["skip_rate"]) == (2, 1, 0.5)
+    assert stats["reasons"] == {"trivial": 1, "heuristic": 1}
+
+
+def test_shadow_extracts_and_measures_false_skips(gate_mode):
+    gate_mode("shadow")
+    # A custom gate that wrongly skips everything
+    set_extraction_gate(HeuristicGate(max_trivial_words=100, trivial_words=["i", "am", "vegan"]))
+
+    for text, result in (("i am vegan", {"semantic": ["User is vegan"]}), ("vegan", {"semantic": []})):
+        decision = should_extract(text)
+        assert decision.extract and decision.shadow_skip
+        observe_extraction(text, decision, result)
+
+    stats = get_gate_stats()
+    assert stats["skipped"] == 0
+    assert (stats["shadow_would_skip"], stats["shadow_false_skips"], stats["shadow_false_skip_rate"]) == (2, 1, 0.5)
+    assert get_shadow_samples() == [("i am vegan", True), ("vegan", False)]
+
+
+def test_classifier_gate(tmp_path):
+    texts = [
+        "I live in Oslo", "My sister is a doctor", "I am allergic to nuts",
+        "what time is it", "tell me a joke", "how are you",
+    ]
+    labels = [True, True, True, False, False, False]
+    classifier = HashedNgramClassifier(n_features=2 ** 12).train(texts, labels, epochs=30)
+    assert classifier.score("I live in Bergen") > 0.5 > classifier.score("tell me a story")
+
+    path = str(tmp_path / "gate.npz")
+    classifier.save(path)
+    gate = ClassifierGate(HashedNgramClassifier.load(path), threshold=0.5)
+    assert gate.decide("I live in Bergen").extract
+    assert gate.decide("tell me a story")[:2] == (False, "classifier")
+    # Heuristics still decide first
+    assert gate.decide("ok thanks").reason == "trivial"
+
+    with pytest.raises(ValueError):
+        classifier.train(texts, labels[:-1])
+
+
+def test_skipped_turn_is_stored_without_extraction_call(db, gate_mode, monkeypatch):
+    gate_mode("on")
+    calls = []
+    chat = openai_client._llm_client.chat.completions
+    create = chat.create
+    monkeypatch.setattr(chat, "create", lambda **kwargs: calls.append(kwargs) or create(**kwargs))
+    conversation = Conversation()
+    db.add(conversation)
+    db.commit()
+
+    memory = ContextMemory(db)
+    memory.add([{"role": "user", "content": "ok thanks"}, {"role": "assistant", "content": "Anytime!"}], conversation.id)
+    assert calls == []
+    memory.add([{"role": "user", "content": "I moved to Oslo"}, {"role": "assistant", "content": "Nice!"}], conversation.id)
+    assert len(calls) == 1
+    assert db.query(Message).filter(Message.conversation_id == conversation.id).count() == 4
@@ -0,0 +1,89 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from contextmemory.core.metrics import LLM_TOKENS, STAGE_ERRORS, STAGE_SECONDS, get_metrics, span
+from contextmemory.core.settings import configure, get_settings
+from contextmemory.memory import extractor
+from contextmemory.memory.extractor import stream_memories
+
+REPLY = json.dumps({"semantic": ["User likes tea", "User lives in Oslo"], "bubbles": []})
+
+
+class StreamingClient:
+    def __init__(self, chunk_delay=0.0, fail_after=None):
+        self.chunk_delay = chunk_delay
+        self.fail_after = fail_after
+        self.kwargs = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def with_options(self, **options):
+        return self
+
+    def _create(self, **kwargs):
+        self.kwargs = kwargs
+
+        def chunks():
+            for i in range(0, len(REPLY), 8):
+                if self.fail_after is not None and i >= self.fail_after:
+                    raise ConnectionError("stream dropped")
+                time.sleep(self.chunk_delay)
+                delta = SimpleNamespace(content=REPLY[i:i + 8])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+            usage = SimpleNamespace(prompt_tokens=300, completion_tokens=40, total_tokens=340)
+            yield SimpleNamespace(choices=[], usage=usage)
+        return chunks()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    configure(openai_api_key="sk-test", metrics_enabled=True)
+    client = StreamingClient(chunk_delay=0.01)
+    monkeypatch.setattr(extractor, "get_stage_client", lambda stage: client)
+    return client
+
+
+def llm_seconds():
+    samples = get_metrics().histogram(STAGE_SECONDS).samples()
+    return {labels: sample for labels, sample in samples.items() if dict(labels)["stage"] == "llm"}
+
+
+def test_yields_memories_and_requests_usage(client):
+    assert list(stream_memories(["USER: hi"], "", [])) == [
+        ("semantic", "User likes tea"),
+        ("semantic", "User lives in Oslo"),
+    ]
+    assert client.kwargs["stream"] is True
+    assert client.kwargs["stream_options"] == {"include_usage": True}
+
+    tokens = {dict(labels)["type"]: value for labels, value in get_metrics().counter(LLM_TOKENS).samples().items()}
+    assert tokens == {"prompt": 300, "completion": 40}
+
+
+def test_caller_work_is_not_timed_as_llm(client):
+    for _ in stream_memories(["USER: hi"], "", []):
+        time.sleep(0.2)
+
+    (sample,) = llm_seconds().values()
+    assert sample["count"] == 1
+    assert sample["sum"] < 0.2
+
+
+def test_same_series_as_span(client):
+    with span("llm", kind="chat", model=get_settings().get_stage("extraction").model):
+        pass
+    list(stream_memories(["USER: hi"], "", []))
+
+    (sample,) = llm_seconds().values()
+    assert sample["count"] == 2
+
+
+def test_stream_errors_are_counted(client):
+    client.fail_after = 16
+    with pytest.raises(ConnectionError):
+        list(stream_memories(["USER: hi"], "", []))
+
+    errors = get_metrics().counter(STAGE_ERRORS).samples()
+    assert [dict(labels)["error"] for labels in errors] == ["ConnectionError"]
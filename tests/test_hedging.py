@@ -0,0 +1,85 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from contextmemory.core.deadline import DeadlineExceeded, deadline
+from contextmemory.core.hedging import MIN_SAMPLES, Hedger
+
+
+def requests(*delays, error=None):
+    """fn whose n-th call sleeps delays[n] and returns n (or raises error on call 0)."""
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            n = next(counter)
+        time.sleep(delays[n])
+        if error is not None and n == 0:
+            raise error
+        return n
+    return fn
+
+
+def test_no_hedging_until_latencies_are_known():
+    hedger = Hedger()
+    assert hedger.delay() is None
+    for _ in range(MIN_SAMPLES):
+        assert hedger.call(lambda: "ok") == "ok"
+    assert hedger.delay() is not None
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_slow_request_is_hedged_and_fastest_answer_wins():
+    hedger = Hedger(delay_ms=20)
+    start = time.monotonic()
+    assert hedger.call(requests(1.0, 0.0)) == 1
+    assert time.monotonic() - start < 0.5
+
+    stats = hedger.stats()
+    assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+
+
+def test_fast_request_is_not_hedged():
+    hedger = Hedger(delay_ms=200)
+    assert hedger.call(requests(0.0, 0.0)) == 0
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_primary_still_wins_when_it_answers_first():
+    hedger = Hedger(delay_ms=20)
+    assert hedger.call(requests(0.05, 1.0)) == 0
+    assert (hedger.hedged, hedger.hedge_wins) == (1, 0)
+
+
+def test_no_duplicate_without_budget():
+    hedger = Hedger(delay_ms=20)
+    assert hedger.call(requests(0.1, 0.0), may_hedge=lambda: False) == 0
+    assert (hedger.hedged, hedger.hedges_skipped) == (0, 1)
+
+
+def test_failed_request_falls_back_to_the_other():
+    hedger = Hedger(delay_ms=20)
+    assert hedger.call(requests(0.05, 0.1, error=ConnectionError("reset"))) == 1
+
+    def always_fails():
+        time.sleep(0.05)
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        hedger.call(always_fails)
+
+
+def test_deadline_bounds_the_wait():
+    hedger = Hedger(delay_ms=20)
+    start = time.monotonic()
+    with deadline(0.1), pytest.raises(DeadlineExceeded):
+        hedger.call(requests(1.0, 1.0))
+    assert time.monotonic() - start < 0.5
+
+    # No time left for a duplicate: the primary is only waited on
+    with deadline(0.01), pytest.raises(DeadlineExceeded):
+        hedger.call(requests(1.0, 1.0))
+    assert hedger.hedges_skipped == 1
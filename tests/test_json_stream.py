@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from contextmemory.memory.json_stream import JsonArrayStream
+
+REPLY = json.dumps({
+    "semantic": ["User likes tea", "User lives in Oslo"],
+    "bubbles": [{"text": "User moved to Oslo", "importance": 0.8}, {"text": "User started a job", "importance": 0.5}],
+})
+EXPECTED = [
+    ("semantic", "User likes tea"),
+    ("semantic", "User lives in Oslo"),
+    ("bubbles", {"text": "User moved to Oslo", "importance": 0.8}),
+    ("bubbles", {"text": "User started a job", "importance": 0.5}),
+]
+
+
+def feed_in_chunks(text, size, keys=("semantic", "bubbles")):
+    stream = JsonArrayStream(keys)
+    elements = []
+    for start in range(0, len(text), size):
+        elements.extend(stream.feed(text[start:start + size]))
+    return stream, elements
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(REPLY)])
+def test_chunking_does_not_change_elements(size):
+    stream, elements = feed_in_chunks(REPLY, size)
+    assert elements == EXPECTED
+    assert stream.done
+
+
+def test_elements_are_returned_as_soon_as_complete():
+    stream = JsonArrayStream(["semantic"])
+    assert stream.feed('{"semantic": ["User likes tea", "Us') == [("semantic", "User likes tea")]
+    assert stream.feed('er lives in Oslo') == []
+    assert stream.feed('"') == [("semantic", "User lives in Oslo")]
+    assert not stream.done
+    assert stream.feed("]}") == []
+    assert stream.done
+
+
+def test_objects_end_at_their_brace_and_scalars_at_the_separator():
+    stream = JsonArrayStream(["bubbles"])
+    assert stream.feed('{"bubbles": [{"text": "a", "importance": 0.5') == []
+    assert stream.feed("}") == [("bubbles", {"text": "a", "importance": 0.5})]
+    assert stream.feed(", 12") == []
+    assert stream.feed("]") == [("bubbles", 12)]
+
+
+@pytest.mark.parametrize("size", [1, 5])
+def test_escapes_inside_strings(size):
+    facts = ['User said "hi"', "Path is C:\\temp\\", "Brackets ] and } and , in text", "Unicode caf\u00e9 \u2713"]
+    stream, elements = feed_in_chunks(json.dumps({"semantic": facts}), size)
+    assert elements == [("semantic", fact) for fact in facts]
+    assert stream.done
+
+
+def test_escaped_key_is_decoded():
+    stream, elements = feed_in_chunks('{"sem\\u0061ntic": ["User likes tea"]}', 1)
+    assert elements == [("semantic", "User likes tea")]
+
+
+def test_only_selected_top_level_arrays_are_returned():
+    text = json.dumps({
+        "other": ["skip me"],
+        "nested": {"semantic": ["not top level"]},
+        "semantic": ["keep me"],
+    })
+    _, elements = feed_in_chunks(text, 4, keys=["semantic"])
+    assert elements == [("semantic", "keep me")]
+
+
+def test_scalar_elements():
+    _, elements = feed_in_chunks('{"semantic": [1, 2.5, true, null, "x"]}', 1, keys=["semantic"])
+    assert elements == [("semantic", 1), ("semantic", 2.5), ("semantic", True), ("semantic", None), ("semantic", "x")]
+
+
+def test_text_around_the_object_is_ignored():
+    stream, elements = feed_in_chunks('```json\n{"semantic": ["User likes tea"]}\n```\nDone.', 3)
+    assert elements == [("semantic", "User likes tea")]
+    assert stream.done
+    assert stream.feed('{"semantic": ["after the end"]}') == []
+
+
+def test_malformed_element_is_skipped():
+    _, elements = feed_in_chunks('{"semantic": ["ok", tru, "also ok"]}', 1, keys=["semantic"])
+    assert elements == [("semantic", "ok"), ("semantic", "also ok")]
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+import pytest
+
+from contextmemory.core.deadline import DeadlineExceeded, deadline
+from contextmemory.core.locks import conversation_lock, file_lock, hold_conversation_lock
+from contextmemory.db.models.conversation import Conversation
+from contextmemory.db.models.message import Message
+from contextmemory.memory import embedding_space
+from contextmemory.memory.embedding_space import migration_guard
+from contextmemory.memory.memory import ContextMemory
+
+
+@pytest.fixture
+def held_by_other_thread():
+    """Hold a conversation's write lock from another thread until the test ends."""
+    acquired, release = threading.Event(), threading.Event()
+
+    def hold(conversation_id):
+        def run():
+            with conversation_lock(conversation_id):
+                acquired.set()
+                release.wait()
+        threading.Thread(target=run, daemon=True).start()
+        acquired.wait()
+
+    yield hold
+    release.set()
+
+
+def test_conversation_lock_wait_is_bounded_by_deadline(held_by_other_thread):
+    held_by_other_thread(1)
+    start = time.monotonic()
+    with deadline(0.1), pytest.raises(DeadlineExceeded):
+        with hold_conversation_lock(1):
+            pass
+    assert time.monotonic() - start < 1
+
+    # Other conversations and reentrant holds don't wait
+    with deadline(0.1), hold_conversation_lock(2), hold_conversation_lock(2):
+        pass
+
+
+def test_file_lock_timeout(tmp_path):
+    path = str(tmp_path / "a.lock")
+    with file_lock(path, exclusive=False):
+        with file_lock(path, exclusive=False, timeout=0.05):
+            pass
+        with pytest.raises(TimeoutError):
+            with file_lock(path, timeout=0.05):
+                pass
+    with file_lock(path, timeout=0.05):
+        pass
+
+
+def test_migration_guard_wait_is_bounded_by_deadline(monkeypatch):
+    monkeypatch.setattr(embedding_space, "_cutover_pending", lambda conversation_id: True)
+    lock_dir = os.path.expanduser("~/.contextmemory/indexes")
+    os.makedirs(lock_dir)
+    # A cutover in progress (flock conflicts between separate opens, even in one process)
+    with file_lock(os.path.join(lock_dir, "conv_1.cutover.lock")):
+        with deadline(0.1), pytest.raises(DeadlineExceeded):
+            with migration_guard(1):
+                pass
+    with deadline(0.1), migration_guard(1):
+        pass
+
+
+def test_add_gives_up_waiting_for_another_write(db, held_by_other_thread):
+    conversation = Conversation()
+    db.add(conversation)
+    db.commit()
+    held_by_other_thread(conversation.id)
+
+    with pytest.raises(DeadlineExceeded):
+        ContextMemory(db).add([{"role": "user", "content": "I like tea"}], conversation.id, timeout=0.1)
+    assert db.query(Message).filter(Message.conversation_id == conversation.id).count() == 0
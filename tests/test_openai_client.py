@@ -0,0 +1,36 @@
+import pytest
+
+from contextmemory.core.openai_client import get_embedding_client, get_llm_client, get_stage_client
+from contextmemory.core.settings import DEFAULT_STAGE_TIMEOUTS, configure, get_settings, reset_settings
+
+
+def test_clients_have_finite_default_timeouts():
+    configure(openai_api_key="sk-test")
+    assert get_embedding_client().timeout == 30
+    for stage, timeout in DEFAULT_STAGE_TIMEOUTS.items():
+        assert get_stage_client(stage).timeout == timeout
+    assert get_llm_client().timeout == max(DEFAULT_STAGE_TIMEOUTS.values())
+
+
+def test_configured_timeouts():
+    configure(openai_api_key="sk-test", classification_timeout=5, embedding_timeout=2.5)
+    assert get_stage_client("classification").timeout == 5
+    assert get_stage_client("extraction").timeout == DEFAULT_STAGE_TIMEOUTS["extraction"]
+    assert get_embedding_client().timeout == 2.5
+    # Stage clients share the base client's connection pool
+    assert get_stage_client("classification")._client is get_llm_client()._client
+
+
+def test_timeouts_from_environment(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_TIMEOUT", "4")
+    monkeypatch.setenv("SUMMARY_TIMEOUT", "90")
+    reset_settings()
+    settings = get_settings()
+    assert settings.embedding_timeout == 4
+    assert settings.get_stage("summary").timeout == 90
+
+
+@pytest.mark.parametrize("name", ["embedding_timeout", "summary_timeout"])
+def test_rejects_non_positive_timeouts(name):
+    with pytest.raises(ValueError, match=name):
+        configure(openai_api_key="sk-test", **{name: 0})
@@ -0,0 +1,92 @@
+import pytest
+
+from contextmemory.core import prompt_builder
+from contextmemory.core.prompt_builder import PromptBuilder, count_tokens, truncate
+from contextmemory.core.settings import configure
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Same token counts with or without tiktoken installed
+    monkeypatch.setattr(prompt_builder, "_encoding", lambda model: None)
+
+
+def words(n, prefix="w"):
+    return " ".join(f"{prefix}{i:03d}" for i in range(n))
+
+
+def test_count_tokens_estimate():
+    assert count_tokens("") == 0
+    assert count_tokens("abcd") == 1
+    assert count_tokens("abcde") == 2
+
+
+def test_truncate_short_text_is_unchanged():
+    assert truncate("User likes tea", 100) == "User likes tea"
+
+
+def test_truncate_keeps_start_and_end():
+    text = words(200)
+    cut = truncate(text, 50)
+    assert cut.startswith("w000 ")
+    assert cut.endswith(" w199")
+    assert "tokens omitted ...]" in cut
+    assert count_tokens(cut) <= 60
+    # Cut at word boundaries
+    head, tail = cut.split(" [... ")[0], cut.split(" ...] ")[1]
+    assert set(head.split()) | set(tail.split()) <= set(text.split())
+
+
+def test_truncate_reports_omitted_tokens():
+    text = words(200)
+    cut = truncate(text, 50)
+    head, rest = cut.split(" [... ", 1)
+    omitted, tail = rest.split(" tokens omitted ...] ", 1)
+    assert int(omitted) == count_tokens(text) - count_tokens(head) - count_tokens(tail)
+
+
+def test_text_section_is_cut_to_budget():
+    builder = PromptBuilder("extraction")
+    text = builder.text("summary", words(100), budget=20)
+    assert count_tokens(text) <= 20
+    assert builder.tokens["summary"] == count_tokens(text)
+    assert builder.truncated_tokens == count_tokens(words(100)) - count_tokens(text)
+
+
+def test_items_keep_first_drops_from_end():
+    configure(openai_api_key="sk-test", prompt_budgets={"similar_memories": 6})
+    builder = PromptBuilder("classification")
+    items = ["aaaa aaaa", "bbbb bbbb", "cccc cccc", "dddd dddd"]
+    kept = builder.items("similar_memories", items)
+    assert kept == ["aaaa aaaa", "bbbb bbbb"]
+    assert builder.dropped_items == 2
+    assert builder.tokens["similar_memories"] == 6
+
+
+def test_items_keep_last_keeps_newest_in_order():
+    configure(openai_api_key="sk-test", prompt_budgets={"recent_messages": 6})
+    builder = PromptBuilder("extraction")
+    kept = builder.items("recent_messages", ["m1 old msg", "m2 mid msg", "m3 new msg"], keep="last")
+    assert kept == ["m2 mid msg", "m3 new msg"]
+
+
+def test_items_caps_each_item():
+    configure(openai_api_key="sk-test", prompt_budgets={"recent_messages": 1000})
+    builder = PromptBuilder("extraction")
+    kept = builder.items("recent_messages", ["short", words(300)], item_budget=40)
+    assert kept[0] == "short"
+    assert count_tokens(kept[1]) <= 40
+    assert builder.dropped_items == 0
+
+
+def test_items_always_keeps_one():
+    configure(openai_api_key="sk-test", prompt_budgets={"similar_memories": 2})
+    builder = PromptBuilder("classification")
+    kept = builder.items("similar_memories", [words(50), "b"], item_budget=1000)
+    assert len(kept) == 1
+    assert count_tokens(kept[0]) <= 2 + 12
+
+
+def test_items_rejects_unknown_keep():
+    with pytest.raises(ValueError):
+        PromptBuilder("extraction").items("recent_messages", [], keep="middle")
@@ -0,0 +1,98 @@
+import socket
+
+import numpy as np
+import pytest
+
+from contextmemory.memory.vector_store import SearchFilter
+from contextmemory.server import protocol
+
+
+def test_search_round_trip():
+    vectors = np.random.default_rng(0).standard_normal((3, 8)).astype(np.float32)
+    search_filter = SearchFilter(memory_type="bubble", min_importance=0.5, occurred_after=100.0, occurred_before=200.0)
+    data = protocol.pack_search(42, 10, vectors, decay_rate=0.01, search_filter=search_filter)
+    conversation_id, k, unpacked, decay_rate, unpacked_filter = protocol.unpack_search(data)
+    assert (conversation_id, k, decay_rate) == (42, 10, 0.01)
+    np.testing.assert_array_equal(unpacked, vectors)
+    assert unpacked_filter == search_filter
+
+
+def test_search_without_decay_or_filter():
+    vectors = np.ones((1, 4), dtype=np.float64)
+    _, _, unpacked, decay_rate, search_filter = protocol.unpack_search(protocol.pack_search(1, 5, vectors))
+    assert decay_rate is None
+    assert search_filter is None
+    assert unpacked.dtype == np.float32
+    np.testing.assert_array_equal(unpacked, vectors)
+
+
+@pytest.mark.parametrize("memory_type", [None, "semantic", "bubble"])
+def test_search_filter_memory_types(memory_type):
+    search_filter = SearchFilter(memory_type=memory_type, min_importance=0.2)
+    *_, unpacked_filter = protocol.unpack_search(protocol.pack_search(1, 5, np.zeros((1, 2)), search_filter=search_filter))
+    assert unpacked_filter == search_filter
+
+
+def test_add_round_trip():
+    vector = np.arange(6, dtype=np.float32)
+    data = protocol.pack_add(7, 99, vector, timestamp=1700000000.5, importance=0.75)
+    conversation_id, memory_id, unpacked, timestamp, importance = protocol.unpack_add(data)
+    assert (conversation_id, memory_id, timestamp, importance) == (7, 99, 1700000000.5, 0.75)
+    np.testing.assert_array_equal(unpacked, vector)
+
+    *_, timestamp, importance = protocol.unpack_add(protocol.pack_add(7, 99, vector))
+    assert timestamp is None and importance is None
+
+
+def test_remove_conversation_and_count_round_trip():
+    assert protocol.unpack_remove(protocol.pack_remove(3, 2**40)) == (3, 2**40)
+    assert protocol.unpack_conversation(protocol.pack_conversation(12345)) == 12345
+    assert protocol.unpack_count(protocol.pack_count(2**33)) == 2**33
+
+
+def test_replace_round_trip():
+    vectors = np.random.default_rng(1).standard_normal((4, 5)).astype(np.float32)
+    ids = [10, 11, 12, 2**35]
+    timestamps = [1.0, 2.5, 3.0, 4.25]
+    importances = [0.1, 0.5, 0.9, 1.0]
+    conversation_id, unpacked_ids, unpacked, unpacked_times, unpacked_imps = protocol.unpack_replace(
+        protocol.pack_replace(8, ids, vectors, timestamps, importances)
+    )
+    assert conversation_id == 8
+    assert unpacked_ids.tolist() == ids
+    assert unpacked_times.tolist() == timestamps
+    assert unpacked_imps.tolist() == importances
+    np.testing.assert_array_equal(unpacked, vectors)
+
+
+def test_replace_empty():
+    conversation_id, ids, vectors, times, imps = protocol.unpack_replace(
+        protocol.pack_replace(8, [], np.zeros((0, 0), dtype=np.float32), [], [])
+    )
+    assert conversation_id == 8
+    assert len(ids) == len(vectors) == len(times) == len(imps) == 0
+
+
+def test_search_results_round_trip():
+    batch = [
+        [{"memory_id": 1, "score": 0.5}, {"memory_id": 2**40, "score": 0.25}],
+        [],
+        [{"memory_id": 3, "score": -1.0}],
+    ]
+    assert protocol.unpack_search_results(protocol.pack_search_results(batch), len(batch)) == batch
+
+
+def test_frames_over_a_socket():
+    left, right = socket.socketpair()
+    try:
+        payload = protocol.pack_conversation(5)
+        protocol.send_frame(left, protocol.OP_COUNT, payload)
+        protocol.send_frame(left, protocol.STATUS_OK)
+        assert protocol.recv_frame(right) == (protocol.OP_COUNT, payload)
+        assert protocol.recv_frame(right) == (protocol.STATUS_OK, b"")
+        left.close()
+        with pytest.raises(ConnectionError):
+            protocol.recv_frame(right)
+    finally:
+        left.close()
+        right.close()
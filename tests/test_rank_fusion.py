@@ -0,0 +1,44 @@
+import pytest
+
+from contextmemory.memory.rank_fusion import RRF_K, reciprocal_rank_fusion
+
+
+def test_empty():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_single_ranking_keeps_its_order():
+    fused = reciprocal_rank_fusion([[3, 1, 2]])
+    assert [r["memory_id"] for r in fused] == [3, 1, 2]
+    assert fused[0]["score"] == pytest.approx(1.0)
+
+
+def test_items_ranked_by_several_lists_rise():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [4, 2, 5]])
+    assert fused[0]["memory_id"] == 2
+    assert {r["memory_id"] for r in fused} == {1, 2, 3, 4, 5}
+
+
+def test_scores():
+    fused = {r["memory_id"]: r["score"] for r in reciprocal_rank_fusion([[1, 2], [2]], k=RRF_K)}
+    best_possible = 2 / (RRF_K + 1)
+    assert fused[1] == pytest.approx((1 / (RRF_K + 1)) / best_possible)
+    assert fused[2] == pytest.approx((1 / (RRF_K + 2) + 1 / (RRF_K + 1)) / best_possible)
+
+
+def test_first_in_every_list_scores_one():
+    fused = reciprocal_rank_fusion([[7, 1], [7, 2], [7]])
+    assert fused[0] == {"memory_id": 7, "score": pytest.approx(1.0)}
+    assert all(r["score"] < 1.0 for r in fused[1:])
+
+
+def test_ties_keep_ranking_order():
+    fused = reciprocal_rank_fusion([[1, 2], [2, 1]])
+    assert [r["memory_id"] for r in fused] == [1, 2]
+    assert fused[0]["score"] == pytest.approx(fused[1]["score"])
+
+
+def test_k_weights_top_ranks():
+    rankings = [[1, 2, 3, 4, 5], [5, 4, 3, 2, 1], [3]]
+    assert reciprocal_rank_fusion(rankings, k=1)[0]["memory_id"] == 3
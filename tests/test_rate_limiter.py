@@ -0,0 +1,120 @@
+import threading
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+from openai import RateLimitError
+
+from contextmemory.core.deadline import DeadlineExceeded, deadline
+from contextmemory.core.rate_limiter import BACKGROUND, INTERACTIVE, RateLimiter, _retry_after, request_priority
+
+
+def rate_limit_error(**headers):
+    """A 429 carrying only the response headers the limiter reads."""
+    error = RateLimitError.__new__(RateLimitError)
+    error.response = SimpleNamespace(headers=headers)
+    return error
+
+
+def drain(limiter, model="m"):
+    while limiter.try_acquire("openai", model, 1):
+        pass
+
+
+def wait_for_waiters(limiter, count, model="m"):
+    while limiter.stats()[f"openai/{model}"]["waiting"] < count:
+        time.sleep(0.001)
+
+
+def test_interactive_callers_go_before_earlier_background_ones():
+    # One request per 50ms once the initial budget is gone
+    limiter = RateLimiter(requests_per_minute=1200)
+    drain(limiter)
+    order = []
+
+    def call(name, priority):
+        with request_priority(priority):
+            limiter.acquire("openai", "m", 1)
+        order.append(name)
+
+    threads = []
+    for count, (name, priority) in enumerate(
+        [("background 1", BACKGROUND), ("background 2", BACKGROUND), ("interactive", INTERACTIVE)], start=1
+    ):
+        threads.append(threading.Thread(target=call, args=(name, priority)))
+        threads[-1].start()
+        wait_for_waiters(limiter, count)
+    for thread in threads:
+        thread.join()
+
+    # Background callers keep their arrival order
+    assert order == ["interactive", "background 1", "background 2"]
+
+
+def test_budget_is_per_model():
+    limiter = RateLimiter(requests_per_minute=60)
+    drain(limiter, "m")
+    assert not limiter.try_acquire("openai", "m", 1)
+    assert limiter.try_acquire("openai", "other", 1)
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "250"}, 0.25),
+    ({"retry-after": "2"}, 2.0),
+    ({"retry-after": "-1"}, 0.0),
+    ({"retry-after": "soon"}, None),
+    ({}, None),
+])
+def test_retry_after_headers(headers, expected):
+    assert _retry_after(rate_limit_error(**headers)) == expected
+
+
+def test_retry_after_http_date():
+    delay = _retry_after(rate_limit_error(**{"retry-after": formatdate(time.time() + 30, usegmt=True)}))
+    assert 25 < delay <= 30
+
+
+def test_rate_limit_pauses_every_caller_of_the_model():
+    limiter = RateLimiter(max_retries=1)
+    replies = [rate_limit_error(**{"retry-after-ms": "200"}), SimpleNamespace(usage=None)]
+
+    def send():
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    start = time.monotonic()
+    limiter.call("openai", "m", 1, send)
+    assert time.monotonic() - start >= 0.2
+
+    # Another caller arriving during a pause waits for it too
+    limiter.pause("openai", "m", 0.1)
+    start = time.monotonic()
+    limiter.acquire("openai", "m", 1)
+    assert time.monotonic() - start >= 0.09
+    assert limiter.try_acquire("openai", "other", 1)
+
+    stats = limiter.stats()["openai/m"]
+    assert (stats["rate_limited"], stats["retries"], stats["calls"]) == (2, 1, 3)
+
+
+def test_rate_limit_after_last_retry_is_raised():
+    limiter = RateLimiter(max_retries=0)
+
+    def send():
+        raise rate_limit_error(**{"retry-after-ms": "10"})
+
+    with pytest.raises(RateLimitError):
+        limiter.call("openai", "m", 1, send)
+
+
+def test_pause_longer_than_deadline_fails_fast():
+    limiter = RateLimiter()
+    limiter.pause("openai", "m", 5)
+    start = time.monotonic()
+    with deadline(1), pytest.raises(DeadlineExceeded):
+        limiter.acquire("openai", "m", 1)
+    assert time.monotonic() - start < 0.5
+    assert limiter.stats()["openai/m"]["deadline_exceeded"] == 1
@@ -0,0 +1,88 @@
+from contextmemory.memory import search_cache
+from contextmemory.memory.search_cache import (
+    QueryEmbeddingCache,
+    SearchCache,
+    bump_generation,
+    get_generation,
+    query_hash,
+)
+
+
+def test_hit_returns_a_copy():
+    cache = SearchCache()
+    results = {"results": [{"memory_id": 1}]}
+    cache.put(1, "key", results, get_generation(1))
+
+    cached = cache.get(1, "key")
+    assert cached == results
+    cached["results"].clear()
+    assert cache.get(1, "key") == results
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_write_invalidates_only_its_conversation():
+    cache = SearchCache()
+    cache.put(1, "key", "one", get_generation(1))
+    cache.put(2, "key", "two", get_generation(2))
+
+    assert bump_generation(1) == 1
+    assert cache.get(1, "key") is None
+    assert cache.get(2, "key") == "two"
+    assert cache.stale == 1
+    assert cache.stats()["size"] == 1
+
+
+def test_results_computed_before_a_write_are_not_stored():
+    cache = SearchCache()
+    generation = get_generation(1)
+    bump_generation(1)
+    cache.put(1, "key", "stale", generation)
+    assert cache.get(1, "key") is None
+
+
+def test_generations_are_shared_through_files():
+    # What another worker process sees: the generation file, not this process's state
+    path = search_cache._generation_path(1, "generation")
+    bump_generation(1)
+    bump_generation(1)
+    with open(path) as f:
+        assert f.read() == "2"
+    assert get_generation(1, "other_counter") == 0
+
+
+def test_generation_is_read_outside_the_lock(monkeypatch):
+    cache = SearchCache()
+    cache.put(1, "key", "value", get_generation(1))
+    read = get_generation
+
+    def unlocked_read(conversation_id, *args):
+        assert not cache._lock.locked()
+        return read(conversation_id, *args)
+
+    monkeypatch.setattr(search_cache, "get_generation", unlocked_read)
+    assert cache.get(1, "key") == "value"
+    assert cache.get(1, "missing") is None
+
+
+def test_lru_eviction_and_disabled_cache():
+    cache = SearchCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(1, key, key, get_generation(1))
+    cache.get(1, "a")
+    cache.put(1, "c", "c", get_generation(1))
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "a") == "a"
+    assert cache.evictions == 1
+
+    disabled = SearchCache(max_entries=0)
+    disabled.put(1, "a", "a", get_generation(1))
+    assert disabled.get(1, "a") is None
+
+
+def test_query_embeddings_survive_writes():
+    cache = QueryEmbeddingCache(max_entries=2)
+    cache.put("space", "green tea", [1.0])
+    bump_generation(1)
+    assert cache.get("space", "green tea ") == [1.0]
+    assert cache.get("other space", "green tea") is None
+    assert query_hash(" green tea") == query_hash("green tea")
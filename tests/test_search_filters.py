@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from contextmemory import ContextMemory
+from contextmemory.db.models.conversation import Conversation
+from contextmemory.db.models.memory import Memory
+from contextmemory.db.models.memory_connection import MemoryConnection
+
+from conftest import fake_embedding
+
+
+@pytest.fixture
+def conversation(db):
+    """A tea fact linked to a tea bubble and to an unrelated fact."""
+    conversation = Conversation()
+    db.add(conversation)
+    db.commit()
+
+    def memory(text, is_episodic, importance):
+        mem = Memory(
+            conversation_id=conversation.id,
+            memory_text=text,
+            embedding=fake_embedding(text),
+            is_episodic=is_episodic,
+            occurred_at=datetime(2025, 3, 1, tzinfo=timezone.utc) if is_episodic else None,
+            importance=importance,
+        )
+        db.add(mem)
+        return mem
+
+    memories = {
+        "fact": memory("User likes green tea", False, 0.9),
+        "bubble": memory("User drank green tea in Kyoto", True, 0.5),
+        "other_fact": memory("User lives in Oslo", False, 0.2),
+    }
+    db.flush()
+    for a, b in (("fact", "bubble"), ("fact", "other_fact")):
+        for src, dst in ((a, b), (b, a)):
+            db.add(MemoryConnection(
+                src_id=memories[src].id, dst_id=memories[dst].id, conversation_id=conversation.id, score=0.9,
+            ))
+    db.commit()
+    return conversation.id, {name: mem.id for name, mem in memories.items()}
+
+
+def connected_ids(response):
+    return {r["memory_id"] for r in response["results"] if r["type"] == "connected"}
+
+
+@pytest.mark.parametrize("expansion", ["direct", "graph"])
+def test_connections_are_expanded_without_filter(db, conversation, expansion):
+    conversation_id, ids = conversation
+    response = ContextMemory(db).search("green tea", conversation_id, limit=1, expansion=expansion)
+    assert connected_ids(response)
+
+
+@pytest.mark.parametrize("expansion", ["direct", "graph"])
+def test_connected_memories_obey_memory_type(db, conversation, expansion):
+    conversation_id, ids = conversation
+    memory = ContextMemory(db)
+
+    semantic = memory.search("green tea", conversation_id, limit=1, expansion=expansion, memory_type="semantic")
+    assert semantic["results"][0]["memory_id"] == ids["fact"]
+    assert connected_ids(semantic) == {ids["other_fact"]}
+
+    bubbles = memory.search("green tea", conversation_id, limit=1, expansion=expansion, memory_type="bubble")
+    assert [r["memory_id"] for r in bubbles["results"]] == [ids["bubble"]]
+
+
+@pytest.mark.parametrize("expansion", ["direct", "graph"])
+def test_connected_memories_obey_min_importance(db, conversation, expansion):
+    conversation_id, ids = conversation
+    response = ContextMemory(db).search(
+        "green tea", conversation_id, limit=1, expansion=expansion, min_importance=0.4
+    )
+    assert ids["other_fact"] not in {r["memory_id"] for r in response["results"]}
@@ -0,0 +1,173 @@
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from contextmemory.memory.vector_store import (
+    FAISSVectorStore,
+    SearchFilter,
+    SegmentedVectorStore,
+    _age_days,
+    read_index_version,
+)
+
+DIM = 4
+
+
+def unit(i):
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[i % DIM] = 1.0
+    return vector.tolist()
+
+
+def ids(store):
+    return set(store.id_map)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "indexes" / "conv_1")
+
+
+def test_each_save_publishes_a_new_version(path):
+    store = FAISSVectorStore(DIM)
+    assert read_index_version(path) == 0
+    store.add(1, unit(0))
+    store.save(path)
+    store.add(2, unit(1))
+    store.save(path)
+    assert read_index_version(path) == store.version == 2
+
+    loaded = FAISSVectorStore(DIM)
+    assert loaded.load(path)
+    assert (loaded.version, ids(loaded)) == (2, {1, 2})
+
+
+def test_save_replays_unsaved_changes_onto_newer_snapshot(path):
+    # Two stores on one path stand in for two worker processes
+    first, second = FAISSVectorStore(DIM), FAISSVectorStore(DIM)
+    first.add(1, unit(0))
+    first.save(path)
+    second.load(path)
+
+    first.add(2, unit(1))
+    first.save(path)
+    second.add(3, unit(2))
+    second.remove(1)
+    second.save(path)
+
+    assert second.version == read_index_version(path) == 3
+    assert ids(second) == {2, 3}
+    assert [r["memory_id"] for r in second.search(unit(1), k=1)] == [2]
+
+    fresh = FAISSVectorStore(DIM)
+    fresh.load(path)
+    assert ids(fresh) == {2, 3}
+
+
+def test_refresh_keeps_pending_ops(path):
+    first, second = FAISSVectorStore(DIM), FAISSVectorStore(DIM)
+    first.add(1, unit(0))
+    first.save(path)
+    second.load(path)
+
+    second.add(2, unit(1))
+    second.save(path)
+    first.add(3, unit(2))
+    first.remove(1)
+
+    assert first.refresh(path)
+    assert first.version == 2
+    assert ids(first) == {2, 3}
+    assert not first.refresh(path)
+
+    # The replayed ops are still unsaved, and go out with the next save
+    first.save(path)
+    second.refresh(path)
+    assert ids(second) == {2, 3}
+
+
+def test_replay_skips_memories_already_in_snapshot(path):
+    first, second = FAISSVectorStore(DIM), FAISSVectorStore(DIM)
+    first.add(1, unit(0))
+    second.add(1, unit(0))
+    first.save(path)
+    second.save(path)
+    assert second.count == 1
+
+
+def test_authoritative_contents_overwrite_instead_of_merging(path):
+    first, second = FAISSVectorStore(DIM), FAISSVectorStore(DIM)
+    first.add(1, unit(0))
+    first.save(path)
+
+    rebuilt = FAISSVectorStore(DIM)
+    rebuilt.add(5, unit(3))
+    second.replace_contents(rebuilt, authoritative=True)
+    second.save(path)
+
+    first.refresh(path)
+    assert ids(first) == {5}
+    assert first.version == 2
+
+
+def days_ago(days):
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def test_decayed_search_skips_buckets_that_cannot_reach_top_k(path):
+    store = SegmentedVectorStore(DIM)
+    store.add(1, unit(0), occurred_at=days_ago(1))
+    store.add(2, unit(0), occurred_at=days_ago(200))
+    store.save(path)
+    assert store.unload() == 1
+
+    # exp(-0.1 * 200) can't beat the recent perfect match: the old bucket stays on disk
+    assert [r["memory_id"] for r in store.search(unit(0), k=1, decay_rate=0.1)] == [1]
+    assert len(store._unloaded) == 1
+
+    # Without decay every bucket is searched
+    assert {r["memory_id"] for r in store.search(unit(0), k=2)} == {1, 2}
+    assert not store._unloaded
+
+
+def test_old_bucket_is_searched_while_it_can_still_win():
+    store = SegmentedVectorStore(DIM)
+    store.add(1, unit(1), occurred_at=days_ago(1))
+    store.add(2, unit(0), occurred_at=days_ago(200))
+    assert [r["memory_id"] for r in store.search(unit(0), k=1, decay_rate=0.1)] == [2]
+
+
+def test_decayed_search_matches_exhaustive_ranking():
+    rng = np.random.default_rng(7)
+    store = SegmentedVectorStore(DIM)
+    now = time.time()
+    memories = {}
+    for memory_id in range(200):
+        vector = rng.standard_normal(DIM).astype(np.float32)
+        vector /= np.linalg.norm(vector)
+        occurred_at = days_ago(float(rng.uniform(0, 365)))
+        store.add(memory_id, vector.tolist(), occurred_at=occurred_at)
+        memories[memory_id] = (vector, occurred_at.timestamp())
+
+    query = rng.standard_normal(DIM).astype(np.float32)
+    query /= np.linalg.norm(query)
+    decay_rate = 0.02
+    expected = sorted(
+        memories,
+        key=lambda m: -float(memories[m][0] @ query) * math.exp(-decay_rate * _age_days(now, memories[m][1])),
+    )[:10]
+    assert [r["memory_id"] for r in store.search(query.tolist(), k=10, decay_rate=decay_rate)] == expected
+
+
+def test_time_window_skips_buckets_outside_it():
+    store = SegmentedVectorStore(DIM)
+    store.add(1, unit(0))
+    store.add(2, unit(0), occurred_at=days_ago(30))
+    store.add(3, unit(0), occurred_at=days_ago(1))
+
+    window = SearchFilter(occurred_after=days_ago(40).timestamp(), occurred_before=days_ago(20).timestamp())
+    assert len(store._bucket_keys(window)) == 1
+    assert [r["memory_id"] for r in store.search(unit(0), k=3, search_filter=window)] == [2]